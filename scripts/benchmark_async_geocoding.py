@@ -0,0 +1,78 @@
+import argparse
+import io
+import json
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from urllib.parse import urlencode
+from urllib.request import urlopen
+import pandas as pd
+from utils.async_geocoding import NominatimProvider, resolve_locations
+from utils.geocoding import LocalGeocoder, geocoding, location_query
+from utils.mock_geocoder import MockGeocoderServer
+
+"""Measure geocoding throughput against local mock Nominatim servers.
+
+Each mock server enforces its own request rate (HTTP 429 above it), answers
+after a fixed latency and stalls a fraction of requests past the client
+timeout. The async client should run every provider at its allowed rate with
+no 429s, retrying the stalled requests; the sequential ``geocoding()`` loop
+(request, then sleep 1/rate) is shown for comparison, since its throughput
+drops below the allowed rate by the latency of every request.
+"""
+
+parser = argparse.ArgumentParser(description="Benchmark the async geocoding client against mock geocoders")
+parser.add_argument("--locations", type=int, default=400, help="Unique locations to resolve (padded with unknown ones)")
+parser.add_argument("--providers", type=int, default=2, help="Mock providers run side by side")
+parser.add_argument("--rate", type=float, default=25.0, help="Requests per second each provider allows")
+parser.add_argument("--in-flight", type=int, default=8, help="Concurrent requests per provider")
+parser.add_argument("--latency", type=float, default=0.1, help="Seconds each mock response takes")
+parser.add_argument("--slow-fraction", type=float, default=0.02, help="Share of requests that stall past the timeout")
+parser.add_argument("--timeout", type=float, default=1.0, help="Client timeout per request")
+parser.add_argument("--sequential-locations", type=int, default=50,
+                    help="Locations the sequential geocoding() loop resolves for comparison (0 to skip)")
+args = parser.parse_args()
+
+known = LocalGeocoder.from_frame(pd.read_csv('../data/sales_data_sample_cleaned.csv', encoding='latin-1')).coordinates
+keys = list(known)[:args.locations]
+keys += [(f"Unknown City {i}", "", "Nowhere") for i in range(args.locations - len(keys))]
+
+servers = [
+    MockGeocoderServer(known, rate=args.rate, latency=args.latency, slow_fraction=args.slow_fraction, seed=i).start()
+    for i in range(args.providers)
+]
+providers = [
+    NominatimProvider(server.url, rate=args.rate, max_in_flight=args.in_flight, timeout=args.timeout, name=f"mock{i}")
+    for i, server in enumerate(servers)
+]
+
+start = time.perf_counter()
+results = resolve_locations(keys, providers, backoff_base=0.05, seed=0)
+elapsed = time.perf_counter() - start
+
+allowed = args.rate * args.providers
+print(f"async      | {len(keys):,} locations in {elapsed:6.2f}s | {len(keys) / elapsed:7.1f} locations/s"
+      f" (allowed {allowed:.1f} req/s across {args.providers} providers)")
+print(f"           | statuses {dict(Counter(result.status for result in results.values()))}"
+      f" | retried {sum(result.attempts > 1 for result in results.values())}")
+for provider, server in zip(providers, servers):
+    stats = server.stats()
+    print(f"  {provider.name:<8} | {stats['requests']:5,} requests at {stats['observed_rate'] or 0:6.1f} req/s"
+          f" (allowed {args.rate:.1f}) | 429s {stats['rate_limited']} | stalled {stats['slow']}")
+    server.stop()
+
+if args.sequential_locations:
+    with MockGeocoderServer(known, rate=args.rate, latency=args.latency) as server:
+        def blocking_geocode(city, state, country):
+            query = urlencode({"q": location_query(city, state, country), "format": "json", "limit": 1})
+            with urlopen(f"{server.url}/search?{query}", timeout=args.timeout) as response:
+                places = json.load(response)
+            return (float(places[0]["lat"]), float(places[0]["lon"])) if places else (None, None)
+
+        frame = pd.DataFrame(keys[:args.sequential_locations], columns=["CITY", "STATE", "COUNTRY"])
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            geocoding(frame, geocoder=blocking_geocode, cache_path=None, request_interval=1 / args.rate)
+        elapsed = time.perf_counter() - start
+        print(f"sequential | {len(frame):,} locations in {elapsed:6.2f}s | {len(frame) / elapsed:7.1f} locations/s"
+              f" (allowed {args.rate:.1f} req/s, one provider)")
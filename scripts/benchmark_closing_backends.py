@@ -0,0 +1,95 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+from utils.closing_model import CLOSING_MODEL_BACKENDS, build_closing_model
+from utils.datasets import read_dataset, MODEL_READY
+from utils.params import RANDOM_STATE, TEST_SIZE, DISCOUNT_CLIP_LOWER, DISCOUNT_CLIP_UPPER
+
+"""Compare closing-model backends on synthetically scaled copies of the model-ready data.
+
+Each copy resamples the real rows with replacement and jitters PRICEEACH and
+QUANTITYORDERED (re-deriving DISCOUNT_PCT_CLIPPED), so larger copies are not
+just exact duplicates. Reports fit time, single-row and batch predict cost, and
+held-out AUC per backend and scale.
+"""
+
+parser = argparse.ArgumentParser(description="Benchmark closing-model backends at 10x/100x/1000x data")
+parser.add_argument("--scales", type=int, nargs="*", default=[10, 100, 1000])
+parser.add_argument("--backends", nargs="*", choices=CLOSING_MODEL_BACKENDS, default=list(CLOSING_MODEL_BACKENDS))
+parser.add_argument("--max-exact-rows", type=int, default=300_000,
+                    help="Skip the exact-split backend above this many training rows")
+args = parser.parse_args()
+
+SINGLE_ROW_CALLS = 200
+
+feature_cols = [
+    "PRODUCTLINE",
+    "QUANTITYORDERED",
+    "MSRP",
+    "PRICEEACH",
+    "DISCOUNT_PCT_CLIPPED",
+    "MONTH_ID",
+    "YEAR_ID",
+]
+traget_col = "IS_CLOSED"
+
+def scale_dataset(df: pd.DataFrame, factor: int, seed: int) -> pd.DataFrame:
+    """Resample ``factor`` x rows with +/-1% price noise and +/-2 unit quantity noise."""
+    rng = np.random.default_rng(seed)
+    scaled = df.sample(len(df) * factor, replace=True, random_state=seed).reset_index(drop=True)
+    scaled["PRICEEACH"] = (scaled["PRICEEACH"] * rng.normal(1.0, 0.01, len(scaled))).round(2)
+    scaled["QUANTITYORDERED"] = (scaled["QUANTITYORDERED"] + rng.integers(-2, 3, len(scaled))).clip(lower=1)
+    discount = (scaled["MSRP"] - scaled["PRICEEACH"]) / scaled["MSRP"] * 100.0
+    scaled["DISCOUNT_PCT_CLIPPED"] = discount.clip(lower=DISCOUNT_CLIP_LOWER, upper=DISCOUNT_CLIP_UPPER)
+    return scaled
+
+df = read_dataset(MODEL_READY, columns=feature_cols + [traget_col])
+df["PRODUCTLINE"] = df["PRODUCTLINE"].astype(str)
+df[traget_col] = df[traget_col].astype(int)
+
+# Split the real rows first so no resampled copy of a test row leaks into training
+train, test = train_test_split(df, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=df[traget_col])
+
+results = []
+for factor in args.scales:
+    train_scaled = scale_dataset(train, factor, RANDOM_STATE)
+    test_scaled = scale_dataset(test, factor, RANDOM_STATE + 1)
+    X_train, y_train = train_scaled[feature_cols], train_scaled[traget_col]
+    X_test, y_test = test_scaled[feature_cols], test_scaled[traget_col]
+    single_rows = [X_test.iloc[[i]] for i in range(SINGLE_ROW_CALLS)]
+
+    for backend in args.backends:
+        if backend == "gradient_boosting" and len(X_train) > args.max_exact_rows:
+            print(f"{factor:>5}x | {backend:<22} | skipped ({len(X_train):,} rows > --max-exact-rows)")
+            continue
+
+        model = build_closing_model(backend, ['PRODUCTLINE'], random_state=RANDOM_STATE)
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores = model.predict_proba(X_test)[:, 1]
+        batch_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for row in single_rows:
+            model.predict_proba(row)
+        single_ms = (time.perf_counter() - start) / SINGLE_ROW_CALLS * 1000
+
+        results.append({
+            "scale": factor,
+            "backend": backend,
+            "train_rows": len(X_train),
+            "fit_seconds": fit_seconds,
+            "single_row_ms": single_ms,
+            "batch_rows_per_second": len(X_test) / batch_seconds,
+            "test_auc": roc_auc_score(y_test, scores),
+        })
+        print(f"{factor:>5}x | {backend:<22} | fit {fit_seconds:8.2f}s | single row {single_ms:6.2f} ms"
+              f" | batch {len(X_test) / batch_seconds:>12,.0f} rows/s | AUC {results[-1]['test_auc']:.4f}")
+
+print(pd.DataFrame(results).to_string(index=False))
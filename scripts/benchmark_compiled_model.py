@@ -0,0 +1,48 @@
+import time
+import numpy as np
+import pandas as pd
+from joblib import load
+from utils.compiled_model import CompiledClosingModel, COMPILED_MODEL_PATH
+from utils.datasets import read_dataset, MODEL_READY
+
+"""Microbenchmark the compiled array model against the joblib Pipeline."""
+
+SINGLE_ROW_CALLS = 2_000
+BATCH_ROWS = [1_000, 100_000, 1_000_000]
+
+model = load('../models/sales_closing_model.joblib')
+compiled = CompiledClosingModel.load(COMPILED_MODEL_PATH)
+feature_cols = list(model.feature_names_in_)
+
+df = read_dataset(MODEL_READY, columns=feature_cols)
+df["PRODUCTLINE"] = df["PRODUCTLINE"].astype(str)
+rows = df.to_dict(orient="records")
+
+# Single-row scoring, as a quote desk would call it
+start = time.perf_counter()
+pipeline_single = [model.predict_proba(pd.DataFrame([rows[i % len(rows)]]))[0, 1] for i in range(SINGLE_ROW_CALLS)]
+pipeline_us = (time.perf_counter() - start) / SINGLE_ROW_CALLS * 1e6
+
+start = time.perf_counter()
+compiled_single = [compiled.predict_one(rows[i % len(rows)]) for i in range(SINGLE_ROW_CALLS)]
+compiled_us = (time.perf_counter() - start) / SINGLE_ROW_CALLS * 1e6
+
+print(f"single row | pipeline {pipeline_us:8.1f} us/row | compiled {compiled_us:8.1f} us/row"
+      f" | speedup {pipeline_us / compiled_us:5.1f}x"
+      f" | max abs diff {np.max(np.abs(np.array(pipeline_single) - np.array(compiled_single))):.2e}")
+
+for n_rows in BATCH_ROWS:
+    batch = df.sample(n_rows, replace=True, random_state=42).reset_index(drop=True)
+
+    start = time.perf_counter()
+    expected = model.predict_proba(batch)[:, 1]
+    pipeline_seconds = time.perf_counter() - start
+
+    numeric, codes = compiled.encode(batch)
+    start = time.perf_counter()
+    actual = compiled.predict_proba_arrays(numeric, codes)
+    compiled_seconds = time.perf_counter() - start
+
+    print(f"batch {n_rows:>9,} | pipeline {n_rows / pipeline_seconds:>12,.0f} rows/s"
+          f" | compiled {n_rows / compiled_seconds:>12,.0f} rows/s"
+          f" | max abs diff {np.max(np.abs(expected - actual)):.2e}")
@@ -0,0 +1,35 @@
+import time
+import pandas as pd
+from utils.normailize_phone_numbers_to_e164 import normalize_phone_to_e164, normalize_phones_e164
+
+"""Benchmark scalar vs batch phone normalization on resampled order lines."""
+
+ROW_COUNTS = [1_000_000, 10_000_000]
+SCALAR_MAX_ROWS = 1_000_000  # Row-wise apply is timed on at most this many rows and extrapolated
+
+df = pd.read_csv(
+    '../data/sales_data_sample.csv',
+    encoding='latin-1'
+)
+
+for rows in ROW_COUNTS:
+    sample = df[["PHONE", "COUNTRY", "CITY"]].sample(rows, replace=True, random_state=42).reset_index(drop=True)
+
+    start = time.perf_counter()
+    batch = normalize_phones_e164(sample["PHONE"], sample["COUNTRY"], sample["CITY"])
+    batch_seconds = time.perf_counter() - start
+
+    scalar_sample = sample.head(SCALAR_MAX_ROWS)
+    start = time.perf_counter()
+    scalar = scalar_sample.apply(
+        lambda row: normalize_phone_to_e164(row.get("PHONE"), row.get("COUNTRY"), row.get("CITY")),
+        axis=1
+    )
+    scalar_seconds = (time.perf_counter() - start) * rows / len(scalar_sample)
+
+    mismatches = int((batch.head(SCALAR_MAX_ROWS) != scalar).sum())
+    print(
+        f"{rows:>12,} rows | scalar {scalar_seconds:8.2f}s ({rows / scalar_seconds:>12,.0f} rows/s)"
+        f" | batch {batch_seconds:8.2f}s ({rows / batch_seconds:>12,.0f} rows/s)"
+        f" | speedup {scalar_seconds / batch_seconds:6.1f}x | mismatches {mismatches}"
+    )
@@ -0,0 +1,110 @@
+import argparse
+import os
+import time
+from sklearn.model_selection import train_test_split
+from utils.datasets import MODEL_READY_V2, read_dataset
+from utils.tensor_inputs import TENSOR_SPECS, TUNED_BATCH_SIZE, build_packed_model, build_tensor_cache, make_dataset
+
+"""Compare CPU training epochs/sec of the notebook's dict-of-columns tf.data pipeline against the packed, cached one.
+
+Both pipelines feed the same dense network on the same split: the notebook
+version slices a dict of DataFrame columns and runs StringLookup +
+Normalization inside the model every batch; the packed version reads the
+pre-encoded shards from utils/tensor_inputs.py and only one-hot encodes an
+integer index. The first epoch (graph tracing, cache fill) is reported
+separately from the steady-state epochs.
+"""
+
+NOTEBOOK_BATCH_SIZE = 64
+
+parser = argparse.ArgumentParser(description="Benchmark the Keras input pipelines on CPU")
+parser.add_argument("specs", nargs="*", default=list(TENSOR_SPECS), help=f"Models to benchmark: {', '.join(TENSOR_SPECS)}")
+parser.add_argument("--epochs", type=int, default=5, help="Timed epochs after the warm-up epoch")
+parser.add_argument("--batch-sizes", type=int, nargs="*", default=[64, 256, 1024, 4096], help="Batch sizes tried for the packed pipeline")
+args = parser.parse_args()
+
+unknown = [name for name in args.specs if name not in TENSOR_SPECS]
+if unknown:
+    parser.error(f"unknown specs {unknown}; choose from {list(TENSOR_SPECS)}")
+
+# Encoding and caching only need NumPy, so they are timed even without TensorFlow
+caches = {}
+for name in args.specs:
+    start = time.perf_counter()
+    caches[name] = build_tensor_cache(TENSOR_SPECS[name], force=True)
+    encode_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    build_tensor_cache(TENSOR_SPECS[name])
+    print(f"{name:<7} encode + cache {encode_seconds:7.3f}s | cache hit {time.perf_counter() - start:7.3f}s"
+          f" | {caches[name].n_rows('train'):,} train / {caches[name].n_rows('test'):,} test rows")
+
+try:
+    os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")  # CPU only, so the numbers compare input pipelines
+    import tensorflow as tf
+except ImportError:
+    print(f"TensorFlow is not installed; skipping the epochs/sec comparison (TUNED_BATCH_SIZE {TUNED_BATCH_SIZE} stays unmeasured)")
+    raise SystemExit(0)
+
+def notebook_pipeline(spec, batch_size):
+    """The notebook's df_to_dataset and dict-input model, verbatim apart from the spec's columns."""
+    frame = read_dataset(MODEL_READY_V2, columns=spec.features + [spec.target]).dropna(subset=spec.features + [spec.target])
+    y = frame[spec.target].to_numpy(dtype=spec.label_dtype)
+    X_train, _, y_train, _ = train_test_split(
+        frame[spec.features], y, test_size=spec.test_size, random_state=spec.random_state, stratify=y
+    )
+    X_train = X_train.astype({spec.categorical_col: str, **{col: "float32" for col in spec.numeric_cols}})
+
+    ds = tf.data.Dataset.from_tensor_slices((dict(X_train), y_train))
+    ds = ds.shuffle(buffer_size=len(X_train), seed=42).batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+    lookup = tf.keras.layers.StringLookup(output_mode="one_hot")
+    lookup.adapt(X_train[spec.categorical_col].values)
+    normalizer = tf.keras.layers.Normalization()
+    normalizer.adapt(X_train[list(spec.numeric_cols)].values)
+
+    inputs = {
+        col: tf.keras.Input(shape=(), name=col, dtype=tf.string if col == spec.categorical_col else tf.float32)
+        for col in spec.features
+    }
+    numeric = tf.keras.layers.Concatenate()([tf.keras.layers.Reshape((1,))(inputs[col]) for col in spec.numeric_cols])
+    x = tf.keras.layers.Concatenate()([lookup(inputs[spec.categorical_col]), normalizer(numeric)])
+    return ds, x, inputs
+
+def compile_model(model, spec):
+    loss = "binary_crossentropy" if spec.label_dtype == "float32" else "sparse_categorical_crossentropy"
+    model.compile(optimizer="adam", loss=loss)
+    return model
+
+def time_epochs(model, ds):
+    start = time.perf_counter()
+    model.fit(ds, epochs=1, verbose=0)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    model.fit(ds, epochs=args.epochs, verbose=0)
+    return first, args.epochs / (time.perf_counter() - start)
+
+n_outputs = {"float32": 1, "int32": 3}
+for name in args.specs:
+    spec, cache = TENSOR_SPECS[name], caches[name]
+
+    ds, x, inputs = notebook_pipeline(spec, NOTEBOOK_BATCH_SIZE)
+    for units in (64, 32):
+        x = tf.keras.layers.Dense(units, activation="relu")(x)
+        x = tf.keras.layers.Dropout(0.2)(x)
+    activation = "sigmoid" if n_outputs[spec.label_dtype] == 1 else "softmax"
+    outputs = tf.keras.layers.Dense(n_outputs[spec.label_dtype], activation=activation)(x)
+    first, baseline = time_epochs(compile_model(tf.keras.Model(inputs=inputs, outputs=outputs), spec), ds)
+    print(f"{name:<7} dict-of-columns batch {NOTEBOOK_BATCH_SIZE:>5} | first epoch {first:7.3f}s | {baseline:8.2f} epochs/s")
+
+    results = {}
+    for batch_size in args.batch_sizes:
+        model = compile_model(build_packed_model(cache, n_outputs=n_outputs[spec.label_dtype]), spec)
+        first, results[batch_size] = time_epochs(model, make_dataset(cache, "train", batch_size))
+        print(f"{name:<7} packed          batch {batch_size:>5} | first epoch {first:7.3f}s | {results[batch_size]:8.2f} epochs/s"
+              f" | {results[batch_size] / baseline:5.1f}x")
+
+    same_batch = results.get(NOTEBOOK_BATCH_SIZE)
+    if same_batch is not None:
+        print(f"{name:<7} packed vs dict-of-columns at batch {NOTEBOOK_BATCH_SIZE}: {same_batch / baseline:5.1f}x")
+    best = max(results, key=results.get)
+    print(f"{name:<7} fastest packed batch size {best} (provisional default {TUNED_BATCH_SIZE}; update TUNED_BATCH_SIZE to match)")
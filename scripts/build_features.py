@@ -0,0 +1,43 @@
+import argparse
+from utils.params import FEATURE_PARAMS
+from utils.datasets import CLEANED, MemoryReport, csv_path
+from utils.features import (
+    FEATURE_SETS, build_feature_sets, load_feature_source, stream_sketches, write_feature_output,
+    write_feature_sketches,
+)
+from utils.instrumentation import instrument_script
+
+"""Build several model-ready outputs (v1, v2) from a single read of the cleaned data."""
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("sets", nargs="*", help=f"Feature sets to build: {', '.join(FEATURE_SETS)} (default: all)")
+parser.add_argument("--stream-edges", action="store_true",
+                    help="Sketch quantile edges in a streaming pass over the cleaned Parquet row groups first")
+parser.add_argument("--workers", type=int, default=None, help="Worker processes for --stream-edges")
+args = parser.parse_args()
+unknown = sorted(set(args.sets) - set(FEATURE_SETS))
+if unknown:
+    parser.error(f"unknown feature sets: {', '.join(unknown)}")
+
+metrics = instrument_script("features")
+feature_sets = [FEATURE_SETS[name] for name in args.sets or FEATURE_SETS]
+
+# Quantile edges (deal size buckets, optional discount bounds) come from mergeable sketches
+sketches = {}
+if args.stream_edges:
+    with metrics.timer("sketch_seconds"):
+        sketches = stream_sketches(CLEANED, feature_sets, FEATURE_PARAMS, max_workers=args.workers)
+
+with metrics.timer("load_seconds"):
+    df = load_feature_source(CLEANED, feature_sets)
+metrics.count("rows_read_total", len(df))
+
+outputs = build_feature_sets(df, feature_sets, FEATURE_PARAMS, sketches)
+for feature_set in feature_sets:
+    memory_report = MemoryReport()
+    df_model = write_feature_output(outputs[feature_set.name], feature_set, memory_report)
+    sketch_path = write_feature_sketches(feature_set, sketches, FEATURE_PARAMS)
+    print(f"Saved {feature_set.name}:", csv_path(feature_set.stage), "+", sketch_path)
+    print("  Rows:", len(df_model))
+    print("  Closed rate:", df_model["IS_CLOSED"].mean())
+    print("  Memory (MB):", round(memory_report.to_frame().loc["TOTAL", "mb_after"], 3))
@@ -0,0 +1,39 @@
+import tempfile
+from pathlib import Path
+import pandas as pd
+from utils.datasets import DatasetWriter, read_dataset
+
+"""Regression check: chunked Parquet writes must survive chunks that outgrow the first chunk's types.
+
+The first chunk fits QUANTITYORDERED in Int16 and CUSTOMERNAME in an int8
+category index; the second needs a wider int and pushes the dictionary past
+127 categories. Both used to raise ArrowInvalid in DatasetWriter.write.
+"""
+
+first = pd.DataFrame({
+    "ORDERNUMBER": [10100, 10101],
+    "QUANTITYORDERED": [1, 2],
+    "CUSTOMERNAME": ["Customer 0", "Customer 1"],
+    "SALES": [10.5, 20.0],
+})
+second = pd.DataFrame({
+    "ORDERNUMBER": range(10102, 10302),
+    "QUANTITYORDERED": [40_000] + [None] * 199,
+    "CUSTOMERNAME": [f"New customer {i}" for i in range(200)],
+    "SALES": [1.0] * 200,
+})
+
+with tempfile.TemporaryDirectory() as directory:
+    stage = str(Path(directory) / "two_chunks")
+    with DatasetWriter(stage) as writer:
+        writer.write(first)
+        writer.write(second)
+    written = read_dataset(stage)
+
+expected = pd.concat([first, second], ignore_index=True)
+assert len(written) == len(expected), f"{len(written)} rows read back, expected {len(expected)}"
+assert written["QUANTITYORDERED"].max() == 40_000, written["QUANTITYORDERED"].max()
+assert written["QUANTITYORDERED"].isna().sum() == 199
+assert written["CUSTOMERNAME"].astype(str).tolist() == expected["CUSTOMERNAME"].tolist()
+print(f"OK: {len(written)} rows in two chunks, QUANTITYORDERED as {written['QUANTITYORDERED'].dtype}, "
+      f"{written['CUSTOMERNAME'].nunique()} customers")
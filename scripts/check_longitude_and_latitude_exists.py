@@ -1,15 +1,30 @@
-import pandas as pd
+from utils.datasets import read_dataset, CLEANED
+from utils.spatial_index import coordinate_source_counts, load_spatial_index
 
-""""Check for missing LONGITUDE and LATITUDE values in the cleaned data CSV."""
+""""Check for missing LONGITUDE and LATITUDE values in the cleaned data."""
 
-df = pd.read_csv(
-    '../data/sales_data_sample_cleaned.csv',
-    encoding='latin-1'
-)
+df = read_dataset(CLEANED, columns=["CITY", "STATE", "COUNTRY", "TERRITORY", "LONGITUDE", "LATITUDE"])
 
 print(df[["LONGITUDE","LATITUDE"]].isna().sum())
 for col in ["LONGITUDE","LATITUDE"]:
     missing = df[df[col].isna()]
     if not missing.empty:
         print(f"Rows with missing {col}:")
-        print(missing[["CITY","COUNTRY",col]].drop_duplicates())
\ No newline at end of file
+        print(missing[["CITY","COUNTRY",col]].drop_duplicates())
+
+# What the offline spatial index would fill, without any geocoder calls
+index = load_spatial_index()
+filled = df.copy()
+sources = index.fill_missing_coordinates(filled)
+missing = sources.ne("geocoded").fillna(True)
+if missing.any():
+    print("Offline fill for missing coordinates:", coordinate_source_counts(sources[missing]))
+
+# Territories implied by the coordinates vs the TERRITORY column
+filled["REGION_TERRITORY"] = index.territories(filled["LATITUDE"], filled["LONGITUDE"])
+blank = filled["TERRITORY"].isna()
+print(f"Rows with no TERRITORY that their coordinates' region would fill: {int((blank & filled['REGION_TERRITORY'].notna()).sum())}")
+mismatched = filled[~blank & (filled["REGION_TERRITORY"].astype(str) != filled["TERRITORY"].astype(str))]
+print(f"Rows whose TERRITORY differs from their coordinates' region: {len(mismatched)}")
+if not mismatched.empty:
+    print(mismatched.groupby(["COUNTRY", "TERRITORY", "REGION_TERRITORY"], dropna=False, observed=True).size().to_string())
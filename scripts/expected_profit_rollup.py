@@ -0,0 +1,50 @@
+import argparse
+import time
+import pandas as pd
+from utils.batch_scoring import CHUNK_ROWS
+from utils.params import PENDING_VALUE_FACTOR
+from utils.profit_aggregation import ROLLUP_DIMENSIONS, rollup_predictions
+
+"""Expected profit per product line x discount bin x month from a predictions file.
+
+Streams a CSV or Parquet file of predictions (PRODUCTLINE,
+DISCOUNT_PCT_CLIPPED, MONTH_ID, DEAL_SIZE or PRICEEACH and QUANTITYORDERED,
+plus P_WON and optionally P_PENDING) into fixed-bin partial sums across
+worker processes, replacing the notebook's pd.cut / groupby cells. For
+score_batch.py output, pass --won-col CLOSE_PROBABILITY --pending-col ""
+and keep the rollup columns with --keep-columns.
+"""
+
+parser = argparse.ArgumentParser(description="Roll up expected profit by product line, discount bin and month")
+parser.add_argument("input", help="CSV or .parquet predictions file")
+parser.add_argument("--won-col", default="P_WON")
+parser.add_argument("--pending-col", default="P_PENDING", help='Pending probability column ("" for none)')
+parser.add_argument("--pending-value-factor", type=float, default=PENDING_VALUE_FACTOR)
+parser.add_argument("--by", nargs="*", default=list(ROLLUP_DIMENSIONS), help=f"Dimensions to keep, from {ROLLUP_DIMENSIONS}")
+parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Approximate rows per CSV chunk")
+parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+parser.add_argument("--output", default=None, help="Write the rollup table to this CSV")
+args = parser.parse_args()
+
+unknown = [dim for dim in args.by if dim not in ROLLUP_DIMENSIONS]
+if unknown:
+    parser.error(f"--by: invalid dimensions {unknown} (choose from {', '.join(ROLLUP_DIMENSIONS)})")
+
+start = time.perf_counter()
+rollup = rollup_predictions(
+    args.input,
+    won_col=args.won_col,
+    pending_col=args.pending_col or None,
+    pending_value_factor=args.pending_value_factor,
+    chunk_rows=args.chunk_rows,
+    max_workers=args.jobs,
+)
+seconds = time.perf_counter() - start
+print(f"Aggregated {rollup.rows:,} rows ({rollup.skipped:,} skipped) in {seconds:.1f}s ({rollup.rows / seconds:,.0f} rows/s)")
+
+table = rollup.rollup(args.by)
+with pd.option_context("display.width", 200, "display.max_rows", 100):
+    print(table.to_string(index=False, float_format="{:,.3f}".format))
+if args.output:
+    table.to_csv(args.output, index=False)
+    print(f"Wrote {len(table)} rows to {args.output}")
@@ -0,0 +1,51 @@
+import argparse
+import numpy as np
+from utils.datasets import MODEL_READY_V2, read_dataset
+from utils.numpy_mlp import CLOSE_MODEL_NPZ, STATUS_MODEL_NPZ, export_keras_model
+from utils.tensor_inputs import TENSOR_SPECS
+
+"""Export saved Keras close / status models to .npz files the NumPy runtime (utils/numpy_mlp.py) scores without TensorFlow.
+
+Save the notebook models first, e.g. ``model.save("models/close_model.keras")``
+and ``status_model.save("models/status_model.keras")``. Each export is checked
+against ``model.predict`` on the model-ready v2 rows. Models load with
+``safe_mode=False`` so the notebook's ``cast_numeric`` Lambda deserializes;
+only export models you saved yourself.
+"""
+
+parser = argparse.ArgumentParser(description="Export Keras models to the NumPy runtime format")
+parser.add_argument("--close", help="Saved Keras close model (sigmoid close_prob head)")
+parser.add_argument("--status", help="Saved Keras status model (3-class softmax head)")
+parser.add_argument("--close-output", default=CLOSE_MODEL_NPZ)
+parser.add_argument("--status-output", default=STATUS_MODEL_NPZ)
+parser.add_argument("--atol", type=float, default=1e-5, help="Largest allowed difference from model.predict")
+args = parser.parse_args()
+
+if not args.close and not args.status:
+    parser.error("pass --close and/or --status")
+
+import tensorflow as tf
+
+exports = [("close", args.close, args.close_output), ("status", args.status, args.status_output)]
+failed = False
+for name, model_path, output_path in exports:
+    if not model_path:
+        continue
+    spec = TENSOR_SPECS[name]
+    # Trusted local models only: safe mode refuses the cast_numeric Lambda layer's serialized code
+    model = tf.keras.models.load_model(model_path, safe_mode=False)
+    runtime = export_keras_model(model, output_path, numeric_cols=spec.numeric_cols)
+
+    frame = read_dataset(MODEL_READY_V2, columns=spec.features).dropna()
+    inputs = {
+        col: frame[col].astype(str).to_numpy() if col == spec.categorical_col else frame[col].to_numpy(dtype="float32")
+        for col in spec.features
+    }
+    expected = model.predict(inputs, verbose=0)
+    max_diff = float(np.max(np.abs(runtime.predict(inputs) - expected)))
+    failed |= max_diff > args.atol
+    print(f"Saved: {output_path} | {len(frame):,} rows | max abs diff vs Keras {max_diff:.2e}"
+          f"{'' if max_diff <= args.atol else f' exceeds {args.atol:.0e}'}")
+
+if failed:
+    raise SystemExit(1)
@@ -0,0 +1,32 @@
+import argparse
+import time
+from utils.synthetic_orders import OrderProfile, SEED_PATH, write_synthetic_csv
+
+"""Write a synthetic order-line extract in the sales_data_sample.csv schema.
+
+Distributions (product mix, per-PRODUCTLINE prices and quantities, STATUS mix,
+customers with their city/phone formats and typos) come from the seed extract.
+The same --seed and --chunk-rows always produce the same file.
+"""
+
+parser = argparse.ArgumentParser(description="Generate a large synthetic raw sales extract")
+parser.add_argument("--rows", type=int, default=1_000_000)
+parser.add_argument("--output", default="../data/sales_data_synthetic.csv")
+parser.add_argument("--seed-data", default=SEED_PATH, help="Extract whose distributions are sampled")
+parser.add_argument("--chunk-rows", type=int, default=100_000)
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+args = parser.parse_args()
+
+start = time.perf_counter()
+profile = OrderProfile.from_csv(args.seed_data)
+write_synthetic_csv(
+    args.output,
+    args.rows,
+    profile=profile,
+    chunk_rows=args.chunk_rows,
+    seed=args.seed,
+    max_workers=args.jobs,
+)
+seconds = time.perf_counter() - start
+print(f"Wrote {args.rows:,} rows to {args.output} in {seconds:.1f}s ({args.rows / seconds:,.0f} rows/s)")
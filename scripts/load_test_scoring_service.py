@@ -0,0 +1,85 @@
+import argparse
+import http.client
+import json
+import threading
+import time
+import numpy as np
+from utils.datasets import read_dataset, MODEL_READY
+
+"""Drive the local scoring service at a fixed request rate and report latency and throughput."""
+
+parser = argparse.ArgumentParser(description="Load test the local scoring service")
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8080)
+parser.add_argument("--rate", type=float, default=200.0, help="Target requests per second across all clients")
+parser.add_argument("--duration", type=float, default=10.0, help="Seconds to sustain the rate")
+parser.add_argument("--clients", type=int, default=16, help="Concurrent connections")
+parser.add_argument("--endpoint", default="/score", choices=["/score", "/recommend"])
+args = parser.parse_args()
+
+feature_cols = ["PRODUCTLINE", "QUANTITYORDERED", "MSRP", "PRICEEACH", "DISCOUNT_PCT_CLIPPED", "MONTH_ID", "YEAR_ID"]
+quotes = read_dataset(MODEL_READY, columns=feature_cols)
+quotes["PRODUCTLINE"] = quotes["PRODUCTLINE"].astype(str)
+rows = [
+    {col: (value.item() if hasattr(value, "item") else value) for col, value in row.items()}
+    for row in quotes.to_dict(orient="records")
+]
+
+# Latency runs from each request's scheduled send time, so when the service falls behind and clients send late
+# the queueing delay is still counted (no coordinated omission); service time runs from the actual send
+latencies = []
+service_times = []
+errors = []
+lock = threading.Lock()
+start_time = time.perf_counter() + 0.5  # Let every client connect first
+
+def client(client_id: int) -> None:
+    connection = http.client.HTTPConnection(args.host, args.port, timeout=30)
+    interval = args.clients / args.rate
+    next_send = start_time + client_id * interval / args.clients
+    sent = 0
+    while next_send < start_time + args.duration:
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        body = json.dumps({"row": rows[(client_id + sent * args.clients) % len(rows)]})
+        began = time.perf_counter()
+        try:
+            connection.request("POST", args.endpoint, body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+            connection.close()
+            connection = http.client.HTTPConnection(args.host, args.port, timeout=30)
+        finished = time.perf_counter()
+        with lock:
+            if ok:
+                latencies.append(finished - next_send)
+                service_times.append(finished - began)
+            else:
+                errors.append(finished - next_send)
+        sent += 1
+        next_send += interval
+
+threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+wall = time.perf_counter() - start_time
+
+latency_ms = np.array(latencies) * 1000
+service_ms = np.array(service_times) * 1000
+achieved = len(latencies) / wall
+print(f"Endpoint: {args.endpoint}  clients: {args.clients}")
+print(f"Completed: {len(latencies)}  errors: {len(errors)}  in {wall:.1f}s (scheduled {args.duration:.1f}s)")
+print(f"Rate: target {args.rate:.1f} req/s  achieved {achieved:.1f} req/s ({achieved / args.rate:.0%})")
+if len(latency_ms):
+    print(f"Latency from scheduled send p50: {np.percentile(latency_ms, 50):.2f} ms  p99: {np.percentile(latency_ms, 99):.2f} ms")
+    print(f"Service time from actual send p50: {np.percentile(service_ms, 50):.2f} ms  p99: {np.percentile(service_ms, 99):.2f} ms")
+
+connection = http.client.HTTPConnection(args.host, args.port, timeout=30)
+connection.request("GET", "/metrics")
+print("Server metrics:", json.loads(connection.getresponse().read()))
@@ -1,3 +1,5 @@
+import argparse
+import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -7,14 +9,18 @@ from joblib import dump
 
 # Reload model and data (retrain quickly to keep state simple)
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.ensemble import GradientBoostingClassifier
-
-df = pd.read_csv(
-    '../data/sales_pricing_model_ready.csv'
-)
+from sklearn.metrics import roc_auc_score
+from utils.datasets import read_dataset, MODEL_READY
+from utils.params import RANDOM_STATE, TEST_SIZE, CLOSING_MODEL_BACKEND
+from utils.closing_model import CLOSING_MODEL_BACKENDS, build_closing_model
+from utils.discount_sweep import sweep_discounts
+from utils.compiled_model import CompiledClosingModel, COMPILED_MODEL_PATH
+from utils.instrumentation import instrument_script
+
+parser = argparse.ArgumentParser(description="Train the closing model and sweep discounts per product line")
+parser.add_argument("--backend", choices=CLOSING_MODEL_BACKENDS, default=CLOSING_MODEL_BACKEND)
+args = parser.parse_args()
+metrics = instrument_script("train")
 
 feature_cols = [
     "PRODUCTLINE",
@@ -26,49 +32,53 @@ feature_cols = [
     "YEAR_ID",
 ]
 traget_col = "IS_CLOSED"
-X = df[feature_cols]
+
+# Load only the feature and target columns
+with metrics.timer("load_seconds"):
+    df = read_dataset(MODEL_READY, columns=feature_cols + [traget_col])
+
+# Train on plain strings, the form scoring requests and sweep contexts arrive in
+X = df[feature_cols].astype({"PRODUCTLINE": str})
 y = df[traget_col]
 
 X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-
-# Define preprocessing and model pipeline
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('cat', OneHotEncoder(handle_unknown='ignore'), ['PRODUCTLINE']),
-    ],
-    remainder='passthrough'
+    X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
 )
 
-model = Pipeline(steps=[
-    ('preprocessor', preprocessor), 
-    ('classifier', GradientBoostingClassifier(random_state=42)),
-])
+# Define preprocessing and model pipeline for the selected backend
+model = build_closing_model(args.backend, ['PRODUCTLINE'], random_state=RANDOM_STATE)
 
 # Train model
-model.fit(X_train, y_train)
+with metrics.timer("fit_seconds", backend=args.backend):
+    model.fit(X_train, y_train)
+metrics.memory_snapshot("after_fit")
 # Save trained model
+os.makedirs('../models', exist_ok=True)
 dump(model, '../models/sales_closing_model.joblib')
+# Export the array-backed fast path used for low-latency scoring (exact-split trees only)
+if args.backend == "gradient_boosting":
+    CompiledClosingModel.from_pipeline(model).save(COMPILED_MODEL_PATH)
 
 # Evaluate model
 train_score = model.score(X_train, y_train)
 test_score = model.score(X_test, y_test)
 print(f"Train Accuracy: {train_score:.4f}")
 print(f"Test Accuracy: {test_score:.4f}")
-# Feature importance
+print(f"Test AUC: {roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]):.4f}")
+# Feature importance (impurity-based importances only exist for the exact-split backend)
 classifier = model.named_steps['classifier']
-feature_names = model.named_steps['preprocessor'].get_feature_names_out()
-importances = classifier.feature_importances_
-indices = np.argsort(importances)[::-1]
-# Plot feature importances
-plt.figure(figsize=(10, 6))
-plt.title("Feature Importances")
-plt.bar(range(len(importances)), importances[indices], align='center')
-plt.xticks(range(len(importances)), [feature_names[i] for i in indices], rotation=90)
-plt.tight_layout()
-plt.savefig('../models/feature_importances.png')
-plt.show()
+if hasattr(classifier, 'feature_importances_'):
+    feature_names = model.named_steps['preprocessor'].get_feature_names_out()
+    importances = classifier.feature_importances_
+    indices = np.argsort(importances)[::-1]
+    # Plot feature importances
+    plt.figure(figsize=(10, 6))
+    plt.title("Feature Importances")
+    plt.bar(range(len(importances)), importances[indices], align='center')
+    plt.xticks(range(len(importances)), [feature_names[i] for i in indices], rotation=90)
+    plt.tight_layout()
+    plt.savefig('../models/feature_importances.png')
+    plt.show()
 
 # Save test set for future evaluation
 test_set = X_test.copy()
@@ -78,32 +88,31 @@ print("Saved test set to ../data/sales_model_test_set.csv")
 
 print("Model training and evaluation complete.")
 
-# ---- Discount sweep for one product line ----
+# ---- Discount sweep for every product line ----
+contexts = (
+    df.groupby("PRODUCTLINE", observed=True)
+    .agg(
+        QUANTITYORDERED=("QUANTITYORDERED", "median"),
+        MSRP=("MSRP", "median"),
+        PRICEEACH=("PRICEEACH", "median"),
+        MONTH_ID=("MONTH_ID", lambda s: s.mode()[0]),
+        YEAR_ID=("YEAR_ID", lambda s: s.mode()[0]),
+    )
+    .reset_index()
+)
+contexts["PRODUCTLINE"] = contexts["PRODUCTLINE"].astype(str)
+contexts["QUANTITYORDERED"] = contexts["QUANTITYORDERED"].astype(int)
+
+discounts = np.arange(0, 41, 1.0)  # 0% to 40% discount
+with metrics.timer("discount_sweep_seconds"):
+    recommendations, curves = sweep_discounts(
+        model, contexts, feature_cols, discount_grid=discounts, return_curves=True
+    )
+print(pd.concat([contexts["PRODUCTLINE"], recommendations], axis=1))
+
 product_line = "Classic Cars"
-subset = df[df["PRODUCTLINE"] == product_line]
-
-context = {
-    "PRODUCTLINE": product_line,
-    "QUANTITYORDERED": int(subset["QUANTITYORDERED"].median()),
-    "MSRP": float(subset["MSRP"].median()),
-    "PRICEEACH": float(subset["PRICEEACH"].median()),
-    "MONTH_ID": int(subset["MONTH_ID"].mode()[0]),
-    "YEAR_ID": int(subset["YEAR_ID"].mode()[0]),
-}
-
-discounts = np.arrange(0, 41, 1.0)  # 0% to 40% discount
-results = []
-
-for discount in discounts:
-    results = context.copy()
-    results["DISCOUNT_PCT_CLIPPED"] = discount
-    results.append(discount)
-
-sweep_df = pd.DataFrame(results)
-predictions = model.predict_proba(sweep_df)[:, 1]
-
-unit_revenue = context["PRICEEACH"] * (context["QUANTITYORDERED"])
-expected_profits = predictions * unit_revenue
+row = contexts.index[contexts["PRODUCTLINE"] == product_line][0]
+expected_profits = curves["expected_revenue"][row]
 
 plt.figure(figsize=(10, 6))
 plt.plot(discounts, expected_profits, marker='o')
@@ -0,0 +1,59 @@
+import argparse
+import sys
+import tempfile
+import pandas as pd
+from utils.benchmarks import (
+    CASES, HISTORY_PATH, MIN_REGRESSION_RSS_MB, MIN_REGRESSION_SECONDS, append_history, baseline_metrics, find_regressions, load_history,
+    prepare_workspace, run_case_isolated,
+)
+
+"""Benchmark every pipeline stage and hot function at fixed sizes and flag regressions against history.
+
+Each size gets its own workspace with a synthetic raw extract, so stage scripts
+run unmodified against ../data paths that point into the workspace. Every case
+runs in a fresh process; wall time, peak RSS and rows/sec are compared against
+the median of recent runs recorded on the same host and CPU in the JSON history.
+"""
+
+parser = argparse.ArgumentParser(description="Run the benchmark suite and check for regressions")
+parser.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000], help="Raw extract rows per run")
+parser.add_argument("--cases", nargs="*", choices=list(CASES), default=list(CASES))
+parser.add_argument("--history", default=HISTORY_PATH)
+parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown / memory growth")
+parser.add_argument("--min-seconds", type=float, default=MIN_REGRESSION_SECONDS,
+                    help="Ignore wall-time changes smaller than this (noise on millisecond cases)")
+parser.add_argument("--min-rss-mb", type=float, default=MIN_REGRESSION_RSS_MB, help="Ignore peak RSS changes smaller than this")
+parser.add_argument("--baseline-runs", type=int, default=5, help="Recent runs the baseline median is taken over")
+parser.add_argument("--no-record", action="store_true", help="Don't append this run to the history")
+parser.add_argument("--accept", action="store_true", help="Record the run even if it regressed (new baseline)")
+args = parser.parse_args()
+
+# Stage cases consume each other's outputs, so keep CASES order whatever order was requested
+cases = [name for name in CASES if name in args.cases]
+
+results = []
+for rows in args.sizes:
+    with tempfile.TemporaryDirectory() as workspace:
+        print(f"Preparing {rows:,}-row workspace")
+        prepare_workspace(workspace, rows)
+        for name in cases:
+            result = run_case_isolated(name, workspace, rows)
+            results.append(result)
+            print(f"  {name:<26} {result['wall_seconds']:9.3f}s  {result['peak_rss_mb']:8.1f} MB"
+                  f"  {result['rows_per_second']:>14,.0f} rows/s")
+
+history = load_history(args.history)
+regressions = find_regressions(
+    results, baseline_metrics(history, args.baseline_runs), args.threshold, args.min_seconds, args.min_rss_mb,
+)
+
+if not regressions.empty:
+    print(f"\nRegressions beyond {args.threshold:.0%} against the median of the last {args.baseline_runs} runs on this machine:")
+    with pd.option_context("display.float_format", "{:,.3f}".format):
+        print(regressions.to_string(index=False))
+
+if not args.no_record and (regressions.empty or args.accept):
+    append_history(results, args.history)
+    print(f"Recorded run in {args.history}")
+
+sys.exit(1 if not regressions.empty and not args.accept else 0)
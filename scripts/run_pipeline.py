@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+from utils.pipeline import PipelineStage, run_pipeline
+from utils.instrumentation import EVENTS_PATH_ENV, PROFILE_DIR_ENV
+from utils.params import CLEANING_CHUNK_SIZE, FEATURE_PARAMS, TRAINING_PARAMS, SEARCH_PARAMS, CLOSING_MODEL_BACKEND
+
+"""Run the clean -> model-ready -> train chain, skipping stages whose inputs, params, and code are unchanged."""
+
+SHARED_CODE = ["utils/datasets.py", "utils/params.py", "utils/instrumentation.py"]
+
+STAGES = [
+    PipelineStage(
+        name="clean",
+        script="clean_data.py",
+        inputs=["../data/sales_data_sample.csv", "../data/location_centroids.csv"],
+        outputs=["../data/sales_data_sample_cleaned.csv", "../data/sales_data_sample_cleaned.parquet"],
+        code=SHARED_CODE + [
+            "utils/async_geocoding.py",
+            "utils/cleaning.py",
+            "utils/enrichment.py",
+            "utils/geocoding.py",
+            "utils/locations.py",
+            "utils/normailize_phone_numbers_to_e164.py",
+            "utils/spatial_index.py",
+        ],
+        params={"chunk_size": CLEANING_CHUNK_SIZE},
+        optional_inputs=["../data/geocode_cache.sqlite"],  # Decides LATITUDE/LONGITUDE; created by the first run
+    ),
+    PipelineStage(
+        name="features",
+        script="build_features.py",
+        inputs=["../data/sales_data_sample_cleaned.parquet"],
+        outputs=[
+            "../data/sales_pricing_model_ready.csv",
+            "../data/sales_pricing_model_ready.parquet",
+            "../data/sales_pricing_model_ready_v2.csv",
+            "../data/sales_pricing_model_ready_v2.parquet",
+            "../data/sales_pricing_model_ready_sketches.json",
+            "../data/sales_pricing_model_ready_v2_sketches.json",
+        ],
+        code=SHARED_CODE + ["utils/features.py", "utils/quantile_sketch.py"],
+        params=FEATURE_PARAMS,
+        depends_on=["clean"],
+    ),
+    PipelineStage(
+        name="train",
+        script="model_curve.py",
+        inputs=["../data/sales_pricing_model_ready.parquet"],
+        outputs=[
+            "../models/sales_closing_model.joblib",
+            "../data/sales_model_test_set.csv",
+        ] + (["../models/sales_closing_model_compiled.npz"] if CLOSING_MODEL_BACKEND == "gradient_boosting" else []),
+        code=SHARED_CODE + ["utils/closing_model.py", "utils/discount_sweep.py", "utils/compiled_model.py"],
+        params=TRAINING_PARAMS,
+        depends_on=["features"],
+    ),
+    PipelineStage(
+        name="search",
+        script="search_models.py",
+        inputs=["../data/sales_pricing_model_ready.parquet"],
+        outputs=["../models/model_search_results.csv", "../models/best_search_model.joblib"],
+        code=SHARED_CODE + ["utils/model_search.py"],
+        params=SEARCH_PARAMS,
+        depends_on=["features"],
+    ),
+]
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("targets", nargs="*", help="Stages to bring up to date (default: all)")
+parser.add_argument("--force", action="store_true", help="Rerun selected stages even if fresh")
+parser.add_argument("--jobs", type=int, default=2, help="Independent stages to run in parallel")
+parser.add_argument("--metrics", help="Append every stage's instrumentation events to this JSONL file")
+parser.add_argument("--profile", help="Write a folded-stack sampling profile per stage into this directory")
+args = parser.parse_args()
+
+# Stage scripts pick these up through utils.instrumentation
+if args.metrics:
+    os.environ[EVENTS_PATH_ENV] = os.path.abspath(args.metrics)
+if args.profile:
+    os.environ[PROFILE_DIR_ENV] = os.path.abspath(args.profile)
+
+status = run_pipeline(STAGES, targets=args.targets or None, force=args.force, max_workers=args.jobs)
+print({name: state for name, state in status.items()})
+sys.exit(1 if any(state in ("failed", "blocked") for state in status.values()) else 0)
@@ -0,0 +1,69 @@
+import argparse
+import time
+import pandas as pd
+from utils.datasets import read_dataset, MODEL_READY_V2
+from utils.numpy_mlp import STATUS_MODEL_NPZ, NumpyMLP
+from utils.scenarios import (
+    CONFIDENCE, DISCOUNT_COL, BaseDeals, ClosingModelPredictor, ScenarioSpec, StatusModelPredictor,
+    deal_size_shock, discount_range, jitter, load_scenario_spec, run_scenarios,
+)
+from utils.scoring import MODEL_PATH, load_closing_model
+
+"""Monte Carlo what-if analysis: expected profit per discount bin and product line.
+
+Replaces the notebook's hand-built ``synthetic`` / ``stress`` cells. Base
+deals come from the model-ready extract; every scenario draws one of them and
+applies the perturbations of a JSON spec (see ``ScenarioSpec.to_dict``) or,
+by default, the notebook's: 3% jitter on the price and deal-size features and
+a discount drawn uniformly between its 1st and 99th percentiles.
+"""
+
+parser = argparse.ArgumentParser(description="Simulate perturbed deals and summarize expected profit with confidence intervals")
+parser.add_argument("--model", choices=["closing", "status"], default="closing",
+                    help="closing: sklearn Pipeline (P_PENDING is 0); status: exported Keras status model")
+parser.add_argument("--closing-model", default=MODEL_PATH)
+parser.add_argument("--status-model", default=STATUS_MODEL_NPZ)
+parser.add_argument("--spec", default=None, help="JSON scenario spec; overrides the default perturbations")
+parser.add_argument("--samples", type=int, default=1_000_000)
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--deal-size-shock", type=float, default=None, help="Add a log-scale DEAL_SIZE shock (2.0 = e^2 larger deals)")
+parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+parser.add_argument("--all-productlines", action="store_true", help="Also report each discount bin across all product lines")
+parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+parser.add_argument("--output", default=None, help="Write the summary table to this CSV")
+args = parser.parse_args()
+
+if args.model == "status":
+    predict = StatusModelPredictor(NumpyMLP.load(args.status_model))
+else:
+    predict = ClosingModelPredictor(load_closing_model(args.closing_model)[0])
+
+deals = read_dataset(MODEL_READY_V2)
+base = BaseDeals.from_frame(deals, predict.feature_cols)
+
+if args.spec:
+    spec = load_scenario_spec(args.spec)
+else:
+    low, high = deals[DISCOUNT_COL].quantile([0.01, 0.99])
+    jittered = [col for col in ["LOG_DEAL_SIZE", "PRICE_TO_MSRP_RATIO", "PRICEEACH", "MSRP"] if col in base.numeric]
+    spec = ScenarioSpec(tuple(jitter(col, 0.03) for col in jittered) + (discount_range(low, high),), args.samples, args.seed)
+if args.deal_size_shock is not None:
+    spec = ScenarioSpec(spec.perturbations + (deal_size_shock(args.deal_size_shock),), spec.samples, spec.seed, spec.chunk_rows)
+
+start = time.perf_counter()
+summary = run_scenarios(base, spec, predict, max_workers=args.jobs)
+seconds = time.perf_counter() - start
+print(f"{spec.samples:,} scenarios from {len(base):,} base deals in {seconds:.1f}s ({spec.samples / seconds:,.0f} scenarios/s)")
+
+table = summary.to_frame(args.confidence)
+if args.all_productlines:
+    table = pd.concat([table, summary.collapsed().to_frame(args.confidence)], ignore_index=True)
+with pd.option_context("display.width", 200, "display.max_rows", 200, "display.float_format", "{:,.2f}".format):
+    print(table.to_string(index=False))
+if args.output:
+    table.to_csv(args.output, index=False)
+    print(f"Wrote {len(table)} rows to {args.output}")
+
+best = table.loc[table.groupby("PRODUCTLINE")["EXPECTED_PROFIT"].idxmax(), ["PRODUCTLINE", "DISCOUNT_BIN", "EXPECTED_PROFIT"]]
+print("\nDiscount bin with the highest mean expected profit:")
+print(best.to_string(index=False, float_format="{:,.2f}".format))
@@ -0,0 +1,42 @@
+import argparse
+from utils.batch_scoring import CHUNK_ROWS, score_file
+from utils.scoring import MODEL_PATH
+
+"""Score a file of quotes in the closing model's feature_cols schema.
+
+Reads a CSV or Parquet file chunk by chunk, scores the chunks on a process
+pool that shares one loaded copy of the model, and writes each quote's close
+probability and recommended discount in input order (CSV, or Parquet when
+--output ends in .parquet).
+"""
+
+parser = argparse.ArgumentParser(description="Batch-score a quote file with the closing model")
+parser.add_argument("input", help="CSV or .parquet file with the model's feature columns")
+parser.add_argument("--output", default="../data/scored_quotes.csv")
+parser.add_argument("--model", default=MODEL_PATH)
+parser.add_argument("--compiled", default=None, help="Compiled .npz model used for predictions instead of the Pipeline")
+parser.add_argument("--numpy-mlp", default=None, help="Exported Keras model (.npz, see export_keras_models.py) scored instead of --model")
+parser.add_argument("--keep-columns", nargs="*", default=[], help="Input columns copied to the output (e.g. ids)")
+parser.add_argument("--no-recommend", action="store_true", help="Only write close probabilities, skip the discount sweep")
+parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Approximate rows per CSV chunk")
+parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+args = parser.parse_args()
+
+def report(rows, seconds):
+    print(f"  {rows:,} rows | {rows / seconds:,.0f} rows/s", end="\r", flush=True)
+
+stats = score_file(
+    args.input,
+    args.output,
+    progress=report,
+    model_path=args.model,
+    compiled_path=args.compiled,
+    numpy_mlp_path=args.numpy_mlp,
+    chunk_rows=args.chunk_rows,
+    max_workers=args.jobs,
+    recommend=not args.no_recommend,
+    keep_columns=args.keep_columns,
+)
+print()  # Finish the progress line so the summary does not overprint it
+print(f"Scored {stats['rows']:,} rows into {args.output} in {stats['seconds']:.1f}s"
+      f" ({stats['rows_per_second']:,.0f} rows/s)")
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from utils.scoring import MODEL_PATH, LatencyRecorder, MicroBatcher, deal_size_buckets, load_closing_model, rows_to_frame
+from utils.features import FEATURE_SETS, load_deal_size_edges, sketches_path
+from utils.discount_sweep import DEFAULT_DISCOUNT_GRID, sweep_discounts
+from utils.compiled_model import COMPILED_MODEL_PATH, CompiledClosingModel
+
+"""Local HTTP scoring service for the sales closing model.
+
+POST /score            {"row": {...}}            -> close probability (+ deal size bucket)
+POST /score/batch      {"rows": [{...}, ...]}    -> close probabilities (+ deal size buckets)
+POST /recommend        {"row": {...}, "discount_grid": [...]?}   -> best discount
+POST /recommend/batch  {"rows": [...], "discount_grid": [...]?}  -> best discounts
+GET  /metrics          latency percentiles and throughput
+GET  /health
+"""
+
+parser = argparse.ArgumentParser(description="Serve close probabilities and discount recommendations")
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8080)
+parser.add_argument("--model", default=MODEL_PATH)
+parser.add_argument("--max-batch-rows", type=int, default=4096)
+parser.add_argument("--max-wait-ms", type=float, default=2.0)
+parser.add_argument("--compiled", nargs="?", const=COMPILED_MODEL_PATH, default=None,
+                    help="Score with the compiled array model instead of the sklearn Pipeline")
+args = parser.parse_args()
+
+# Load once at startup
+model, feature_cols = load_closing_model(args.model)
+# Deal size buckets use exactly the edges the model-ready data was built with
+bucket_edges = load_deal_size_edges(FEATURE_SETS["v1"]) if os.path.exists(sketches_path(FEATURE_SETS["v1"])) else None
+if args.compiled:
+    compiled = CompiledClosingModel.load(args.compiled)
+    predict = compiled.predict_proba
+else:
+    predict = lambda X: model.predict_proba(X)[:, 1]
+recorder = LatencyRecorder()
+batcher = MicroBatcher(
+    predict,
+    max_batch_rows=args.max_batch_rows,
+    max_wait_seconds=args.max_wait_ms / 1000,
+    recorder=recorder,
+)
+
+def score_rows(rows):
+    return batcher.submit(rows_to_frame(rows, feature_cols))
+
+def recommend_rows(rows, discount_grid):
+    contexts = rows_to_frame(rows, feature_cols)
+    recommendations = sweep_discounts(
+        model, contexts, feature_cols, discount_grid=discount_grid, predict=batcher.submit
+    )
+    return [
+        {
+            "best_discount": float(rec.BEST_DISCOUNT),
+            "best_expected_revenue": float(rec.BEST_EXPECTED_REVENUE),
+            "close_probability": float(rec.BEST_CLOSE_PROBABILITY),
+        }
+        for rec in recommendations.itertuples(index=False)
+    ]
+
+# Warm up: the first predict call pays for lazy initialisation inside sklearn
+warmup_row = {col: 0 for col in feature_cols}
+warmup_row["PRODUCTLINE"] = str(model.named_steps["preprocessor"].transformers_[0][1].categories_[0][0])
+score_rows([warmup_row])
+recommend_rows([{**warmup_row, "PRICEEACH": 1.0, "QUANTITYORDERED": 1}], DEFAULT_DISCOUNT_GRID)
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status: int, payload) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send_json(200, recorder.snapshot())
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("Request body must be a JSON object")
+            rows = payload["rows"] if self.path.endswith("/batch") else [payload["row"]]
+            discount_grid = np.asarray(payload.get("discount_grid", DEFAULT_DISCOUNT_GRID), dtype=float)
+
+            if self.path in ("/score", "/score/batch"):
+                probabilities = [float(p) for p in score_rows(rows)]
+                response = (
+                    {"close_probabilities": probabilities}
+                    if self.path.endswith("/batch")
+                    else {"close_probability": probabilities[0]}
+                )
+                if bucket_edges is not None:
+                    buckets = deal_size_buckets(rows_to_frame(rows, feature_cols), bucket_edges)
+                    response.update({"deal_size_buckets": buckets} if self.path.endswith("/batch") else {"deal_size_bucket": buckets[0]})
+            elif self.path in ("/recommend", "/recommend/batch"):
+                recommendations = recommend_rows(rows, discount_grid)
+                response = {"recommendations": recommendations} if self.path.endswith("/batch") else recommendations[0]
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+        except (KeyError, ValueError, TypeError) as error:
+            self._send_json(400, {"error": str(error)})
+            return
+        except Exception as error:
+            self._send_json(500, {"error": f"{type(error).__name__}: {error}"})
+            return
+
+        recorder.record(time.perf_counter() - start, rows=len(rows))
+        self._send_json(200, response)
+
+    def log_message(self, format, *args):
+        pass  # Per-request access logs would dominate latency at high request rates
+
+server = ThreadingHTTPServer((args.host, args.port), ScoringHandler)
+server.daemon_threads = True
+print(f"Serving {args.model} on http://{args.host}:{args.port} (features: {feature_cols})")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
+finally:
+    server.server_close()
+    print(json.dumps(recorder.snapshot(), indent=2))
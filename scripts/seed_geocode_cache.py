@@ -0,0 +1,14 @@
+import pandas as pd
+from utils.geocoding import GeocodeCache
+
+"""Pre-seed the persistent geocode cache from coordinates we already resolved."""
+
+df = pd.read_csv(
+    '../data/sales_data_sample_cleaned.csv',
+    encoding='latin-1'
+)
+
+with GeocodeCache() as cache:
+    seeded = cache.seed(df)
+
+print(f"Seeded {seeded} locations into the geocode cache")
@@ -0,0 +1,33 @@
+import argparse
+import pandas as pd
+from utils.params import FEATURE_PARAMS
+from utils.datasets import CLEANED, read_dataset
+from utils.features import (
+    FEATURE_SETS, load_feature_sketches, merge_sketches, sketch_frame, sketch_key, source_columns,
+    write_feature_sketches,
+)
+
+"""Fold newly landed order months into the persisted feature sketches and report how the bucket edges moved."""
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--since", required=True, help="First ORDERDATE (YYYY-MM or YYYY-MM-DD) not yet in the sketches")
+parser.add_argument("--until", help="ORDERDATE to stop before (default: everything after --since)")
+parser.add_argument("sets", nargs="*", help=f"Feature sets to update: {', '.join(FEATURE_SETS)} (default: all)")
+args = parser.parse_args()
+
+feature_sets = [FEATURE_SETS[name] for name in args.sets or FEATURE_SETS]
+filters = [("ORDERDATE", ">=", pd.Timestamp(args.since))]
+if args.until:
+    filters.append(("ORDERDATE", "<", pd.Timestamp(args.until)))
+
+new_rows = read_dataset(CLEANED, columns=source_columns(feature_sets), filters=filters)
+print(f"{len(new_rows):,} new order lines since {args.since}")
+
+for feature_set in feature_sets:
+    sketches = load_feature_sketches(feature_set)
+    key = sketch_key(feature_set.name, "DEAL_SIZE")
+    before = sketches[key].quantiles(FEATURE_PARAMS["deal_size_quantiles"]).tolist()
+    merge_sketches(sketches, sketch_frame(new_rows, [feature_set], FEATURE_PARAMS, seed=sketches[key].n))
+    after = sketches[key].quantiles(FEATURE_PARAMS["deal_size_quantiles"]).tolist()
+    write_feature_sketches(feature_set, sketches, FEATURE_PARAMS)
+    print(f"{feature_set.name}: {sketches[key].n:,} deal sizes sketched, edges {before} -> {after}")
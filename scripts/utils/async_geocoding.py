@@ -0,0 +1,255 @@
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Sequence, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+import asyncio
+import json
+import random
+from utils.geocoding import Geocoder, LocationKey, location_query
+from utils.instrumentation import metrics
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org"
+USER_AGENT = "tableau_geo"
+REQUEST_TIMEOUT_SECONDS = 10.0
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_CAP_SECONDS = 8.0
+
+# Results worth caching; timeouts and errors are transient and asked again next run
+DEFINITIVE_STATUSES = {"resolved", "not_found"}
+
+class GeocodeTimeout(Exception):
+    """The provider did not answer in time; the only failure that is retried."""
+
+class GeocodeError(Exception):
+    """The provider answered with something other than a result (HTTP error, bad payload)."""
+
+@dataclass
+class GeocodeResult:
+    latitude: float | None
+    longitude: float | None
+    status: str  # resolved, not_found, timeout or error
+    provider: str
+    attempts: int
+
+    @property
+    def coordinates(self) -> Tuple[float | None, float | None]:
+        return self.latitude, self.longitude
+
+    @property
+    def is_definitive(self) -> bool:
+        return self.status in DEFINITIVE_STATUSES
+
+class TokenBucket:
+    """Asyncio token bucket: ``rate`` acquisitions per second with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated: float | None = None
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:  # Waiters are served in arrival order
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self.updated is not None:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# ---- HTTP: urllib (redirects, chunked bodies, TLS) on worker threads, so no async HTTP library is needed ----
+
+def _urlopen(url: str, headers: Dict[str, str], timeout: float) -> Tuple[int, bytes]:
+    try:
+        with urlopen(Request(url, headers=headers), timeout=timeout) as response:
+            return response.status, response.read()
+    except HTTPError as error:
+        return error.code, error.read()
+
+async def get_json(url: str, timeout: float, headers: Dict[str, str] | None = None) -> Any:
+    """GET ``url`` and decode its JSON body, raising GeocodeTimeout / GeocodeError.
+
+    The blocking request runs on the event loop's default executor; ``timeout``
+    bounds both the socket and the wait for the thread.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        status, body = await asyncio.wait_for(loop.run_in_executor(None, _urlopen, url, headers or {}, timeout), timeout)
+    except TimeoutError as error:  # asyncio.wait_for and socket timeouts alike
+        raise GeocodeTimeout(url) from error
+    except URLError as error:
+        if isinstance(error.reason, TimeoutError):
+            raise GeocodeTimeout(url) from error
+        raise GeocodeError(f"{url}: {error.reason}") from error
+    except (OSError, ValueError) as error:
+        raise GeocodeError(f"{url}: {error}") from error
+    if status != 200:
+        raise GeocodeError(f"{url}: HTTP {status}")
+    try:
+        return json.loads(body)
+    except ValueError as error:
+        raise GeocodeError(f"{url}: invalid JSON") from error
+
+# ---- Providers: anything with a name, rate, in-flight limit and an async lookup(key) ----
+
+class GeocodeProvider(ABC):
+    """Base provider. ``lookup`` returns (latitude, longitude), or None when the location is unknown."""
+
+    name = "provider"
+
+    def __init__(self, rate: float | None, max_in_flight: int = 1, burst: int = 1):
+        self.rate = rate  # Requests per second; None for no limit
+        self.max_in_flight = max_in_flight
+        self.burst = burst
+
+    @abstractmethod
+    async def lookup(self, key: LocationKey) -> Tuple[float, float] | None:
+        """Coordinates for ``key``; raise GeocodeTimeout / GeocodeError when the provider fails."""
+
+class NominatimProvider(GeocodeProvider):
+    """Nominatim's /search API, by default the public instance at its 1 request/second policy.
+
+    Any server speaking the same API (a self-hosted instance, ``MockGeocoderServer``)
+    works by passing its ``base_url`` and allowed rate.
+    """
+
+    name = "nominatim"
+
+    def __init__(
+        self,
+        base_url: str = NOMINATIM_URL,
+        rate: float | None = 1.0,
+        max_in_flight: int = 2,
+        timeout: float = REQUEST_TIMEOUT_SECONDS,
+        user_agent: str = USER_AGENT,
+        name: str | None = None,
+    ):
+        super().__init__(rate, max_in_flight)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.headers = {"User-Agent": user_agent, "Accept": "application/json"}
+        self.name = name or self.name
+
+    async def lookup(self, key: LocationKey) -> Tuple[float, float] | None:
+        city, state, country = key
+        query = urlencode({"q": location_query(city, state, country), "format": "json", "limit": 1})
+        places = await get_json(f"{self.base_url}/search?{query}", self.timeout, self.headers)
+        if not isinstance(places, list):
+            raise GeocodeError(f"{self.name}: unexpected response {places!r}")
+        if not places:
+            return None
+        try:
+            return float(places[0]["lat"]), float(places[0]["lon"])
+        except (KeyError, TypeError, ValueError) as error:
+            raise GeocodeError(f"{self.name}: unexpected place {places[0]!r}") from error
+
+class CallableProvider(GeocodeProvider):
+    """Adapts a synchronous ``Geocoder`` (e.g. ``LocalGeocoder``) so it can run alongside network providers."""
+
+    def __init__(self, geocoder: Geocoder, rate: float | None = None, max_in_flight: int = 1, name: str = "local"):
+        super().__init__(rate, max_in_flight)
+        self.geocoder = geocoder
+        self.name = name
+
+    async def lookup(self, key: LocationKey) -> Tuple[float, float] | None:
+        city, state, country = key
+        latitude, longitude = self.geocoder(city, state or None, country)
+        return None if latitude is None or longitude is None else (latitude, longitude)
+
+# ---- Client ----
+
+class AsyncGeocoder:
+    """Resolve many locations concurrently across one or more providers.
+
+    Every provider gets its own token bucket (its allowed request rate) and
+    ``max_in_flight`` workers, all pulling from one shared queue of locations,
+    so providers run side by side and each stays at its own rate. Timeouts are
+    retried up to ``max_retries`` times with exponential backoff scaled by a
+    random factor in [0.5, 1.5); a retry waits for a fresh token like any
+    other request. Errors and not-found answers are not retried.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[GeocodeProvider],
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE_SECONDS,
+        backoff_cap: float = BACKOFF_CAP_SECONDS,
+        seed: int | None = None,
+    ):
+        if not providers:
+            raise ValueError("AsyncGeocoder needs at least one provider")
+        self.providers = list(providers)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.random = random.Random(seed)
+
+    def backoff(self, attempt: int) -> float:
+        return min(self.backoff_cap, self.backoff_base * 2 ** attempt) * self.random.uniform(0.5, 1.5)
+
+    async def _lookup(self, provider: GeocodeProvider, bucket: TokenBucket | None, key: LocationKey) -> GeocodeResult:
+        for attempt in range(1, self.max_retries + 2):
+            if bucket is not None:
+                await bucket.acquire()
+            try:
+                coordinates = await provider.lookup(key)
+            except GeocodeTimeout:
+                metrics.count("geocoder_timeouts_total", provider=provider.name)
+                if attempt > self.max_retries:
+                    return GeocodeResult(None, None, "timeout", provider.name, attempt)
+                await asyncio.sleep(self.backoff(attempt - 1))
+                continue
+            except GeocodeError:
+                return GeocodeResult(None, None, "error", provider.name, attempt)
+            if coordinates is None:
+                return GeocodeResult(None, None, "not_found", provider.name, attempt)
+            return GeocodeResult(coordinates[0], coordinates[1], "resolved", provider.name, attempt)
+
+    async def _worker(
+        self,
+        provider: GeocodeProvider,
+        bucket: TokenBucket | None,
+        queue: asyncio.Queue,
+        results: Dict[LocationKey, GeocodeResult],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        while not queue.empty():
+            key = queue.get_nowait()
+            began = loop.time()
+            results[key] = result = await self._lookup(provider, bucket, key)
+            metrics.observe("geocoder_request_seconds", loop.time() - began, provider=provider.name)
+            metrics.count("geocoder_results_total", provider=provider.name, status=result.status)
+
+    async def resolve(self, keys: Iterable[LocationKey]) -> Dict[LocationKey, GeocodeResult]:
+        queue: asyncio.Queue = asyncio.Queue()
+        for key in dict.fromkeys(keys):
+            queue.put_nowait(key)
+        results: Dict[LocationKey, GeocodeResult] = {}
+        # One request thread per in-flight slot, so queued threads never eat into a request's timeout
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=sum(provider.max_in_flight for provider in self.providers))
+        )
+        workers = []
+        for provider in self.providers:
+            bucket = TokenBucket(provider.rate, provider.burst) if provider.rate else None
+            workers += [
+                asyncio.create_task(self._worker(provider, bucket, queue, results))
+                for _ in range(provider.max_in_flight)
+            ]
+        await asyncio.gather(*workers)
+        return results
+
+def resolve_locations(keys: Iterable[LocationKey], providers: Sequence[GeocodeProvider], **kwargs: Any) -> Dict[LocationKey, GeocodeResult]:
+    """Synchronous entry point: resolve ``keys`` with an ``AsyncGeocoder`` on a fresh event loop."""
+    return asyncio.run(AsyncGeocoder(providers, **kwargs).resolve(keys))
@@ -0,0 +1,213 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+import io
+import multiprocessing
+import os
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from joblib import load
+from utils.compiled_model import CompiledClosingModel
+from utils.discount_sweep import DEFAULT_DISCOUNT_GRID, sweep_discounts
+from utils.numpy_mlp import NumpyMLP
+from utils.scoring import MODEL_PATH
+
+CHUNK_ROWS = 200_000
+RECOMMEND_COLUMNS = ["BEST_DISCOUNT", "BEST_EXPECTED_REVENUE", "BEST_CLOSE_PROBABILITY"]
+
+@dataclass
+class Scorer:
+    """A loaded closing model (joblib Pipeline or NumpyMLP) plus the close-probability function batch scoring calls."""
+    model: Any
+    feature_cols: List[str]
+    predict: Callable[[pd.DataFrame], np.ndarray]
+
+def load_scorer(model_path: str = MODEL_PATH, compiled_path: str | None = None, numpy_mlp_path: str | None = None) -> Scorer:
+    """Load the joblib Pipeline (arrays memory-mapped, so spawned workers share pages too) and its predict function.
+
+    With ``numpy_mlp_path`` an exported Keras model (``export_keras_models.py``)
+    scores instead, in its own ``feature_cols``; the close probability is its
+    last class: ``close_prob`` for the close model, WON for the status model.
+    """
+    if numpy_mlp_path:
+        runtime = NumpyMLP.load(numpy_mlp_path)
+        return Scorer(runtime, runtime.feature_cols, lambda X: runtime.predict_proba(X)[:, -1])
+    model = load(model_path, mmap_mode="r")
+    if compiled_path:
+        predict = CompiledClosingModel.load(compiled_path).predict_proba
+    else:
+        predict = lambda X: model.predict_proba(X)[:, 1]
+    return Scorer(model, list(model.feature_names_in_), predict)
+
+@dataclass(frozen=True)
+class ScoreTask:
+    """One chunk of the input: a byte range of a CSV (header excluded) or one Parquet row group."""
+    chunk_index: int
+    path: str
+    start: int
+    stop: int = 0
+
+def csv_byte_ranges(path: str, chunk_bytes: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """(header line, byte ranges of whole lines of roughly ``chunk_bytes`` each).
+
+    Assumes no quoted field spans lines, which holds for quote files in the
+    ``feature_cols`` schema.
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()  # Run on to the end of the current line
+            stop = f.tell()
+            ranges.append((start, stop))
+            start = stop
+    return header, ranges
+
+def plan_tasks(path: str, chunk_rows: int = CHUNK_ROWS) -> Tuple[bytes | None, List[ScoreTask]]:
+    """Split an input file into ordered chunks workers can read independently."""
+    if path.endswith(".parquet"):
+        row_groups = pq.ParquetFile(path).num_row_groups
+        return None, [ScoreTask(index, path, index) for index in range(row_groups)]
+
+    with open(path, "rb") as f:
+        f.readline()
+        sample = f.read(1 << 20)
+    bytes_per_row = max(1, len(sample) / max(1, sample.count(b"\n")))
+    header, ranges = csv_byte_ranges(path, max(1, int(chunk_rows * bytes_per_row)))
+    return header, [ScoreTask(index, path, start, stop) for index, (start, stop) in enumerate(ranges)]
+
+def read_task(task: ScoreTask, header: bytes | None, columns: Sequence[str]) -> pd.DataFrame:
+    if header is None:
+        return pq.ParquetFile(task.path).read_row_group(task.start, columns=list(columns)).to_pandas()
+    with open(task.path, "rb") as f:
+        f.seek(task.start)
+        body = f.read(task.stop - task.start)
+    return pd.read_csv(io.BytesIO(header + body), usecols=list(columns))
+
+def score_frame(
+    frame: pd.DataFrame,
+    scorer: Scorer,
+    recommend: bool = True,
+    discount_grid: np.ndarray = DEFAULT_DISCOUNT_GRID,
+    keep_columns: Sequence[str] = (),
+) -> pd.DataFrame:
+    """Close probability (and best discount on ``discount_grid``) per quote, in input order."""
+    features = frame[scorer.feature_cols].astype({"PRODUCTLINE": str})
+    scored = frame[list(keep_columns)].copy() if keep_columns else pd.DataFrame(index=frame.index)
+    scored["CLOSE_PROBABILITY"] = scorer.predict(features)
+    if recommend:
+        recommendations = sweep_discounts(
+            scorer.model, features, scorer.feature_cols, discount_grid=discount_grid, predict=scorer.predict
+        )
+        for col in RECOMMEND_COLUMNS:
+            scored[col] = recommendations[col].to_numpy()
+    return scored
+
+# ---- Worker processes: one scorer per process, inherited copy-on-write when the pool forks ----
+
+_worker_state: Dict[str, Any] = {}
+
+def _init_worker(
+    model_path: str, compiled_path: str | None, numpy_mlp_path: str | None, header: bytes | None, options: Dict[str, Any],
+) -> None:
+    if "scorer" not in _worker_state:  # Forked workers already hold the parent's scorer
+        _worker_state["scorer"] = load_scorer(model_path, compiled_path, numpy_mlp_path)
+    _worker_state["header"] = header
+    _worker_state["options"] = options
+
+def _score_task(task: ScoreTask) -> Tuple[int, Any]:
+    """Score one chunk; returns (rows, rendered output) so serialization also runs in the worker."""
+    scorer, options = _worker_state["scorer"], _worker_state["options"]
+    columns = list(dict.fromkeys([*options["keep_columns"], *scorer.feature_cols]))
+    frame = read_task(task, _worker_state["header"], columns)
+    scored = score_frame(frame, scorer, options["recommend"], options["discount_grid"], options["keep_columns"])
+    if options["output_format"] == "parquet":
+        return len(scored), pa.Table.from_pandas(scored, preserve_index=False)
+    return len(scored), scored.to_csv(index=False, header=task.chunk_index == 0)
+
+def _pool_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else None)
+
+def iter_scored_chunks(
+    input_path: str,
+    model_path: str = MODEL_PATH,
+    compiled_path: str | None = None,
+    numpy_mlp_path: str | None = None,
+    chunk_rows: int = CHUNK_ROWS,
+    max_workers: int | None = None,
+    recommend: bool = True,
+    discount_grid: np.ndarray = DEFAULT_DISCOUNT_GRID,
+    keep_columns: Sequence[str] = (),
+    output_format: str = "csv",
+) -> Iterator[Tuple[int, Any]]:
+    """Yield (rows, CSV text or Arrow table) per chunk of ``input_path``, in input order.
+
+    The model is loaded once in this process before the pool forks, so every
+    worker shares its pages copy-on-write instead of unpickling its own copy;
+    where fork is unavailable, workers memory-map the joblib arrays instead.
+    Workers read their own chunk (CSV byte range or Parquet row group), so the
+    parent only writes results, and at most two chunks per worker are in flight.
+    """
+    header, tasks = plan_tasks(input_path, chunk_rows)
+    options = {
+        "recommend": recommend,
+        "discount_grid": np.asarray(discount_grid, dtype=float),
+        "keep_columns": list(keep_columns),
+        "output_format": output_format,
+    }
+    _worker_state["scorer"] = load_scorer(model_path, compiled_path, numpy_mlp_path)
+    init_args = (model_path, compiled_path, numpy_mlp_path, header, options)
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        _init_worker(*init_args)
+        for task in tasks:
+            yield _score_task(task)
+        return
+
+    in_flight_limit = 2 * max_workers
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=_pool_context(), initializer=_init_worker, initargs=init_args,
+    ) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_score_task, task))
+            if len(pending) >= in_flight_limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def score_file(
+    input_path: str,
+    output_path: str,
+    progress: Callable[[int, float], None] | None = None,
+    **kwargs: Any,
+) -> Dict[str, float]:
+    """Score ``input_path`` into ``output_path`` (CSV or .parquet) chunk by chunk; returns rows, seconds and rows/sec."""
+    output_format = "parquet" if output_path.endswith(".parquet") else "csv"
+    start = time.perf_counter()
+    rows = 0
+    writer = None
+    with open(output_path, "w") if output_format == "csv" else open(os.devnull, "w") as out:
+        for chunk_rows, payload in iter_scored_chunks(input_path, output_format=output_format, **kwargs):
+            if output_format == "parquet":
+                writer = writer or pq.ParquetWriter(output_path, payload.schema)
+                writer.write_table(payload)
+            else:
+                out.write(payload)
+            rows += chunk_rows
+            if progress:
+                progress(rows, time.perf_counter() - start)
+    if writer is not None:
+        writer.close()
+    seconds = time.perf_counter() - start
+    return {"rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds else float("nan")}
@@ -0,0 +1,275 @@
+from __future__ import annotations
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Sequence
+import io
+import json
+import os
+import platform
+import resource
+import runpy
+import statistics
+import subprocess
+import sys
+import time
+import pandas as pd
+
+HISTORY_PATH = "../data/benchmark_history.json"
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_CLEANED_PATH = "../data/sales_data_sample_cleaned.csv"
+
+# Metric -> direction that counts as a regression
+METRICS: Dict[str, str] = {
+    "wall_seconds": "higher",
+    "peak_rss_mb": "higher",
+    "rows_per_second": "lower",
+}
+
+# Changes smaller than these are timer / allocator noise on millisecond-scale cases, whatever their relative size
+MIN_REGRESSION_SECONDS = 0.005
+MIN_REGRESSION_RSS_MB = 5.0
+
+# ---- Workspace: a data/ + work/ tree so the scripts' ../data paths resolve to benchmark inputs ----
+
+def workspace_paths(workspace: str) -> tuple[str, str]:
+    return os.path.join(workspace, "data"), os.path.join(workspace, "work")
+
+def prepare_workspace(workspace: str, rows: int, seed: int = 42) -> None:
+    """Write a synthetic raw extract of ``rows`` lines and an offline geocode cache into the workspace."""
+    from utils.geocoding import GeocodeCache
+    from utils.synthetic_orders import write_synthetic_csv
+
+    data_dir, work_dir = workspace_paths(workspace)
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(work_dir, exist_ok=True)
+    with redirect_stdout(io.StringIO()):
+        write_synthetic_csv(os.path.join(data_dir, "sales_data_sample.csv"), rows, seed=seed)
+    # Synthetic customers reuse the seed extract's locations, so its resolved coordinates cover them all
+    with GeocodeCache(os.path.join(data_dir, "geocode_cache.sqlite")) as cache:
+        cache.seed(pd.read_csv(os.path.join(SCRIPTS_DIR, SEED_CLEANED_PATH), encoding='latin-1'))
+
+# ---- Cases: each returns the zero-argument callable to time; setup before it is untimed ----
+
+def _stage_case(script: str) -> Callable[[str, int], Callable[[], None]]:
+    def setup(workspace: str, rows: int) -> Callable[[], None]:
+        _, work_dir = workspace_paths(workspace)
+        os.chdir(work_dir)
+
+        def run() -> None:
+            sys.argv = [script]
+            with redirect_stdout(io.StringIO()):
+                runpy.run_path(os.path.join(SCRIPTS_DIR, script), run_name="__main__")
+        return run
+    return setup
+
+def _raw_sample(workspace: str, columns: Sequence[str]) -> pd.DataFrame:
+    data_dir, _ = workspace_paths(workspace)
+    from utils.cleaning import RAW_DTYPES
+    return pd.read_csv(os.path.join(data_dir, "sales_data_sample.csv"), encoding='latin-1',
+                       dtype=RAW_DTYPES, usecols=list(columns))
+
+def _phone_scalar_case(workspace: str, rows: int) -> Callable[[], None]:
+    from utils.normailize_phone_numbers_to_e164 import normalize_phone_to_e164
+    sample = _raw_sample(workspace, ["PHONE", "COUNTRY", "CITY"])
+    return lambda: sample.apply(
+        lambda row: normalize_phone_to_e164(row.get("PHONE"), row.get("COUNTRY"), row.get("CITY")), axis=1
+    )
+
+def _phone_batch_case(workspace: str, rows: int) -> Callable[[], None]:
+    from utils.normailize_phone_numbers_to_e164 import normalize_phones_e164
+    sample = _raw_sample(workspace, ["PHONE", "COUNTRY", "CITY"])
+    return lambda: normalize_phones_e164(sample["PHONE"], sample["COUNTRY"], sample["CITY"])
+
+def _geocoding_case(workspace: str, rows: int) -> Callable[[], None]:
+    from utils.geocoding import LocalGeocoder, geocoding
+    stub = LocalGeocoder.from_frame(pd.read_csv(os.path.join(SCRIPTS_DIR, SEED_CLEANED_PATH), encoding='latin-1'))
+    sample = _raw_sample(workspace, ["CITY", "STATE", "COUNTRY"])
+
+    def run() -> None:
+        with redirect_stdout(io.StringIO()):
+            geocoding(sample.copy(), geocoder=stub, cache_path=None)
+    return run
+
+def _status_class_scalar_case(workspace: str, rows: int) -> Callable[[], None]:
+    from utils.features import map_status_to_class
+    status = _raw_sample(workspace, ["STATUS"])["STATUS"]
+    return lambda: status.apply(map_status_to_class)
+
+def _status_class_case(workspace: str, rows: int) -> Callable[[], None]:
+    from utils.features import status_classes
+    status = _raw_sample(workspace, ["STATUS"])["STATUS"]
+    return lambda: status_classes(status)
+
+def _deal_size_case(workspace: str, rows: int) -> Callable[[], None]:
+    from utils.features import bucket_deal_size
+    from utils.params import DEAL_SIZE_QUANTILES
+    sample = _raw_sample(workspace, ["PRICEEACH", "QUANTITYORDERED"])
+    deal_size = sample["PRICEEACH"] * sample["QUANTITYORDERED"]
+    return lambda: bucket_deal_size(deal_size, DEAL_SIZE_QUANTILES)
+
+def _discount_sweep_case(workspace: str, rows: int) -> Callable[[], None]:
+    from utils.datasets import MODEL_READY, read_dataset
+    from utils.discount_sweep import sweep_discounts
+    from utils.scoring import load_closing_model
+    _, work_dir = workspace_paths(workspace)
+    os.chdir(work_dir)  # Relative ../models and ../data paths point into the workspace
+    model, feature_cols = load_closing_model()
+    contexts = read_dataset(MODEL_READY, columns=feature_cols)
+    contexts["PRODUCTLINE"] = contexts["PRODUCTLINE"].astype(str)
+    return lambda: sweep_discounts(model, contexts, feature_cols)
+
+# Run order matters: each stage reads the previous stage's workspace outputs
+CASES: Dict[str, Callable[[str, int], Callable[[], Any]]] = {
+    "stage:clean": _stage_case("clean_data.py"),
+    "stage:features_v1": _stage_case("ml_script.py"),
+    "stage:features_v2": _stage_case("ml_script_v2.py"),
+    "stage:features": _stage_case("build_features.py"),
+    "stage:train": _stage_case("model_curve.py"),
+    "discount_sweep": _discount_sweep_case,
+    "normalize_phone_to_e164": _phone_scalar_case,
+    "normalize_phones_e164": _phone_batch_case,
+    "geocoding": _geocoding_case,
+    "map_status_to_class": _status_class_scalar_case,  # Row-wise reference; history under this name stays comparable
+    "status_classes": _status_class_case,
+    "deal_size_buckets": _deal_size_case,
+}
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+def _run_case(name: str, workspace: str, rows: int) -> Dict[str, Any]:
+    run = CASES[name](workspace, rows)
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    return {
+        "case": name,
+        "rows": rows,
+        "wall_seconds": seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "rows_per_second": rows / seconds if seconds else 0.0,
+    }
+
+# Entry point of the per-case child interpreter: argv = name, workspace, rows, result path
+_CHILD_CODE = (
+    "import json, sys; sys.path.insert(0, {scripts_dir!r}); "
+    "from utils.benchmarks import _run_case; "
+    "name, workspace, rows, result_path = sys.argv[1:5]; "
+    "result = _run_case(name, workspace, int(rows)); "
+    "open(result_path, 'w').write(json.dumps(result))"
+)
+
+def run_case_isolated(name: str, workspace: str, rows: int) -> Dict[str, Any]:
+    """Run one case in a fresh interpreter so its peak RSS is its own."""
+    result_path = os.path.join(workspace, f"result_{name.replace(':', '_')}.json")
+    completed = subprocess.run(
+        [sys.executable, "-c", _CHILD_CODE.format(scripts_dir=SCRIPTS_DIR), name, workspace, str(rows), result_path],
+        cwd=SCRIPTS_DIR,
+        env={**os.environ, "MPLBACKEND": "Agg"},
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark case {name!r} at {rows:,} rows failed:\n{completed.stderr[-4000:]}")
+    with open(result_path) as f:
+        return json.load(f)
+
+# ---- History and regression checks ----
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=SCRIPTS_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+def machine_fingerprint() -> Dict[str, Any]:
+    """Host and CPU a run was recorded on; only runs with the same fingerprint are compared."""
+    return {"host": platform.node(), "cpu": _cpu_model(), "cpu_count": os.cpu_count()}
+
+def load_history(path: str = HISTORY_PATH) -> List[Dict[str, Any]]:
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return []
+
+def append_history(results: List[Dict[str, Any]], path: str = HISTORY_PATH) -> None:
+    history = load_history(path)
+    history.append({
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        **machine_fingerprint(),
+        "results": results,
+    })
+    with open(path, "w") as f:
+        json.dump(history, f, indent=2)
+
+def baseline_metrics(
+    history: List[Dict[str, Any]], runs: int = 5, machine: Dict[str, Any] | None = None,
+) -> Dict[tuple[str, int], Dict[str, float]]:
+    """Median of each metric over the last ``runs`` runs recorded on ``machine`` (default: this one), per (case, rows)."""
+    machine = machine or machine_fingerprint()
+    samples: Dict[tuple[str, int], Dict[str, List[float]]] = {}
+    for run in history:
+        if any(run.get(key) != value for key, value in machine.items()):
+            continue  # Other hosts or CPUs (and runs recorded before fingerprints) are not comparable
+        for result in run["results"]:
+            metrics = samples.setdefault((result["case"], result["rows"]), {metric: [] for metric in METRICS})
+            for metric in METRICS:
+                metrics[metric].append(result[metric])
+    return {
+        key: {metric: statistics.median(values[-runs:]) for metric, values in metrics.items()}
+        for key, metrics in samples.items()
+    }
+
+def find_regressions(
+    results: List[Dict[str, Any]],
+    baseline: Dict[tuple[str, int], Dict[str, float]],
+    threshold: float = 0.2,
+    min_seconds: float = MIN_REGRESSION_SECONDS,
+    min_rss_mb: float = MIN_REGRESSION_RSS_MB,
+) -> pd.DataFrame:
+    """Rows (case, rows, metric, baseline, current, change) where a metric got worse by more than ``threshold``.
+
+    Time metrics (wall_seconds, rows_per_second) only count when wall time
+    moved by at least ``min_seconds``, and peak RSS when it moved by at least
+    ``min_rss_mb``, so noise on fast cases is not flagged.
+    """
+    regressions = []
+    for result in results:
+        reference = baseline.get((result["case"], result["rows"]))
+        if not reference:
+            continue
+        wall_change = abs(result["wall_seconds"] - reference["wall_seconds"])
+        for metric, worse in METRICS.items():
+            base, current = reference[metric], result[metric]
+            if not base:
+                continue
+            if metric == "peak_rss_mb" and abs(current - base) < min_rss_mb:
+                continue
+            if metric != "peak_rss_mb" and wall_change < min_seconds:
+                continue
+            change = (current - base) / base
+            if (worse == "higher" and change > threshold) or (worse == "lower" and change < -threshold):
+                regressions.append({
+                    "case": result["case"],
+                    "rows": result["rows"],
+                    "metric": metric,
+                    "baseline": base,
+                    "current": current,
+                    "change": f"{change:+.1%}",
+                })
+    return pd.DataFrame(regressions, columns=["case", "rows", "metric", "baseline", "current", "change"])
@@ -0,0 +1,249 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Tuple
+import numpy as np
+import pandas as pd
+from utils.normailize_phone_numbers_to_e164 import normalize_phones_e164
+from utils.geocoding import geocoding, GEOCODE_CACHE_PATH
+from utils.async_geocoding import GeocodeProvider, NominatimProvider
+from utils.spatial_index import LOCATION_CENTROIDS_PATH, SpatialIndex, load_spatial_index
+from utils.datasets import DatasetWriter, MemoryReport, compact_frame
+from utils.enrichment import ENRICHMENT_TABLES, RuleHits, enrich
+from utils.instrumentation import metrics
+
+COLUMNS_TO_DROP: List[str] = [
+    "ADDRESSLINE1",
+    "ADDRESSLINE2",
+    "POSTALCODE",
+    "CONTACTFIRSTNAME",
+    "CONTACTLASTNAME",
+    "DEALSIZE",
+]
+
+NUMERIC_COLUMNS: List[str] = [
+    "SALES",
+    "PRICEEACH",
+    "MSRP",
+    "QUANTITYORDERED",
+    "LATITUDE",
+    "LONGITUDE",
+]
+
+TEXT_COLUMNS: List[str] = [
+    "STATUS",
+    "COUNTRY",
+    "CITY",
+    "PRODUCTLINE",
+    "PRODUCTCODE",
+]
+
+# Pin dtypes of sparse text columns so every chunk parses them the same way
+RAW_DTYPES: Dict[str, str] = {
+    "PHONE": "str",
+    "ADDRESSLINE2": "str",
+    "STATE": "str",
+    "POSTALCODE": "str",
+    "TERRITORY": "str",
+}
+
+# An order line is identified by its order number and line number; duplicates must also match on every other column
+ORDER_LINE_KEY: List[str] = ["ORDERNUMBER", "ORDERLINENUMBER"]
+ORDER_LINE_BITS = 16  # Low bits of the packed key holding ORDERLINENUMBER
+
+Stage = Callable[[pd.DataFrame, "CleaningContext"], pd.DataFrame]
+
+@dataclass
+class CleaningContext:
+    """State shared by the stages across every chunk of one cleaning run."""
+    geocode_cache_path: str | None = GEOCODE_CACHE_PATH
+    geocode_memo: Dict[Tuple[str, str, str], Tuple[float | None, float | None]] = field(default_factory=dict)
+    # Providers for locations missing from the cache, resolved by the async client (public Nominatim at 1 req/s)
+    geocode_providers: List[GeocodeProvider] = field(default_factory=lambda: [NominatimProvider()])
+    location_centroids_path: str | None = LOCATION_CENTROIDS_PATH
+    spatial_index: SpatialIndex | None = None  # Rebuilt whenever geocode_memo has grown since the last build
+    spatial_index_locations: int = 0  # len(geocode_memo) when spatial_index was built
+    coordinate_fills: Dict[str, int] = field(default_factory=dict)
+    phone_memo: Dict[Tuple[str, str, str], str] = field(default_factory=dict)
+    # Order lines already written, as sorted packed ORDER_LINE_KEY values with the row digest first seen for each
+    seen_line_keys: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    seen_line_digests: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.uint64))
+    enrichment_hits: RuleHits = field(default_factory=dict)
+    memory_report: MemoryReport = field(default_factory=MemoryReport)
+    rows_in: int = 0
+    rows_out: int = 0
+
+def drop_columns(df: pd.DataFrame, context: CleaningContext) -> pd.DataFrame:
+    return df.drop(columns=COLUMNS_TO_DROP)
+
+def enrich_locations(df: pd.DataFrame, context: CleaningContext) -> pd.DataFrame:
+    """Canonicalize cities and fill blank TERRITORY from the enrichment rule tables."""
+    return enrich(df, ENRICHMENT_TABLES, hits=context.enrichment_hits)
+
+def join_geocodes(df: pd.DataFrame, context: CleaningContext) -> pd.DataFrame:
+    geocoding(df, cache_path=context.geocode_cache_path, memo=context.geocode_memo, providers=context.geocode_providers)
+    return df
+
+def fill_missing_coordinates(df: pd.DataFrame, context: CleaningContext) -> pd.DataFrame:
+    """Fill coordinates the geocoder could not resolve from the offline spatial index (city, then state / country centroid).
+
+    COORDINATE_SOURCE records where each row's coordinates came from. The
+    index is rebuilt when earlier chunks' geocode joins have added locations
+    to the memo, so later chunks can fill from them.
+    """
+    missing = df["LATITUDE"].isna() | df["LONGITUDE"].isna()
+    if not missing.any():
+        df["COORDINATE_SOURCE"] = pd.Series("geocoded", index=df.index, dtype="string")
+        return df
+    if context.spatial_index is None or len(context.geocode_memo) != context.spatial_index_locations:
+        resolved = pd.DataFrame(
+            [(*key, latitude, longitude) for key, (latitude, longitude) in context.geocode_memo.items()],
+            columns=["CITY", "STATE", "COUNTRY", "LATITUDE", "LONGITUDE"],
+        )
+        context.spatial_index = load_spatial_index(
+            cache_path=None, centroids_path=context.location_centroids_path, frames=[resolved]
+        )
+        context.spatial_index_locations = len(context.geocode_memo)
+    sources = context.spatial_index.fill_missing_coordinates(df)
+    df["COORDINATE_SOURCE"] = sources
+    for source, count in sources[missing].fillna("unresolved").value_counts().items():
+        metrics.count("coordinates_filled_total", int(count), source=source)
+        context.coordinate_fills[source] = context.coordinate_fills.get(source, 0) + int(count)
+    return df
+
+def normalize_phones(df: pd.DataFrame, context: CleaningContext) -> pd.DataFrame:
+    """Normalize phone numbers to E.164 format."""
+    df["PHONE"] = normalize_phones_e164(df["PHONE"], df["COUNTRY"], df["CITY"], memo=context.phone_memo)
+    return df
+
+def coerce_types(df: pd.DataFrame, context: CleaningContext) -> pd.DataFrame:
+    df["ORDERDATE"] = pd.to_datetime(df["ORDERDATE"], errors="coerce")
+    df[NUMERIC_COLUMNS] = df[NUMERIC_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    return df
+
+def strip_whitespace(df: pd.DataFrame, context: CleaningContext) -> pd.DataFrame:
+    for col in TEXT_COLUMNS:
+        df[col] = df[col].astype("string").str.strip()  # Missing values stay missing rather than "nan"
+    return df
+
+def _order_line_keys(df: pd.DataFrame) -> np.ndarray:
+    """ORDERNUMBER and ORDERLINENUMBER packed into one int64, or -1 when either is missing or does not fit.
+
+    The line number takes the low ORDER_LINE_BITS bits and the order number the
+    rest, so keys are collision-free for whole numbers 0 <= line < 2**16 and
+    0 <= order < 2**47; anything else is counted and left unkeyed.
+    """
+    order, line = (pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float) for col in ORDER_LINE_KEY)
+    present = ~(np.isnan(order) | np.isnan(line))
+    valid = (
+        present
+        & (order >= 0) & (order < 2.0 ** (63 - ORDER_LINE_BITS)) & (order == np.floor(order))
+        & (line >= 0) & (line < 2.0 ** ORDER_LINE_BITS) & (line == np.floor(line))
+    )
+    if (present & ~valid).any():
+        metrics.count("order_line_keys_out_of_range_total", int((present & ~valid).sum()))
+    keys = np.full(len(df), -1, dtype=np.int64)
+    keys[valid] = (order[valid].astype(np.int64) << ORDER_LINE_BITS) | line[valid].astype(np.int64)
+    return keys
+
+def drop_duplicate_rows(df: pd.DataFrame, context: CleaningContext) -> pd.DataFrame:
+    """Drop rows repeating an order line seen in this chunk or any earlier chunk.
+
+    A row is a duplicate only when its ORDERNUMBER / ORDERLINENUMBER was seen
+    before and its 64-bit row digest matches, so a digest collision alone can
+    never drop a distinct order line; rows sharing a key but differing
+    elsewhere are kept and counted as conflicts. The context keeps one packed
+    key and digest per order line in sorted NumPy arrays (16 bytes a line).
+
+    The first version of an order line wins: only the digest of the first row
+    seen for a key is stored, so exact copies of that version are dropped in
+    every later chunk, while copies of a conflicting later version are only
+    dropped within the chunk they share (and counted as conflicts again in
+    later chunks). Rows whose key is missing or out of range for packing are
+    only deduplicated within their chunk.
+    """
+    digests = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    keys = _order_line_keys(df)
+    pairs = pd.DataFrame({"key": keys, "digest": digests})
+    keep = ~pairs.duplicated().to_numpy()  # Exact repeats within the chunk
+
+    seen_keys, seen_digests = context.seen_line_keys, context.seen_line_digests
+    known = np.zeros(len(df), dtype=bool)
+    if len(seen_keys):
+        positions = np.minimum(np.searchsorted(seen_keys, keys), len(seen_keys) - 1)
+        known = (keys >= 0) & (seen_keys[positions] == keys)
+        keep &= ~(known & (seen_digests[positions] == digests))
+    first_of_key = (keys >= 0) & ~pairs["key"].duplicated().to_numpy()
+    conflicts = keep & (keys >= 0) & (known | ~first_of_key)
+
+    new_lines = first_of_key & ~known
+    merged_keys = np.concatenate([seen_keys, keys[new_lines]])
+    order = np.argsort(merged_keys, kind="stable")
+    context.seen_line_keys = merged_keys[order]
+    context.seen_line_digests = np.concatenate([seen_digests, digests[new_lines]])[order]
+    metrics.count("rows_dropped_total", int((~keep).sum()), reason="duplicate")
+    if conflicts.any():
+        metrics.count("order_line_conflicts_total", int(conflicts.sum()))
+    return df[keep]
+
+def compact_types(df: pd.DataFrame, context: CleaningContext) -> pd.DataFrame:
+    """Shared categoricals and narrow nullable ints for the chunk; per-column savings go to the context's report."""
+    return compact_frame(df, context.memory_report, downcast=False)
+
+CLEANING_STAGES: List[Stage] = [
+    drop_columns,
+    enrich_locations,
+    join_geocodes,
+    fill_missing_coordinates,
+    normalize_phones,
+    coerce_types,
+    strip_whitespace,
+    drop_duplicate_rows,
+    compact_types,
+]
+
+def apply_stages(df: pd.DataFrame, context: CleaningContext, stages: Iterable[Stage] = CLEANING_STAGES) -> pd.DataFrame:
+    """Run one frame (or chunk) through the cleaning stages in order."""
+    for stage in stages:
+        with metrics.timer("cleaning_step_seconds", step=stage.__name__):
+            df = stage(df, context)
+    return df
+
+def clean_csv(
+    input_path: str,
+    output_path: str,
+    chunksize: int = 100_000,
+    context: CleaningContext | None = None,
+    stages: Iterable[Stage] = CLEANING_STAGES,
+    dataset: str | None = None,
+) -> CleaningContext:
+    """Stream input_path through the cleaning stages chunk by chunk, appending each cleaned chunk to output_path.
+
+    When ``dataset`` is given, each chunk is also appended to that stage's Parquet file.
+    """
+    context = context or CleaningContext()
+    stages = list(stages)
+
+    reader = iter(pd.read_csv(input_path, encoding='latin-1', dtype=RAW_DTYPES, chunksize=chunksize))
+    writer = DatasetWriter(dataset) if dataset else None
+    chunk_number = 0
+    while True:
+        with metrics.timer("csv_parse_seconds"):
+            chunk = next(reader, None)
+        if chunk is None:
+            break
+        context.rows_in += len(chunk)
+        metrics.count("rows_read_total", len(chunk))
+        cleaned = apply_stages(chunk, context, stages)
+        context.rows_out += len(cleaned)
+        metrics.count("rows_written_total", len(cleaned))
+        with metrics.timer("output_write_seconds"):
+            cleaned.to_csv(output_path, index=False, mode="w" if chunk_number == 0 else "a", header=chunk_number == 0)
+            if writer:
+                writer.write(cleaned)
+        print(f"  chunk {chunk_number + 1}: {context.rows_in:,} rows read, {context.rows_out:,} rows written")
+        metrics.memory_snapshot("chunk_end")
+        chunk_number += 1
+
+    if writer:
+        writer.close()
+    return context
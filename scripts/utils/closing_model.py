@@ -0,0 +1,57 @@
+from __future__ import annotations
+from typing import Sequence
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, OrdinalEncoder
+
+# "gradient_boosting": exact-split GradientBoostingClassifier on one-hot PRODUCTLINE (single-threaded)
+# "hist_gradient_boosting": histogram-binned, multi-threaded HistGradientBoostingClassifier
+#     with native categorical splits on the ordinal-coded PRODUCTLINE
+CLOSING_MODEL_BACKENDS = ("gradient_boosting", "hist_gradient_boosting")
+
+def _to_float64(X) -> np.ndarray:
+    """Numeric passthrough as float64; nullable integer columns would otherwise stack into an object matrix."""
+    return pd.DataFrame(X).astype("float64").to_numpy()
+
+def build_closing_model(
+    backend: str,
+    categorical_cols: Sequence[str] = ("PRODUCTLINE",),
+    random_state: int = 42,
+) -> Pipeline:
+    """Unfitted Pipeline(preprocessor, classifier) for the requested backend.
+
+    Both backends take the same raw feature frame and expose ``predict_proba``,
+    so training, saving, scoring and the discount sweep don't depend on the choice.
+    """
+    categorical_cols = list(categorical_cols)
+    if backend == "gradient_boosting":
+        preprocessor = ColumnTransformer(
+            transformers=[
+                ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_cols),
+            ],
+            remainder='passthrough'
+        )
+        classifier = GradientBoostingClassifier(random_state=random_state)
+    elif backend == "hist_gradient_boosting":
+        # Categories become integer codes in the leading columns; unseen ones map to NaN,
+        # which the categorical splits route like missing values
+        preprocessor = ColumnTransformer(
+            transformers=[
+                ('cat', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=np.nan), categorical_cols),
+            ],
+            remainder=FunctionTransformer(_to_float64, feature_names_out='one-to-one')
+        )
+        classifier = HistGradientBoostingClassifier(
+            categorical_features=list(range(len(categorical_cols))),
+            random_state=random_state,
+        )
+    else:
+        raise ValueError(f"Unknown closing model backend {backend!r}; expected one of {CLOSING_MODEL_BACKENDS}")
+
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('classifier', classifier),
+    ])
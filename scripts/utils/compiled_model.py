@@ -0,0 +1,256 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Sequence
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+
+COMPILED_MODEL_PATH = "../models/sales_closing_model_compiled.npz"
+BATCH_CHUNK_ROWS = 2048
+
+class CompiledClosingModel:
+    """Array-backed copy of the fitted Pipeline(ColumnTransformer + GradientBoostingClassifier).
+
+    All trees are flattened into shared node arrays (feature, threshold, left,
+    right, value) with one root offset per tree, and each categorical column is
+    mapped to an integer index. Evaluation walks every tree for every row with
+    NumPy fancy indexing, reproducing ``model.predict_proba(X)[:, 1]``.
+    """
+
+    def __init__(
+        self,
+        numeric_cols: Sequence[str],
+        categorical_cols: Sequence[str],
+        categories: Sequence[Sequence[str]],
+        categorical_offsets: np.ndarray,
+        numeric_offsets: np.ndarray,
+        n_transformed: int,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        learning_rate: float,
+        baseline: float,
+    ):
+        self.numeric_cols = list(numeric_cols)
+        self.categorical_cols = list(categorical_cols)
+        self.categories = [list(values) for values in categories]
+        self.category_index: List[Dict[str, int]] = [
+            {category: idx for idx, category in enumerate(values)} for values in self.categories
+        ]
+        self.categorical_offsets = np.asarray(categorical_offsets, dtype=np.int64)
+        self.numeric_offsets = np.asarray(numeric_offsets, dtype=np.int64)
+        self.n_transformed = int(n_transformed)
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.learning_rate = float(learning_rate)
+        self.baseline = float(baseline)
+        self.children = np.column_stack([left, right]).ravel()
+        self._node_lists = None  # Plain-Python copies of the node arrays for predict_one
+
+    @classmethod
+    def from_pipeline(cls, model) -> "CompiledClosingModel":
+        """Compile a fitted binary Pipeline of one-hot/passthrough preprocessing and gradient boosting."""
+        preprocessor = model.named_steps["preprocessor"]
+        classifier = model.named_steps["classifier"]
+        feature_names = list(model.feature_names_in_)
+        if not isinstance(classifier, GradientBoostingClassifier):
+            raise ValueError(f"Only GradientBoostingClassifier models can be compiled, not {type(classifier).__name__}")
+        if classifier.n_trees_per_iteration_ != 1:
+            raise ValueError("Only binary GradientBoostingClassifier models can be compiled")
+
+        categorical_cols, categories, categorical_offsets = [], [], []
+        numeric_cols, numeric_offsets = [], []
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            columns = [feature_names[col] if isinstance(col, (int, np.integer)) else col for col in columns]
+            if transformer == "drop" or not columns:
+                continue
+            if isinstance(transformer, OneHotEncoder):
+                if transformer.drop_idx_ is not None:
+                    raise ValueError("OneHotEncoder(drop=...) is not supported")
+                for col, values in zip(columns, transformer.categories_):
+                    categorical_cols.append(col)
+                    categories.append([str(value) for value in values])
+                    categorical_offsets.append(offset)
+                    offset += len(values)
+            elif transformer == "passthrough" or (isinstance(transformer, FunctionTransformer) and transformer.func is None):
+                for col in columns:
+                    numeric_cols.append(col)
+                    numeric_offsets.append(offset)
+                    offset += 1
+            else:
+                raise ValueError(f"Cannot compile transformer {name!r} of type {type(transformer).__name__}")
+
+        # Flatten every tree into shared arrays; leaves point at themselves so
+        # evaluation can run a fixed number of steps
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        node_offset = 0
+        max_depth = 0
+        for estimator in classifier.estimators_[:, 0]:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + node_offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + node_offset)
+            values.append(tree.value[:, 0, 0])
+            roots.append(node_offset)
+            node_offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        # Initial raw prediction (log-odds of the class prior) the trees are added to, recovered through the
+        # public API as the decision function on one row minus the learning-rate-scaled sum of its tree outputs
+        probe = np.zeros((1, offset), dtype=np.float32)
+        tree_sum = sum(estimator.predict(probe)[0] for estimator in classifier.estimators_[:, 0])
+        baseline = float(classifier.decision_function(probe)[0]) - classifier.learning_rate * tree_sum
+
+        return cls(
+            numeric_cols=numeric_cols,
+            categorical_cols=categorical_cols,
+            categories=categories,
+            categorical_offsets=np.array(categorical_offsets),
+            numeric_offsets=np.array(numeric_offsets),
+            n_transformed=offset,
+            feature=np.concatenate(features).astype(np.int64),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.int64),
+            right=np.concatenate(rights).astype(np.int64),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.int64),
+            max_depth=max_depth,
+            learning_rate=classifier.learning_rate,
+            baseline=baseline,
+        )
+
+    def save(self, path: str = COMPILED_MODEL_PATH) -> None:
+        np.savez(
+            path,
+            numeric_cols=np.array(self.numeric_cols),
+            categorical_cols=np.array(self.categorical_cols),
+            category_values=np.array([value for values in self.categories for value in values], dtype=str),
+            category_counts=np.array([len(values) for values in self.categories], dtype=np.int64),
+            categorical_offsets=self.categorical_offsets,
+            numeric_offsets=self.numeric_offsets,
+            n_transformed=self.n_transformed,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            learning_rate=self.learning_rate,
+            baseline=self.baseline,
+        )
+
+    @classmethod
+    def load(cls, path: str = COMPILED_MODEL_PATH) -> "CompiledClosingModel":
+        arrays = np.load(path)
+        category_bounds = np.concatenate([[0], np.cumsum(arrays["category_counts"])])
+        return cls(
+            numeric_cols=arrays["numeric_cols"].tolist(),
+            categorical_cols=arrays["categorical_cols"].tolist(),
+            categories=[
+                arrays["category_values"][start:stop].tolist()
+                for start, stop in zip(category_bounds[:-1], category_bounds[1:])
+            ],
+            categorical_offsets=arrays["categorical_offsets"],
+            numeric_offsets=arrays["numeric_offsets"],
+            n_transformed=arrays["n_transformed"].item(),
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            left=arrays["left"],
+            right=arrays["right"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            max_depth=arrays["max_depth"].item(),
+            learning_rate=arrays["learning_rate"].item(),
+            baseline=arrays["baseline"].item(),
+        )
+
+    def encode(self, frame: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """Split a raw feature frame into (numeric float array, categorical int index array); unknown categories are -1."""
+        numeric = frame[self.numeric_cols].to_numpy(dtype=np.float64)
+        codes = np.column_stack([
+            pd.Categorical(frame[col].astype(str), categories=values).codes
+            for col, values in zip(self.categorical_cols, self.categories)
+        ]) if self.categorical_cols else np.empty((len(frame), 0), dtype=np.int64)
+        return numeric, codes.astype(np.int64)
+
+    def _transform(self, numeric: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        n_rows = numeric.shape[0]
+        # Trees compare float32 inputs against float64 thresholds, as sklearn does
+        X = np.zeros((n_rows, self.n_transformed), dtype=np.float32)
+        X[:, self.numeric_offsets] = numeric
+        rows = np.arange(n_rows)
+        for col_idx, offset in enumerate(self.categorical_offsets):
+            known = codes[:, col_idx] >= 0  # Unknown categories encode as all zeros, like handle_unknown="ignore"
+            X[rows[known], offset + codes[known, col_idx]] = 1.0
+        return X
+
+    def _raw_predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+
+        # Step every (row, tree) pair one level down per iteration; children[2 * node + 1] is the right child
+        nodes = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            goes_right = ~(flat_X[row_offsets + self.feature[nodes]] <= self.threshold[nodes])
+            nodes = self.children[2 * nodes + goes_right]
+
+        # Accumulate stage by stage in the same order as sklearn for identical rounding
+        raw = np.full(n_rows, self.baseline)
+        for tree_leaf_values in self.value[nodes.T]:
+            raw += self.learning_rate * tree_leaf_values
+        return raw
+
+    def predict_proba_arrays(self, numeric: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Close probability for a batch given encoded arrays (see ``encode``)."""
+        numeric, codes = np.atleast_2d(numeric), np.atleast_2d(codes)
+        raw = np.empty(numeric.shape[0])
+        # Small chunks keep the (rows x trees) node arrays cache-resident
+        for start in range(0, numeric.shape[0], BATCH_CHUNK_ROWS):
+            stop = start + BATCH_CHUNK_ROWS
+            raw[start:stop] = self._raw_predict_chunk(self._transform(numeric[start:stop], codes[start:stop]))
+        return expit(raw)
+
+    def predict_proba(self, frame: pd.DataFrame) -> np.ndarray:
+        """Close probability for each row of a raw feature frame."""
+        return self.predict_proba_arrays(*self.encode(frame))
+
+    def predict_one(self, row: Dict[str, Any]) -> float:
+        """Close probability for a single raw feature dict, walking the trees in plain Python."""
+        if self._node_lists is None:
+            self._node_lists = (
+                self.feature.tolist(), self.threshold.tolist(),
+                self.left.tolist(), self.right.tolist(), self.value.tolist(),
+            )
+        feature, threshold, left, right, value = self._node_lists
+
+        x = [0.0] * self.n_transformed
+        for col, offset in zip(self.numeric_cols, self.numeric_offsets.tolist()):
+            x[offset] = float(np.float32(row[col]))
+        for col, index, offset in zip(self.categorical_cols, self.category_index, self.categorical_offsets.tolist()):
+            code = index.get(str(row[col]), -1)
+            if code >= 0:
+                x[offset + code] = 1.0
+
+        raw = self.baseline
+        for root in self.roots.tolist():
+            node = root
+            while left[node] != node:
+                node = left[node] if x[feature[node]] <= threshold[node] else right[node]
+            raw += self.learning_rate * value[node]
+        return float(expit(raw))
@@ -0,0 +1,263 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+import operator
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Stage outputs, as paths without an extension. Each stage is written as Parquet
+# next to the CSV the notebook and older tooling still read.
+CLEANED = "../data/sales_data_sample_cleaned"
+MODEL_READY = "../data/sales_pricing_model_ready"
+MODEL_READY_V2 = "../data/sales_pricing_model_ready_v2"
+
+# Typed schema shared by every stage output; columns absent from a frame are skipped
+CATEGORICAL_COLUMNS: Dict[str, List[str] | None] = {
+    "PRODUCTLINE": None,  # Categories taken from the shared dictionary, extended by the data
+    "STATUS": None,
+    "PRODUCTCODE": None,
+    "CUSTOMERNAME": None,
+    "CITY": None,
+    "STATE": None,
+    "COUNTRY": None,
+    "TERRITORY": None,
+    "DEAL_SIZE_BUCKETS": ["Small", "Medium", "Large"],
+    "COORDINATE_SOURCE": ["geocoded", "city", "state", "country"],
+}
+ORDERED_CATEGORICAL_COLUMNS = {"DEAL_SIZE_BUCKETS"}
+DATETIME_COLUMNS: List[str] = ["ORDERDATE"]
+# Nullable integer columns with the narrowest type their domain fits; wider data widens the column instead
+NULLABLE_INT_COLUMNS: Dict[str, str] = {
+    "ORDERNUMBER": "Int32",
+    "ORDERLINENUMBER": "Int16",
+    "QUANTITYORDERED": "Int16",
+    "QTR_ID": "Int8",
+    "MONTH_ID": "Int8",
+    "YEAR_ID": "Int16",
+    "IS_CLOSED": "Int8",
+    "DISCOUNT_OUTLIER_FLAG": "Int8",
+    "IS_Q4": "Int8",
+    "IS_YEAR_END": "Int8",
+    "STATUS_CLASS": "Int8",
+}
+NULLABLE_INT_WIDTHS = ["Int8", "Int16", "Int32", "Int64"]
+
+# (column, op, value) predicates, ANDed together, in pyarrow's filter syntax
+Filter = Tuple[str, str, Any]
+
+FILTER_OPERATORS = {
+    "==": operator.eq,
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda series, values: series.isin(values),
+    "not in": lambda series, values: ~series.isin(values),
+}
+
+def parquet_path(stage: str) -> Path:
+    return Path(f"{stage}.parquet")
+
+def csv_path(stage: str) -> Path:
+    return Path(f"{stage}.csv")
+
+class CategoryDictionaries:
+    """Append-only category lists per column.
+
+    A value keeps the same category code in every chunk and stage output of a
+    run: new values are appended (sorted within the batch that introduced
+    them) and existing codes never move.
+    """
+
+    def __init__(self):
+        self.categories: Dict[str, pd.Index] = {}
+
+    def encode(self, col: str, values: pd.Series) -> pd.Categorical:
+        known = self.categories.get(col, pd.Index([], dtype=object))
+        seen = pd.Index(values.dropna().unique().tolist(), dtype=object)
+        new = seen.difference(known, sort=False).sort_values()
+        if len(new) or col not in self.categories:
+            known = self.categories[col] = known.append(new)
+        return pd.Categorical(values, categories=known)
+
+SHARED_CATEGORIES = CategoryDictionaries()
+
+def _nullable_int(values: pd.Series, dtype: str) -> pd.Series:
+    """Cast to the declared nullable int type, widening when the data would not fit."""
+    values = pd.to_numeric(values, errors="coerce")
+    lowest, highest = values.min(), values.max()
+    for width in NULLABLE_INT_WIDTHS[NULLABLE_INT_WIDTHS.index(dtype):]:
+        bounds = np.iinfo(width.lower())
+        if pd.isna(lowest) or (bounds.min <= lowest and highest <= bounds.max):
+            return values.astype(width)
+    return values.astype("Int64")
+
+def apply_schema(df: pd.DataFrame, categories: CategoryDictionaries = SHARED_CATEGORIES) -> pd.DataFrame:
+    """Cast known columns to categoricals, datetimes, and nullable ints in place. Returns df."""
+    for col, fixed_categories in CATEGORICAL_COLUMNS.items():
+        if col in df.columns:
+            if fixed_categories is None:
+                df[col] = categories.encode(col, df[col])
+            else:
+                df[col] = pd.Categorical(df[col], categories=fixed_categories, ordered=col in ORDERED_CATEGORICAL_COLUMNS)
+
+    for col in DATETIME_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+
+    for col, dtype in NULLABLE_INT_COLUMNS.items():
+        if col in df.columns:
+            df[col] = _nullable_int(df[col], dtype)
+
+    return df
+
+@dataclass
+class MemoryReport:
+    """Per-column memory before and after compaction, accumulated over every frame (or chunk) compacted."""
+    bytes_before: Dict[str, int] = field(default_factory=dict)
+    bytes_after: Dict[str, int] = field(default_factory=dict)
+    dtype_before: Dict[str, str] = field(default_factory=dict)
+    dtype_after: Dict[str, str] = field(default_factory=dict)
+
+    def add(self, before: pd.DataFrame, after: pd.DataFrame) -> None:
+        for frame, totals, dtypes in [(before, self.bytes_before, self.dtype_before), (after, self.bytes_after, self.dtype_after)]:
+            for col, nbytes in frame.memory_usage(deep=True, index=False).items():
+                totals[col] = totals.get(col, 0) + int(nbytes)
+                dtypes.setdefault(col, str(frame[col].dtype))
+
+    def to_frame(self) -> pd.DataFrame:
+        report = pd.DataFrame({
+            "dtype_before": pd.Series(self.dtype_before),
+            "dtype_after": pd.Series(self.dtype_after),
+            "mb_before": pd.Series(self.bytes_before) / 1024 ** 2,
+            "mb_after": pd.Series(self.bytes_after) / 1024 ** 2,
+        })
+        report.loc["TOTAL"] = ["", "", report["mb_before"].sum(), report["mb_after"].sum()]
+        report["saved"] = (1 - report["mb_after"] / report["mb_before"]).map("{:.0%}".format)
+        return report.round(3)
+
+def _float32_is_lossless(values: pd.Series) -> bool:
+    original = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    as_float32 = original.astype(np.float32).astype(np.float64)
+    return bool(np.all((as_float32 == original) | np.isnan(original)))
+
+def compact_frame(
+    df: pd.DataFrame,
+    report: MemoryReport | None = None,
+    downcast: bool = True,
+    categories: CategoryDictionaries = SHARED_CATEGORIES,
+) -> pd.DataFrame:
+    """Schema types plus the cheapest lossless representation for everything else. Returns a new frame.
+
+    Schema columns become shared categoricals and narrow nullable ints, other
+    text becomes the nullable "string" dtype (missing stays missing instead of
+    the literal "nan"), other ints are downcast, and floats drop to float32
+    where every value round-trips exactly. Those last two depend on the data,
+    so chunked writers pass ``downcast=False`` to keep every chunk on the first
+    chunk's Parquet schema.
+    """
+    compact = apply_schema(df.copy(), categories)
+    for col in compact.columns:
+        if col in CATEGORICAL_COLUMNS or col in NULLABLE_INT_COLUMNS:
+            continue
+        values = compact[col]
+        if pd.api.types.is_string_dtype(values) or values.dtype == object:
+            compact[col] = values.astype("string")
+        elif pd.api.types.is_bool_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+            continue
+        elif not downcast:
+            continue
+        elif pd.api.types.is_integer_dtype(values):
+            compact[col] = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_float_dtype(values) and _float32_is_lossless(values):
+            compact[col] = values.astype("Float32" if isinstance(values.dtype, pd.Float64Dtype) else np.float32)
+    if report is not None:
+        report.add(df, compact)
+    return compact
+
+def _apply_filters(df: pd.DataFrame, filters: Sequence[Filter]) -> pd.DataFrame:
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        mask &= FILTER_OPERATORS[op](df[col], value).fillna(False).astype(bool)
+    return df[mask].reset_index(drop=True)
+
+def write_dataset(df: pd.DataFrame, stage: str) -> Path:
+    """Write a stage output as Parquet with the shared typed schema."""
+    path = parquet_path(stage)
+    apply_schema(df.copy()).to_parquet(path, index=False)
+    return path
+
+def read_dataset(
+    stage: str,
+    columns: Sequence[str] | None = None,
+    filters: Sequence[Filter] | None = None,
+) -> pd.DataFrame:
+    """Load a stage output, reading only ``columns`` and rows matching ``filters``.
+
+    Reads the Parquet file when it exists, pushing the projection and predicates
+    down to pyarrow; otherwise falls back to the stage CSV with the same schema.
+    """
+    columns = list(columns) if columns is not None else None
+    filters = list(filters) if filters else None
+
+    path = parquet_path(stage)
+    if path.exists():
+        return apply_schema(pd.read_parquet(path, columns=columns, filters=filters))
+
+    # CSV fallback: filter columns have to be parsed even when not projected
+    filter_columns = [col for col, _, _ in filters or []]
+    usecols = list(dict.fromkeys(columns + filter_columns)) if columns is not None else None
+    df = apply_schema(pd.read_csv(csv_path(stage), usecols=usecols, dtype={"PHONE": "string"}))
+    if filters:
+        df = _apply_filters(df, filters)
+    return df[columns] if columns is not None else df
+
+# Category codes in chunked Parquet output; pandas picks int8 codes for up to 127 categories, which a later chunk can outgrow
+CHUNKED_DICTIONARY_INDEX_TYPE = pa.int32()
+
+def chunked_schema(schema: pa.Schema) -> pa.Schema:
+    """``schema`` with every dictionary (categorical) column on a CHUNKED_DICTIONARY_INDEX_TYPE index."""
+    fields = [
+        arrow_field.with_type(pa.dictionary(CHUNKED_DICTIONARY_INDEX_TYPE, arrow_field.type.value_type, arrow_field.type.ordered))
+        if pa.types.is_dictionary(arrow_field.type) else arrow_field
+        for arrow_field in schema
+    ]
+    return pa.schema(fields, metadata=schema.metadata)
+
+class DatasetWriter:
+    """Append chunks of one stage to a single Parquet file, one row group per chunk.
+
+    Narrow ints and category codes depend on the data in a chunk, so a later
+    chunk could outgrow the first chunk's schema. The file schema pins them
+    instead: nullable int columns are written as Int64 and categoricals on an
+    int32 dictionary index. ``read_dataset`` narrows them again on load.
+    """
+
+    def __init__(self, stage: str):
+        self.path = parquet_path(stage)
+        self.schema: pa.Schema | None = None
+        self.writer: pq.ParquetWriter | None = None
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        chunk = apply_schema(chunk.copy())
+        widest = {col: NULLABLE_INT_WIDTHS[-1] for col in NULLABLE_INT_COLUMNS if col in chunk}
+        table = pa.Table.from_pandas(chunk.astype(widest), preserve_index=False)
+        if self.writer is None:
+            self.schema = chunked_schema(table.schema)
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table.select(self.schema.names).cast(self.schema))
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
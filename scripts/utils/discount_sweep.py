@@ -0,0 +1,81 @@
+from __future__ import annotations
+from typing import Callable, Dict, Sequence
+import numpy as np
+import pandas as pd
+
+DISCOUNT_COL = "DISCOUNT_PCT_CLIPPED"
+DEFAULT_DISCOUNT_GRID = np.arange(0, 41, 1.0)  # 0% to 40% discount
+MAX_SWEEP_ROWS = 1_000_000  # Upper bound on rows scored per predict call
+
+def _close_probability(model) -> Callable[[pd.DataFrame], np.ndarray]:
+    return lambda X: model.predict_proba(X)[:, 1]
+
+def build_sweep_frame(
+    contexts: pd.DataFrame,
+    discount_grid: np.ndarray,
+    feature_cols: Sequence[str],
+    discount_col: str = DISCOUNT_COL,
+) -> pd.DataFrame:
+    """Cross N contexts with G discounts into an (N*G)-row feature frame, context-major."""
+    n_contexts, n_discounts = len(contexts), len(discount_grid)
+    columns = {}
+    for col in feature_cols:
+        if col == discount_col:
+            columns[col] = np.broadcast_to(discount_grid, (n_contexts, n_discounts)).ravel()
+        else:
+            values = contexts[col].to_numpy()
+            columns[col] = np.broadcast_to(values[:, None], (n_contexts, n_discounts)).ravel()
+    return pd.DataFrame(columns, columns=list(feature_cols))
+
+def sweep_discounts(
+    model,
+    contexts: pd.DataFrame,
+    feature_cols: Sequence[str],
+    discount_grid: np.ndarray = DEFAULT_DISCOUNT_GRID,
+    discount_col: str = DISCOUNT_COL,
+    max_rows: int = MAX_SWEEP_ROWS,
+    predict: Callable[[pd.DataFrame], np.ndarray] | None = None,
+    return_curves: bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """Recommend a discount for each of N deal contexts by scoring every discount on the grid.
+
+    Expected revenue is ``PRICEEACH * QUANTITYORDERED * (1 - discount / 100) * P(close)``.
+    Contexts are processed in chunks so at most ``max_rows`` sweep rows exist at once.
+    ``predict`` maps a feature frame to close probabilities and defaults to the
+    model's ``predict_proba(X)[:, 1]``.
+
+    Returns one row per context (BEST_DISCOUNT, BEST_EXPECTED_REVENUE,
+    BEST_CLOSE_PROBABILITY), plus the N x G probability and revenue matrices
+    when ``return_curves`` is set.
+    """
+    discount_grid = np.asarray(discount_grid, dtype=float)
+    predict = predict or _close_probability(model)
+    n_contexts, n_discounts = len(contexts), len(discount_grid)
+    contexts_per_chunk = max(1, max_rows // max(n_discounts, 1))
+
+    close_probabilities = np.empty((n_contexts, n_discounts))
+    for start in range(0, n_contexts, contexts_per_chunk):
+        chunk = contexts.iloc[start:start + contexts_per_chunk]
+        sweep = build_sweep_frame(chunk, discount_grid, feature_cols, discount_col)
+        close_probabilities[start:start + len(chunk)] = np.asarray(predict(sweep)).reshape(len(chunk), n_discounts)
+
+    unit_revenue = (
+        contexts["PRICEEACH"].to_numpy(dtype=float) * contexts["QUANTITYORDERED"].to_numpy(dtype=float)
+    )
+    expected_revenue = unit_revenue[:, None] * (1 - discount_grid / 100)[None, :] * close_probabilities
+
+    best_idx = np.argmax(expected_revenue, axis=1)
+    rows = np.arange(n_contexts)
+    recommendations = pd.DataFrame({
+        "BEST_DISCOUNT": discount_grid[best_idx],
+        "BEST_EXPECTED_REVENUE": expected_revenue[rows, best_idx],
+        "BEST_CLOSE_PROBABILITY": close_probabilities[rows, best_idx],
+    }, index=contexts.index)
+
+    if return_curves:
+        return recommendations, {
+            "discount_grid": discount_grid,
+            "close_probabilities": close_probabilities,
+            "expected_revenue": expected_revenue,
+        }
+    return recommendations
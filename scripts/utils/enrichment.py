@@ -0,0 +1,148 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+import pandas as pd
+from utils.instrumentation import metrics
+from utils.locations import location_index
+
+RuleKey = Tuple[str, ...]
+RuleHits = Dict[Tuple[str, str], int]  # (table name, rule key text) -> rows changed (rows flagged, for *_suggestion)
+
+@dataclass(frozen=True)
+class RuleTable:
+    """Lookup rules that set ``target`` from the values of the ``keys`` columns.
+
+    Rules are matched by one hash join over the (stripped) key columns, so a
+    table costs O(rows) no matter how many rules it holds. With
+    ``fill_missing_only`` existing non-blank values in ``target`` are kept.
+    """
+    name: str
+    keys: Tuple[str, ...]
+    target: str
+    rules: Dict[RuleKey, str]
+    fill_missing_only: bool = False
+
+    def apply(self, df: pd.DataFrame) -> np.ndarray:
+        """Apply the rules in place; returns per-rule hit counts in ``rules`` order."""
+        rule_keys = list(self.rules)
+        key_columns = [df[col].astype("string").str.strip() for col in self.keys]
+        if len(self.keys) == 1:
+            positions = pd.Index([key[0] for key in rule_keys]).get_indexer(key_columns[0])
+        else:
+            positions = pd.MultiIndex.from_tuples(rule_keys).get_indexer(
+                pd.MultiIndex.from_arrays(key_columns)
+            )
+
+        matched = positions >= 0
+        if self.fill_missing_only and self.target in df:
+            current = df[self.target]
+            matched &= (current.isna() | (current.astype("string").str.strip() == "")).to_numpy(dtype=bool)
+        if self.target not in df:
+            df[self.target] = pd.Series(pd.NA, index=df.index, dtype="string")
+
+        values = np.array(list(self.rules.values()), dtype=object)
+        if matched.any():
+            df.loc[matched, self.target] = values[positions[matched]]
+        return np.bincount(positions[matched], minlength=len(rule_keys))
+
+# Sales territory per country, only filled where the extract left TERRITORY blank
+COUNTRY_TERRITORIES = RuleTable(
+    name="country_territory",
+    keys=("COUNTRY",),
+    target="TERRITORY",
+    rules={
+        ("USA",): "NA",
+        ("Canada",): "NA",
+        ("Australia",): "APAC",
+        ("Singapore",): "APAC",
+        ("Japan",): "Japan",
+        ("Philippines",): "Japan",
+        ("Austria",): "EMEA",
+        ("Belgium",): "EMEA",
+        ("Denmark",): "EMEA",
+        ("Finland",): "EMEA",
+        ("France",): "EMEA",
+        ("Germany",): "EMEA",
+        ("Ireland",): "EMEA",
+        ("Italy",): "EMEA",
+        ("Norway",): "EMEA",
+        ("Spain",): "EMEA",
+        ("Sweden",): "EMEA",
+        ("Switzerland",): "EMEA",
+        ("UK",): "EMEA",
+    },
+    fill_missing_only=True,
+)
+
+ENRICHMENT_TABLES: List[RuleTable] = [COUNTRY_TERRITORIES]
+
+def _record_hits(table: str, rule: str, count: int, hits: RuleHits | None) -> None:
+    metrics.count("enrichment_rule_hits_total", count, table=table, rule=rule)
+    if hits is not None:
+        hits[(table, rule)] = hits.get((table, rule), 0) + count
+
+def suggest_locations(df: pd.DataFrame, hits: RuleHits | None = None) -> None:
+    """Record close known spellings for COUNTRY / CITY values that don't resolve, without changing ``df``.
+
+    Suggestions land in ``hits`` as ``country_suggestion`` / ``city_suggestion``
+    rules of the form ``"Bolton -> Boston"`` so a reviewer can promote real
+    misspellings to the alias tables.
+    """
+    index = location_index()
+    pairs = df[["COUNTRY", "CITY"]].astype("string").value_counts(dropna=True)
+    for (country, city), count in pairs.items():
+        suggestion = index.suggest_country(country)
+        if suggestion is not None:
+            table, rule = "country_suggestion", f"{country} -> {suggestion}"
+        else:
+            suggestion = index.suggest_city(country, city)
+            if suggestion is None:
+                continue
+            table, rule = "city_suggestion", f"{country}|{city} -> {suggestion}"
+        metrics.count("location_suggestions_total", int(count), table=table)
+        if hits is not None:
+            hits[(table, rule)] = hits.get((table, rule), 0) + int(count)
+
+def canonicalize_locations(df: pd.DataFrame, hits: RuleHits | None = None) -> pd.DataFrame:
+    """Rewrite COUNTRY and CITY with exact or alias matches in the shared location index, in place.
+
+    Unknown spellings are left as they are and reported by ``suggest_locations``.
+    """
+    suggest_locations(df, hits)
+    countries, cities = location_index().canonicalize(df["COUNTRY"], df["CITY"])
+    for column, canonical, table in [("COUNTRY", countries, "country_canonical"), ("CITY", cities, "city_canonical")]:
+        original = df[column]
+        changed = (canonical.notna() & (canonical.astype(str) != original.astype(str))).to_numpy(dtype=bool)
+        if not changed.any():
+            continue
+        for rule, count in original[changed].value_counts().items():
+            _record_hits(table, str(rule), int(count), hits)
+        df.loc[changed, column] = canonical[changed]
+    return df
+
+def enrich(df: pd.DataFrame, tables: Iterable[RuleTable] = ENRICHMENT_TABLES, hits: RuleHits | None = None) -> pd.DataFrame:
+    """Canonicalize locations, then apply every rule table in order, in place.
+
+    Running canonicalization first means territory rules only need
+    canonical keys. Per-rule hit counts accumulate into ``hits``.
+    """
+    if "COUNTRY" in df and "CITY" in df:
+        canonicalize_locations(df, hits)
+    for table in tables:
+        if not all(col in df for col in table.keys):
+            continue
+        counts = table.apply(df)
+        for key, count in zip(table.rules, counts.tolist()):
+            if not count:
+                continue
+            _record_hits(table.name, "|".join(key), count, hits)
+    return df
+
+def hits_report(hits: RuleHits) -> pd.DataFrame:
+    """Per-rule hit counts as a table sorted by table then hits."""
+    report = pd.DataFrame(
+        [(table, rule, count) for (table, rule), count in hits.items()],
+        columns=["table", "rule", "hits"],
+    )
+    return report.sort_values(["table", "hits"], ascending=[True, False]).reset_index(drop=True)
@@ -0,0 +1,352 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+import json
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from utils.datasets import (
+    MODEL_READY, MODEL_READY_V2, MemoryReport, apply_schema, compact_frame, csv_path, parquet_path, read_dataset,
+    write_dataset,
+)
+from utils.instrumentation import metrics
+from utils.quantile_sketch import QuantileSketch, load_sketches, save_sketches
+
+DEAL_SIZE_LABELS = ["Small", "Medium", "Large"]
+
+# Normalized STATUS -> risk class: 2 WON, 1 PENDING, 0 LOST (anything else is -1, unknown)
+STATUS_CLASSES: Dict[str, int] = {
+    "shipped": 2,
+    "resolved": 2,
+    "on hold": 1,
+    "in progress": 1,
+    "cancelled": 0,
+    "disputed": 0,
+}
+CLOSED_STATUSES = ["shipped", "resolved"]
+
+def map_status_to_class(status: str) -> int:
+    """Order STATUS -> risk class: 2 WON, 1 PENDING, 0 LOST, -1 unknown."""
+    s = str(status).strip().lower().replace("-", " ")
+    return STATUS_CLASSES.get(s, -1)
+
+def status_classes(status: pd.Series) -> pd.Series:
+    """Vectorized map_status_to_class: each distinct STATUS is normalized once, then mapped back by code."""
+    codes, uniques = pd.factorize(status)
+    normalized = pd.Series(uniques, dtype="string").str.strip().str.lower().str.replace("-", " ")
+    classes = normalized.map(STATUS_CLASSES).fillna(-1).to_numpy(dtype=np.int64)
+    return pd.Series(np.where(codes >= 0, classes[codes], -1), index=status.index, name="STATUS_CLASS")
+
+def bucket_by_edges(deal_size: pd.Series, edges: Sequence[float]) -> pd.Series:
+    """Small / Medium / Large buckets split at the two given DEAL_SIZE edges."""
+    return pd.cut(
+        deal_size,
+        bins=[-float("inf"), *edges, float("inf")],
+        labels=DEAL_SIZE_LABELS,
+        include_lowest=True
+    ).astype("category")
+
+def bucket_deal_size(deal_size: pd.Series, quantiles: Sequence[float]) -> pd.Series:
+    """Small / Medium / Large buckets split at the given DEAL_SIZE quantiles."""
+    return bucket_by_edges(deal_size, [deal_size.quantile(q) for q in quantiles])
+
+# ---- Feature registry: every derived column declares the columns it is computed from ----
+
+Columns = Dict[str, pd.Series]
+
+@dataclass(frozen=True)
+class Feature:
+    """A derived column computed from ``inputs`` (source columns or other features).
+
+    ``per_output`` features depend on the row set they are computed over (e.g.
+    quantile bucket edges), so they are computed after an output's row filters
+    instead of once over the whole read.
+    """
+    name: str
+    inputs: Tuple[str, ...]
+    compute: Callable[[Columns, Dict[str, Any]], pd.Series]
+    per_output: bool = False
+
+# ---- Quantile-derived parameters: taken from sketches so they work over chunks, workers and new months ----
+
+Sketches = Dict[str, QuantileSketch]  # "DISCOUNT_PERCENTAGE" over every row read, "<output>:DEAL_SIZE" over an output's rows
+
+def sketch_key(output: str | None, column: str) -> str:
+    return f"{output}:{column}" if output else column
+
+def _sketch(params: Dict[str, Any], key: str, values: pd.Series) -> QuantileSketch:
+    """The sketch already stored under ``key`` (training edges, a merged streaming pass), else one built over ``values``."""
+    sketches = params["sketches"]
+    if key not in sketches:
+        sketches[key] = QuantileSketch.from_values(values, seed=params.get("sketch_seed", 0))
+    return sketches[key]
+
+def discount_bounds(cols: Columns, params: Dict[str, Any]) -> Tuple[float, float]:
+    """Outlier / clip bounds: the fixed params, or DISCOUNT_PERCENTAGE quantiles when ``discount_outlier_quantiles`` is set."""
+    quantiles = params.get("discount_outlier_quantiles")
+    if not quantiles:
+        return params["discount_clip_lower"], params["discount_clip_upper"]
+    lower, upper = _sketch(params, sketch_key(None, "DISCOUNT_PERCENTAGE"), cols["DISCOUNT_PERCENTAGE"]).quantiles(quantiles)
+    return float(lower), float(upper)
+
+def deal_size_edges(cols: Columns, params: Dict[str, Any]) -> List[float]:
+    sketch = _sketch(params, sketch_key(params["output"], "DEAL_SIZE"), cols["DEAL_SIZE"])
+    return sketch.quantiles(params["deal_size_quantiles"]).tolist()
+
+@dataclass(frozen=True)
+class RowFilter:
+    """Rows kept by an output; ``name`` is the reason reported for the rows it drops."""
+    name: str
+    inputs: Tuple[str, ...]
+    keep: Callable[[Columns], np.ndarray]
+
+@dataclass(frozen=True)
+class FeatureSet:
+    """One model-ready output: its columns in order, its row filters in order, and the stage it is written to."""
+    name: str
+    columns: Tuple[str, ...]
+    filters: Tuple[RowFilter, ...]
+    stage: str
+
+def _discount_percentage(cols: Columns, params: Dict[str, Any]) -> pd.Series:
+    # Positive = discount, Negative = markup
+    return ((cols["MSRP"] - cols["PRICEEACH"]) / cols["MSRP"]) * 100.0
+
+def _discount_outlier_flag(cols: Columns, params: Dict[str, Any]) -> pd.Series:
+    discount = cols["DISCOUNT_PERCENTAGE"]
+    lower, upper = discount_bounds(cols, params)
+    return ((discount < lower) | (discount > upper)).astype(int)
+
+def _equals_flag(col: str, value: int) -> Callable[[Columns, Dict[str, Any]], pd.Series]:
+    return lambda cols, params: cols[col].eq(value).fillna(False).astype(int)
+
+FEATURES: Dict[str, Feature] = {feature.name: feature for feature in [
+    Feature("DISCOUNT_PERCENTAGE", ("MSRP", "PRICEEACH"), _discount_percentage),
+    Feature("DISCOUNT_PCT_CLIPPED", ("DISCOUNT_PERCENTAGE",), lambda cols, params: cols["DISCOUNT_PERCENTAGE"].clip(
+        *discount_bounds(cols, params))),
+    Feature("DISCOUNT_OUTLIER_FLAG", ("DISCOUNT_PERCENTAGE",), _discount_outlier_flag),
+    Feature("IS_CLOSED", ("STATUS",), lambda cols, params: cols["STATUS"].str.lower().isin(CLOSED_STATUSES).astype(int)),
+    Feature("STATUS_CLASS", ("STATUS",), lambda cols, params: status_classes(cols["STATUS"])),
+    Feature("DEAL_SIZE", ("PRICEEACH", "QUANTITYORDERED"), lambda cols, params: cols["PRICEEACH"] * cols["QUANTITYORDERED"]),
+    Feature("LOG_DEAL_SIZE", ("DEAL_SIZE",), lambda cols, params: np.log1p(cols["DEAL_SIZE"])),
+    Feature("PRICE_TO_MSRP_RATIO", ("PRICEEACH", "MSRP"), lambda cols, params: cols["PRICEEACH"] / cols["MSRP"]),
+    Feature("IS_Q4", ("QTR_ID",), _equals_flag("QTR_ID", 4)),
+    Feature("IS_YEAR_END", ("MONTH_ID",), _equals_flag("MONTH_ID", 12)),
+    Feature("DEAL_SIZE_BUCKETS", ("DEAL_SIZE",), lambda cols, params: bucket_by_edges(
+        cols["DEAL_SIZE"], deal_size_edges(cols, params)), per_output=True),
+]}
+
+# Source text columns are trimmed once when read
+TEXT_SOURCE_COLUMNS = ["STATUS", "PRODUCTLINE"]
+
+def _not_missing(columns: Sequence[str]) -> RowFilter:
+    return RowFilter(
+        "missing_essential",
+        tuple(columns),
+        lambda cols: np.logical_and.reduce([cols[col].notna().to_numpy(dtype=bool) for col in columns]),
+    )
+
+KNOWN_STATUS = RowFilter("unknown_status", ("STATUS_CLASS",), lambda cols: (cols["STATUS_CLASS"] >= 0).to_numpy(dtype=bool))
+POSITIVE_PRICES = RowFilter(
+    "non_positive_price",
+    ("MSRP", "PRICEEACH"),
+    lambda cols: ((cols["MSRP"] > 0) & (cols["PRICEEACH"] > 0)).fillna(False).to_numpy(dtype=bool),
+)
+
+MODEL_COLUMNS = (
+    "ORDERDATE", "YEAR_ID", "MONTH_ID", "QTR_ID",
+    "PRODUCTLINE", "QUANTITYORDERED",
+    "MSRP", "PRICEEACH",
+    "DISCOUNT_PERCENTAGE", "DISCOUNT_PCT_CLIPPED", "DISCOUNT_OUTLIER_FLAG",
+    "STATUS", "IS_CLOSED",
+)
+ESSENTIAL_COLUMNS = ("PRODUCTLINE", "QUANTITYORDERED", "MSRP", "PRICEEACH", "DISCOUNT_PCT_CLIPPED", "IS_CLOSED", "MONTH_ID", "YEAR_ID")
+
+FEATURE_SETS: Dict[str, FeatureSet] = {
+    "v1": FeatureSet(
+        name="v1",
+        columns=MODEL_COLUMNS + ("DEAL_SIZE", "DEAL_SIZE_BUCKETS"),
+        filters=(_not_missing(ESSENTIAL_COLUMNS),),
+        stage=MODEL_READY,
+    ),
+    # v2 adds exposure, pricing-health and time-pressure proxies plus the status risk class
+    "v2": FeatureSet(
+        name="v2",
+        columns=MODEL_COLUMNS + (
+            "DEAL_SIZE", "LOG_DEAL_SIZE", "PRICE_TO_MSRP_RATIO", "IS_Q4", "IS_YEAR_END",
+            "DEAL_SIZE_BUCKETS", "STATUS_CLASS",
+        ),
+        filters=(_not_missing(ESSENTIAL_COLUMNS + ("QTR_ID",)), KNOWN_STATUS, POSITIVE_PRICES),
+        stage=MODEL_READY_V2,
+    ),
+}
+
+def plan_features(names: Iterable[str]) -> List[Feature]:
+    """Features needed to produce ``names``, including the features they are computed from, in dependency order."""
+    plan: List[Feature] = []
+    visiting, planned = set(), set()
+
+    def visit(name: str) -> None:
+        if name in planned or name not in FEATURES:
+            return
+        if name in visiting:
+            raise ValueError(f"Feature dependency cycle through {name}")
+        visiting.add(name)
+        for dependency in FEATURES[name].inputs:
+            visit(dependency)
+        visiting.discard(name)
+        planned.add(name)
+        plan.append(FEATURES[name])
+
+    for name in names:
+        visit(name)
+    return plan
+
+def _requested_names(feature_sets: Sequence[FeatureSet]) -> List[str]:
+    names = [col for feature_set in feature_sets for col in feature_set.columns]
+    names += [col for feature_set in feature_sets for row_filter in feature_set.filters for col in row_filter.inputs]
+    return list(dict.fromkeys(names))
+
+def source_columns(feature_sets: Sequence[FeatureSet]) -> List[str]:
+    """Columns that have to be read from the cleaned data to build ``feature_sets``."""
+    names = _requested_names(feature_sets)
+    needed = names + [col for feature in plan_features(names) for col in feature.inputs]
+    return [col for col in dict.fromkeys(needed) if col not in FEATURES]
+
+def _row_features(source: pd.DataFrame, plan: Sequence[Feature], params: Dict[str, Any]) -> Columns:
+    cols: Columns = {col: source[col] for col in source.columns}
+    for col in TEXT_SOURCE_COLUMNS:
+        if col in cols:
+            cols[col] = cols[col].astype("string").str.strip()
+    for feature in plan:
+        if not feature.per_output:
+            cols[feature.name] = feature.compute(cols, params)
+    return cols
+
+def _kept_rows(cols: Columns, n_rows: int, feature_set: FeatureSet, count_drops: bool = True) -> np.ndarray:
+    keep = np.ones(n_rows, dtype=bool)
+    for row_filter in feature_set.filters:
+        passes = row_filter.keep(cols)
+        if count_drops:
+            metrics.count("rows_dropped_total", int((keep & ~passes).sum()), reason=row_filter.name, output=feature_set.name)
+        keep &= passes
+    return keep
+
+def build_feature_sets(
+    source: pd.DataFrame,
+    feature_sets: Sequence[FeatureSet],
+    params: Dict[str, Any],
+    sketches: Sketches | None = None,
+) -> Dict[str, pd.DataFrame]:
+    """Compute every requested feature once over ``source``, then cut each output from the shared columns.
+
+    Row-level features are computed a single time for all outputs; each output
+    then applies its filters in order (counting drops per reason) and computes
+    its ``per_output`` features over the rows it keeps. Quantile-derived edges
+    come from ``sketches`` when it already holds them (e.g. the persisted
+    training sketches, or a merged streaming pass); otherwise they are sketched
+    from this data and stored into ``sketches``.
+    """
+    params = {**params, "sketches": sketches if sketches is not None else {}}
+    plan = plan_features(_requested_names(feature_sets))
+    cols = _row_features(source, plan, params)
+
+    outputs = {}
+    for feature_set in feature_sets:
+        keep = _kept_rows(cols, len(source), feature_set)
+        per_output = [feature for feature in plan if feature.per_output and feature.name in feature_set.columns]
+        needed = [col for col in feature_set.columns if col not in FEATURES or not FEATURES[col].per_output]
+        needed += [col for feature in per_output for col in feature.inputs]
+        kept: Columns = {col: cols[col][keep].reset_index(drop=True) for col in dict.fromkeys(needed)}
+        output_params = {**params, "output": feature_set.name}
+        for feature in per_output:
+            kept[feature.name] = feature.compute(kept, output_params)
+        outputs[feature_set.name] = pd.DataFrame({col: kept[col] for col in feature_set.columns}, copy=False)
+    return outputs
+
+def sketch_frame(source: pd.DataFrame, feature_sets: Sequence[FeatureSet], params: Dict[str, Any], seed: int = 0) -> Sketches:
+    """Sketches of every quantile-derived input over ``source``, without materializing the outputs."""
+    sketches: Sketches = {}
+    params = {**params, "sketches": sketches, "sketch_seed": seed}
+    cols = _row_features(source, plan_features(_requested_names(feature_sets)), params)
+    for feature_set in feature_sets:
+        if "DEAL_SIZE_BUCKETS" in feature_set.columns:
+            keep = _kept_rows(cols, len(source), feature_set, count_drops=False)
+            sketches[sketch_key(feature_set.name, "DEAL_SIZE")] = QuantileSketch.from_values(cols["DEAL_SIZE"][keep], seed=seed)
+    if params.get("discount_outlier_quantiles"):
+        discount_bounds(cols, params)  # Makes sure the discount sketch exists even if no output needed the bounds
+    return sketches
+
+def merge_sketches(into: Sketches, other: Sketches) -> Sketches:
+    for key, sketch in other.items():
+        into[key] = into[key].merge(sketch) if key in into else sketch
+    return into
+
+def _row_group_sketches(task: Tuple[str, int, List[str], List[str], Dict[str, Any]]) -> Sketches:
+    path, row_group, columns, set_names, params = task
+    batch = apply_schema(pq.ParquetFile(path).read_row_group(row_group, columns=columns).to_pandas())
+    return sketch_frame(batch, [FEATURE_SETS[name] for name in set_names], params, seed=row_group)
+
+def stream_sketches(
+    stage: str,
+    feature_sets: Sequence[FeatureSet],
+    params: Dict[str, Any],
+    max_workers: int | None = None,
+) -> Sketches:
+    """Sketch a stage's Parquet file one row group at a time across a process pool, merged in row-group order.
+
+    Memory per worker is bounded by one row group plus the sketches, so edges
+    can be computed over data far larger than fits in one frame.
+    """
+    path = str(parquet_path(stage))
+    tasks = [
+        (path, row_group, source_columns(feature_sets), [feature_set.name for feature_set in feature_sets], params)
+        for row_group in range(pq.ParquetFile(path).num_row_groups)
+    ]
+    merged: Sketches = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for sketches in pool.map(_row_group_sketches, tasks):
+            merge_sketches(merged, sketches)
+    return merged
+
+def sketches_path(feature_set: FeatureSet) -> str:
+    return f"{feature_set.stage}_sketches.json"
+
+def write_feature_sketches(feature_set: FeatureSet, sketches: Sketches, params: Dict[str, Any]) -> str:
+    """Persist an output's sketches with the edges derived from them, so scoring buckets with the training edges."""
+    keys = [sketch_key(feature_set.name, "DEAL_SIZE"), sketch_key(None, "DISCOUNT_PERCENTAGE")]
+    kept = {key: sketches[key] for key in keys if key in sketches}
+    edges = {}
+    if keys[0] in kept:
+        edges["deal_size_edges"] = kept[keys[0]].quantiles(params["deal_size_quantiles"]).tolist()
+    if keys[1] in kept and params.get("discount_outlier_quantiles"):
+        edges["discount_bounds"] = kept[keys[1]].quantiles(params["discount_outlier_quantiles"]).tolist()
+    path = sketches_path(feature_set)
+    save_sketches(kept, path, output=feature_set.name, **edges)
+    return path
+
+def load_feature_sketches(feature_set: FeatureSet) -> Sketches:
+    """The sketches an output was trained with, to pass back into ``build_feature_sets``."""
+    return load_sketches(sketches_path(feature_set))
+
+def load_deal_size_edges(feature_set: FeatureSet) -> List[float]:
+    with open(sketches_path(feature_set)) as f:
+        return json.load(f)["deal_size_edges"]
+
+def load_feature_source(stage: str, feature_sets: Sequence[FeatureSet]) -> pd.DataFrame:
+    """Read the cleaned stage once, projected to the source columns every requested output needs."""
+    source = read_dataset(stage, columns=source_columns(feature_sets))
+    source.columns = [c.strip().upper() for c in source.columns]
+    if not pd.api.types.is_datetime64_any_dtype(source["ORDERDATE"]):
+        source["ORDERDATE"] = pd.to_datetime(source["ORDERDATE"], errors="coerce")
+    return source
+
+def write_feature_output(frame: pd.DataFrame, feature_set: FeatureSet, report: MemoryReport | None = None) -> pd.DataFrame:
+    """Compact an output's dtypes and write it as the stage CSV plus Parquet. Returns the compacted frame."""
+    frame = compact_frame(frame, report)
+    with metrics.timer("write_seconds", output=feature_set.name):
+        frame.to_csv(csv_path(feature_set.stage), index=False)
+        write_dataset(frame, feature_set.stage)
+    metrics.count("rows_written_total", len(frame), output=feature_set.name)
+    return frame
@@ -1,63 +1,258 @@
 from geopy.geocoders import Nominatim
-from time import sleep
+from time import sleep, time
+from typing import TYPE_CHECKING, Callable, Iterable, Sequence
+import sqlite3
 import pandas as pd
+from utils.instrumentation import metrics
+from utils.locations import location_index
+
+if TYPE_CHECKING:
+    from utils.async_geocoding import GeocodeProvider
 
 geolocator = Nominatim(user_agent="tableau_geo")
 
+# Persistent geocode store, checked before any network call
+GEOCODE_CACHE_PATH = "../data/geocode_cache.sqlite"
+GEOCODE_CACHE_VERSION = 1
+NEGATIVE_RESULT_TTL_SECONDS = 30 * 24 * 60 * 60  # Retry failed lookups after 30 days
+
+LOCATION_KEY_COLUMNS = ["CITY", "STATE", "COUNTRY"]
+
+Geocoder = Callable[[str, str | None, str], tuple[float | None, float | None]]
+LocationKey = tuple[str, str, str]
+
+def location_query(city: str, state: str | None, country: str) -> str:
+    """Free-text query for a location, with the state only when there is one."""
+    if pd.notna(state) and state:
+        return f"{city}, {state}, {country}"
+    return f"{city}, {country}"
+
 def geocode(city : str, state: str, country: str) -> tuple[float | None, float | None]:
-    """Geocode a location using city, state, and country."""
+    """Geocode a location using city, state, and country.
 
-    try:
-        # Build query with state if available
-        if pd.notna(state) and state:
-            query = f"{city}, {state}, {country}"
+    (None, None) means Nominatim has no such place. Timeouts and service
+    errors propagate, so ``geocoding`` can keep them out of the cache.
+    """
+    location = geolocator.geocode(location_query(city, state, country), timeout=10)
+    if location:
+        return location.latitude, location.longitude
+    return None, None
+
+def location_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Return the CITY/STATE/COUNTRY key columns with missing values normalized to ''.
+
+    COUNTRY and CITY are resolved to their canonical spellings, so raw and
+    cleaned spellings of a location share one cache entry.
+    """
+    keys = pd.DataFrame(index=df.index)
+    for col in LOCATION_KEY_COLUMNS:
+        if col in df.columns:
+            keys[col] = df[col].fillna("").astype(str).str.strip()
         else:
-            query = f"{city}, {country}"
-        
-        location = geolocator.geocode(query, timeout=10)
-        if location:
-            return location.latitude, location.longitude
-    except Exception:
-        pass
+            keys[col] = ""  # Ensures countries without states are handled uniformly
+    countries, cities = location_index().canonicalize(keys["COUNTRY"], keys["CITY"])
+    keys["COUNTRY"], keys["CITY"] = countries.astype(str), cities.astype(str)
+    return keys
 
-    return None, None
+class GeocodeCache:
+    """SQLite-backed geocode store keyed on (city, state, country).
+
+    Successful lookups are kept indefinitely; failed lookups are kept as
+    negative results and retried once they are older than ``negative_ttl``
+    seconds. Bumping ``GEOCODE_CACHE_VERSION`` discards all stored entries.
+    """
+
+    def __init__(self, path: str = GEOCODE_CACHE_PATH, negative_ttl: float = NEGATIVE_RESULT_TTL_SECONDS):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.connection = sqlite3.connect(path)
+        self._ensure_schema()
+
+    def _ensure_schema(self) -> None:
+        cursor = self.connection.cursor()
+        cursor.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = cursor.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or int(row[0]) != GEOCODE_CACHE_VERSION:
+            cursor.execute("DROP TABLE IF EXISTS locations")
+            cursor.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                (str(GEOCODE_CACHE_VERSION),),
+            )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS locations (
+                city TEXT NOT NULL,
+                state TEXT NOT NULL,
+                country TEXT NOT NULL,
+                latitude REAL,
+                longitude REAL,
+                resolved_at REAL NOT NULL,
+                PRIMARY KEY (city, state, country)
+            )
+            """
+        )
+        self.connection.commit()
+
+    def lookup(self, keys: Iterable[LocationKey]) -> dict[LocationKey, tuple[float | None, float | None]]:
+        """Return cached coordinates for the given keys, skipping expired negative results."""
+        now = time()
+        stored = {
+            (city, state, country): (latitude, longitude, resolved_at)
+            for city, state, country, latitude, longitude, resolved_at in self.connection.execute(
+                "SELECT city, state, country, latitude, longitude, resolved_at FROM locations"
+            )
+        }
+
+        hits = {}
+        for key in keys:
+            entry = stored.get(key)
+            if entry is None:
+                continue
+            latitude, longitude, resolved_at = entry
+            if latitude is None or longitude is None:
+                if now - resolved_at > self.negative_ttl:
+                    continue
+            hits[key] = (latitude, longitude)
+        return hits
+
+    def store(self, results: dict[LocationKey, tuple[float | None, float | None]]) -> None:
+        """Insert or refresh coordinates; (None, None) is recorded as a negative result."""
+        now = time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO locations (city, state, country, latitude, longitude, resolved_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(*key, latitude, longitude, now) for key, (latitude, longitude) in results.items()],
+        )
+        self.connection.commit()
+
+    def resolved_frame(self) -> pd.DataFrame:
+        """Every successfully resolved location as a CITY/STATE/COUNTRY/LATITUDE/LONGITUDE frame."""
+        return pd.read_sql_query(
+            "SELECT city AS CITY, state AS STATE, country AS COUNTRY, latitude AS LATITUDE, longitude AS LONGITUDE "
+            "FROM locations WHERE latitude IS NOT NULL AND longitude IS NOT NULL",
+            self.connection,
+        )
+
+    def seed(self, df: pd.DataFrame) -> int:
+        """Pre-seed the store from a frame with location keys plus LATITUDE/LONGITUDE. Returns rows seeded."""
+        seeded = location_keys(df)
+        seeded["LATITUDE"] = pd.to_numeric(df["LATITUDE"], errors="coerce")
+        seeded["LONGITUDE"] = pd.to_numeric(df["LONGITUDE"], errors="coerce")
+        seeded = seeded.dropna(subset=["LATITUDE", "LONGITUDE"]).drop_duplicates(subset=LOCATION_KEY_COLUMNS)
+
+        self.store({
+            (city, state, country): (float(latitude), float(longitude))
+            for city, state, country, latitude, longitude in seeded.itertuples(index=False)
+        })
+        return len(seeded)
 
-def geocoding(df : pd.DataFrame) -> None:
-    """Geocode locations in the dataframe and add LATITUDE and LONGITUDE columns."""
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "GeocodeCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class LocalGeocoder:
+    """Offline stand-in for ``geocode`` that answers from a known table of coordinates."""
+
+    def __init__(self, coordinates: dict[LocationKey, tuple[float, float]]):
+        self.coordinates = coordinates
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "LocalGeocoder":
+        known = location_keys(df)
+        known["LATITUDE"] = pd.to_numeric(df["LATITUDE"], errors="coerce")
+        known["LONGITUDE"] = pd.to_numeric(df["LONGITUDE"], errors="coerce")
+        known = known.dropna(subset=["LATITUDE", "LONGITUDE"]).drop_duplicates(subset=LOCATION_KEY_COLUMNS)
+        return cls({
+            (city, state, country): (float(latitude), float(longitude))
+            for city, state, country, latitude, longitude in known.itertuples(index=False)
+        })
+
+    def __call__(self, city: str, state: str | None, country: str) -> tuple[float | None, float | None]:
+        return self.coordinates.get((city, state or "", country), (None, None))
+
+def geocoding(
+    df : pd.DataFrame,
+    geocoder: Geocoder = geocode,
+    cache_path: str | None = GEOCODE_CACHE_PATH,
+    request_interval: float | None = None,
+    memo: dict[LocationKey, tuple[float | None, float | None]] | None = None,
+    providers: Sequence["GeocodeProvider"] | None = None,
+) -> None:
+    """Geocode locations in the dataframe and add LATITUDE and LONGITUDE columns.
+
+    Locations already in the persistent cache at ``cache_path`` are never sent
+    to ``geocoder``; pass ``cache_path=None`` to disable the cache. The
+    ``request_interval`` sleep defaults to 1 second for Nominatim and 0 for any
+    other geocoder. Passing the same ``memo`` dict across calls (e.g. per chunk)
+    skips the cache round trip for locations already seen in this run.
+
+    With ``providers`` the locations to resolve go to the rate-limited async
+    client in ``utils/async_geocoding.py`` instead of ``geocoder``, several at
+    a time. Lookups that still time out or error after its retries, like
+    calls where ``geocoder`` raises, come back missing for this call but are
+    neither cached nor memoized, so the next run asks again.
+    """
+    if request_interval is None:
+        request_interval = 1.0 if geocoder is geocode else 0.0
 
-    # Check if STATE column exists
-    has_state = "STATE" in df.columns
-    
     # Get unique city/state/country combinations
-    if has_state:
-        unique_locations = df[["CITY", "STATE", "COUNTRY"]].drop_duplicates()
+    keys = location_keys(df)
+    unique_locations = list(keys.drop_duplicates().itertuples(index=False, name=None))
+
+    geo_cache = {key: memo[key] for key in unique_locations if key in memo} if memo is not None else {}
+    uncached = [key for key in unique_locations if key not in geo_cache]
+    metrics.count("geocode_lookups_total", len(geo_cache), source="memo")
+
+    cache = GeocodeCache(cache_path) if cache_path and uncached else None
+    if cache:
+        geo_cache.update(cache.lookup(uncached))
+    missing = [key for key in unique_locations if key not in geo_cache]
+    metrics.count("geocode_lookups_total", len(uncached) - len(missing), source="cache")
+    metrics.count("geocode_lookups_total", len(missing), source="geocoder")
+
+    print(f"Geocoding {len(unique_locations)} unique locations ({len(geo_cache)} cached, {len(missing)} to resolve)...")
+    resolved, failed = {}, {}
+    if providers and missing:
+        from utils.async_geocoding import resolve_locations
+
+        for key, result in resolve_locations(missing, providers).items():
+            if result.is_definitive:
+                resolved[key] = result.coordinates
+            else:
+                failed[key] = (None, None)
     else:
-        unique_locations = df[["CITY", "COUNTRY"]].drop_duplicates()
-        unique_locations["STATE"] = None # Ensures countries without states are handled uniformly
-    
-    geo_cache = {}
-
-    print(f"Geocoding {len(unique_locations)} unique locations...")
-    for idx, row in enumerate(unique_locations.itertuples(index=False), 1):
-        if has_state:
-            city, state, country = row
-            # Normalize NaN to None
-            state = state if pd.notna(state) else None
-        else:
-            city, country = row
-            state = None
-        
-        display = f"{city}, {state}, {country}" if state else f"{city}, {country}"
-        print(f"  {idx}/{len(unique_locations)}: {display}")
-        latitude, longitude = geocode(city, state, country)
-        geo_cache[(city, state, country)] = (latitude, longitude)
-        sleep(1)  # Required to avoid being blocked from api
-
-    # Map coordinates back to original dataframe
-    def get_coordinates(row: pd.Series, coord_idx: int) -> float | None:
-        state = row.get("STATE") if has_state else None
-        state = state if pd.notna(state) else None
-        return geo_cache.get((row["CITY"], state, row["COUNTRY"]), (None, None))[coord_idx]
-    
-    df["LATITUDE"] = df.apply(lambda row: get_coordinates(row, 0), axis=1)
-    df["LONGITUDE"] = df.apply(lambda row: get_coordinates(row, 1), axis=1)
\ No newline at end of file
+        for idx, (city, state, country) in enumerate(missing, 1):
+            print(f"  {idx}/{len(missing)}: {location_query(city, state, country)}")
+            try:
+                with metrics.timer("geocoder_request_seconds"):
+                    resolved[(city, state, country)] = geocoder(city, state or None, country)
+            except Exception as error:  # Timeouts, rate limits, service errors: nothing worth caching
+                metrics.count("geocoder_errors_total", error=type(error).__name__)
+                failed[(city, state, country)] = (None, None)
+            if request_interval:
+                sleep(request_interval)  # Required to avoid being blocked from api
+    if failed:
+        print(f"  {len(failed)} lookups failed transiently and will be retried on the next run")
+
+    if cache:
+        cache.store(resolved)
+        cache.close()
+    geo_cache.update(resolved)
+    if memo is not None:
+        memo.update(geo_cache)
+    geo_cache.update(failed)  # Missing for this call only
+
+    # Map coordinates back to original dataframe with a merge on the location key
+    coordinates = pd.DataFrame(
+        [(*key, latitude, longitude) for key, (latitude, longitude) in geo_cache.items()],
+        columns=LOCATION_KEY_COLUMNS + ["LATITUDE", "LONGITUDE"],
+    )
+    mapped = keys.merge(coordinates, on=LOCATION_KEY_COLUMNS, how="left")
+
+    df["LATITUDE"] = pd.to_numeric(mapped["LATITUDE"], errors="coerce").to_numpy()
+    df["LONGITUDE"] = pd.to_numeric(mapped["LONGITUDE"], errors="coerce").to_numpy()
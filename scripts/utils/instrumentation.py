@@ -0,0 +1,227 @@
+from __future__ import annotations
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Tuple
+import atexit
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+# Opt-in through the environment so the pipeline runner's subprocesses inherit it
+EVENTS_PATH_ENV = "SALES_METRICS_PATH"        # Append JSONL events to this file
+PROMETHEUS_PORT_ENV = "SALES_METRICS_PORT"    # Serve Prometheus text on this port while the script runs
+PROMETHEUS_PATH_ENV = "SALES_METRICS_PROM"    # Write Prometheus text here when the script exits
+PROFILE_DIR_ENV = "SALES_PROFILE_DIR"         # Write one folded-stack profile per stage here
+
+PROFILE_INTERVAL_SECONDS = 0.005
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def _metric_key(name: str, labels: Dict[str, Any]) -> MetricKey:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (falls back to peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class SamplingProfiler:
+    """Sample one thread's Python stack on an interval and count identical stacks.
+
+    ``write`` emits the folded format (``frame;frame;frame count``) that
+    flamegraph.pl, speedscope and inferno read directly.
+    """
+
+    def __init__(self, thread_id: int | None = None, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class Instrumentation:
+    """Counters, timers and memory snapshots, emitted as JSONL events and rendered as Prometheus text.
+
+    Every event carries the current stage name. With no events path configured
+    the aggregates are still kept, so Prometheus output works on its own.
+    """
+
+    def __init__(self, events_path: str | None = None, profile_dir: str | None = None):
+        self.events_path = events_path
+        self.profile_dir = profile_dir
+        self.stage: str | None = None
+        self.counters: Dict[MetricKey, float] = {}
+        self.timers: Dict[MetricKey, Dict[str, float]] = {}
+        self.gauges: Dict[MetricKey, float] = {}
+        self.lock = threading.Lock()
+        self._events_file = None
+
+    @classmethod
+    def from_env(cls) -> "Instrumentation":
+        return cls(events_path=os.environ.get(EVENTS_PATH_ENV), profile_dir=os.environ.get(PROFILE_DIR_ENV))
+
+    def emit(self, event: str, name: str, value: float, **labels) -> None:
+        if not self.events_path:
+            return
+        record = {"ts": time.time(), "pid": os.getpid(), "stage": self.stage, "event": event,
+                  "name": name, "value": value, **labels}
+        with self.lock:
+            if self._events_file is None:
+                self._events_file = open(self.events_path, "a", buffering=1)
+            self._events_file.write(json.dumps(record, default=str) + "\n")
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        """Add ``value`` to a counter, e.g. cache hits or rows dropped by a filter."""
+        if not value:
+            return
+        key = _metric_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.emit("counter", name, value, **labels)
+
+    def gauge(self, name: str, value: float, **labels) -> None:
+        with self.lock:
+            self.gauges[_metric_key(name, labels)] = value
+        self.emit("gauge", name, value, **labels)
+
+    def memory_snapshot(self, name: str = "memory", **labels) -> None:
+        """Record current and peak RSS."""
+        self.gauge("rss_mb", current_rss_mb(), point=name, **labels)
+        self.gauge("peak_rss_mb", peak_rss_mb(), point=name, **labels)
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _metric_key(name, labels)
+        with self.lock:
+            summary = self.timers.setdefault(key, {"count": 0, "sum": 0.0, "max": 0.0})
+            summary["count"] += 1
+            summary["sum"] += seconds
+            summary["max"] = max(summary["max"], seconds)
+        self.emit("timer", name, seconds, **labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def stage_block(self, stage: str) -> Iterator[None]:
+        """Time a named stage with memory snapshots around it, profiling it when a profile dir is set."""
+        self.begin_stage(stage)
+        try:
+            yield
+        finally:
+            self.end_stage()
+
+    def begin_stage(self, stage: str) -> None:
+        self.stage = stage
+        self._stage_started = time.perf_counter()
+        self.memory_snapshot("stage_start")
+        self._profiler = SamplingProfiler().start() if self.profile_dir else None
+
+    def end_stage(self) -> None:
+        if self.stage is None:
+            return
+        if self._profiler:
+            self._profiler.stop()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            self._profiler.write(os.path.join(self.profile_dir, f"{self.stage}.folded"))
+        self.observe("stage_seconds", time.perf_counter() - self._stage_started)
+        self.memory_snapshot("stage_end")
+        self.stage = None
+
+    def prometheus_text(self) -> str:
+        """Render all aggregates in the Prometheus text exposition format."""
+        def render(name: str, labels: Tuple[Tuple[str, str], ...], value: float, suffix: str = "") -> str:
+            label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+            return f"sales_{name}{suffix}{{{label_text}}} {value}" if label_text else f"sales_{name}{suffix} {value}"
+
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(render(name, labels, value))
+            for (name, labels), value in sorted(self.gauges.items()):
+                lines.append(render(name, labels, value))
+            for (name, labels), summary in sorted(self.timers.items()):
+                lines.append(render(name, labels, summary["count"], "_count"))
+                lines.append(render(name, labels, summary["sum"], "_sum"))
+                lines.append(render(name, labels, summary["max"], "_max"))
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve ``prometheus_text`` on GET /metrics from a daemon thread."""
+        instrumentation = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = instrumentation.prometheus_text().encode()
+                self.send_response(200 if self.path == "/metrics" else 404)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def close(self) -> None:
+        self.end_stage()
+        prometheus_path = os.environ.get(PROMETHEUS_PATH_ENV)
+        if prometheus_path:
+            with open(prometheus_path, "w") as f:
+                f.write(self.prometheus_text())
+        if self._events_file is not None:
+            self._events_file.close()
+            self._events_file = None
+
+metrics = Instrumentation.from_env()
+
+def instrument_script(stage: str) -> Instrumentation:
+    """Treat the rest of a script as one stage: start timing/profiling now and flush everything at exit."""
+    metrics.begin_stage(stage)
+    if os.environ.get(PROMETHEUS_PORT_ENV):
+        metrics.serve_prometheus(int(os.environ[PROMETHEUS_PORT_ENV]))
+    atexit.register(metrics.close)
+    return metrics
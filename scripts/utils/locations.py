@@ -0,0 +1,191 @@
+from __future__ import annotations
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# Known misspellings in the extract -> canonical spelling, scoped by canonical country
+CITY_ALIASES: Dict[Tuple[str, str], str] = {
+    ("Australia", "Glen Waverly"): "Glen Waverley",
+    ("Switzerland", "Gensve"): "Geneva",
+    ("Denmark", "Aaarhus"): "Aarhus",
+    ("Canada", "Tsawassen"): "Tsawwassen",
+}
+
+COUNTRY_ALIASES: Dict[str, str] = {
+    "United States": "USA",
+    "United States of America": "USA",
+    "US": "USA",
+    "United Kingdom": "UK",
+    "Great Britain": "UK",
+    "England": "UK",
+}
+
+NGRAM_SIZE = 3
+FUZZY_CANDIDATES = 5  # Candidates (by shared n-grams) that get a full edit-distance check
+SUGGESTION_DISTANCE = 1  # Max edit distance for a suggested spelling; suggestions are reported, never applied
+
+def normalize_location_text(text: object) -> str:
+    """Accent-, case- and punctuation-insensitive key: 'Köln ' and 'koln' both become 'koln'."""
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    ascii_text = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", ascii_text.casefold()).split())
+
+def _ngrams(text: str, n: int = NGRAM_SIZE) -> Set[str]:
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+class LocationIndex:
+    """One lookup structure for canonical countries and cities.
+
+    Only exact and alias spellings resolve, through a normalized-key dict, so
+    cleaning never rewrites a location to a merely similar one (Bolton is not
+    Boston). Unknown spellings can be looked up separately with ``suggest_*``:
+    an n-gram candidate search scored by edit distance (cities only within the
+    same canonical country), memoized per distinct spelling, for reports.
+    """
+
+    def __init__(
+        self,
+        cities: Iterable[Tuple[str, str]],
+        city_aliases: Dict[Tuple[str, str], str] | None = None,
+        country_aliases: Dict[str, str] | None = None,
+        countries: Iterable[str] = (),
+    ):
+        cities = sorted(set(cities))
+        canonical_countries = sorted({country for country, _ in cities} | set(countries))
+        self.countries: Dict[str, str] = {normalize_location_text(country): country for country in canonical_countries}
+        for alias, country in (country_aliases or {}).items():
+            self.countries[normalize_location_text(alias)] = country
+        self.country_entries = list(self.countries.items())
+        self.country_ngram_index = self._build_ngram_index(self.country_entries)
+
+        self.cities: Dict[Tuple[str, str], str] = {}
+        self.canonical_cities: Dict[str, List[Tuple[str, str]]] = defaultdict(list)  # country -> [(key, city)]
+        for country, city in cities:
+            key = normalize_location_text(city)
+            self.cities[(country, key)] = city
+            self.canonical_cities[country].append((key, city))
+        for (country, alias), city in (city_aliases or {}).items():
+            self.cities[(country, normalize_location_text(alias))] = city
+
+        # Per-country n-gram -> canonical city positions
+        self.ngram_index: Dict[str, Dict[str, List[int]]] = {
+            country: self._build_ngram_index(entries) for country, entries in self.canonical_cities.items()
+        }
+
+        self._country_memo: Dict[str, str | None] = {}
+        self._city_memo: Dict[Tuple[str, str], str | None] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, **kwargs) -> "LocationIndex":
+        """Index the distinct COUNTRY/CITY pairs of a frame."""
+        pairs = df[["COUNTRY", "CITY"]].dropna().astype(str).drop_duplicates()
+        return cls(pairs.itertuples(index=False, name=None), **kwargs)
+
+    @staticmethod
+    def _build_ngram_index(entries: List[Tuple[str, str]]) -> Dict[str, List[int]]:
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for position, (key, _) in enumerate(entries):
+            for gram in _ngrams(key):
+                postings[gram].append(position)
+        return dict(postings)
+
+    def _fuzzy(self, key: str, entries: List[Tuple[str, str]], postings: Dict[str, List[int]]) -> str | None:
+        shared = defaultdict(int)
+        for gram in _ngrams(key):
+            for position in postings.get(gram, ()):
+                shared[position] += 1
+        best, best_distance = None, SUGGESTION_DISTANCE + 1
+        for position in sorted(shared, key=shared.get, reverse=True)[:FUZZY_CANDIDATES]:
+            candidate_key, city = entries[position]
+            distance = edit_distance(key, candidate_key)
+            if distance < best_distance:
+                best, best_distance = city, distance
+        return best
+
+    def resolve_country(self, country: object) -> str | None:
+        """Canonical country name for an exact or alias spelling, else None."""
+        return self.countries.get(normalize_location_text(country))
+
+    def resolve_city(self, country: object, city: object) -> str | None:
+        """Canonical spelling of ``city`` within ``country`` for an exact or alias spelling, else None."""
+        canonical_country = self.resolve_country(country)
+        key = normalize_location_text(city)
+        if canonical_country is None or not key:
+            return None
+        return self.cities.get((canonical_country, key))
+
+    def suggest_country(self, country: object) -> str | None:
+        """Closest known country for a spelling that does not resolve, or None."""
+        key = normalize_location_text(country)
+        if not key or key in self.countries:
+            return None
+        if key not in self._country_memo:
+            self._country_memo[key] = self._fuzzy(key, self.country_entries, self.country_ngram_index)
+        return self._country_memo[key]
+
+    def suggest_city(self, country: object, city: object) -> str | None:
+        """Closest known city in the same (resolved) country for a spelling that does not resolve, or None."""
+        canonical_country = self.resolve_country(country)
+        key = normalize_location_text(city)
+        if canonical_country is None or not key or (canonical_country, key) in self.cities:
+            return None
+        memo_key = (canonical_country, key)
+        if memo_key not in self._city_memo:
+            self._city_memo[memo_key] = self._fuzzy(
+                key, self.canonical_cities.get(canonical_country, []), self.ngram_index.get(canonical_country, {})
+            )
+        return self._city_memo[memo_key]
+
+    def canonicalize(self, countries: pd.Series, cities: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """Vectorized resolve over aligned columns; values that don't resolve are returned unchanged.
+
+        Each distinct (country, city) pair is resolved once and mapped back with
+        one take, so cost is O(rows) plus O(distinct pairs) lookups.
+        """
+        pairs = pd.DataFrame({"country": countries.to_numpy(dtype=object), "city": cities.to_numpy(dtype=object)})
+        codes, uniques = pd.MultiIndex.from_frame(pairs).factorize()
+        resolved_countries, resolved_cities = [], []
+        for country, city in uniques:
+            canonical_country = self.resolve_country(country)
+            canonical_city = self.resolve_city(country, city)
+            resolved_countries.append(canonical_country if canonical_country is not None else country)
+            resolved_cities.append(canonical_city if canonical_city is not None else city)
+        codes = np.asarray(codes)
+        return (
+            pd.Series(np.array(resolved_countries, dtype=object)[codes], index=countries.index, name=countries.name),
+            pd.Series(np.array(resolved_cities, dtype=object)[codes], index=cities.index, name=cities.name),
+        )
+
+@lru_cache(maxsize=1)
+def location_index() -> LocationIndex:
+    """Shared index over every location the phone and territory tables know about."""
+    from utils.enrichment import COUNTRY_TERRITORIES
+    from utils.normailize_phone_numbers_to_e164 import COUNTRY_INFO
+
+    cities = {(country, city) for country, info in COUNTRY_INFO.items() for city in info.national_destination_code}
+    cities |= {(country, city) for (country, _), city in CITY_ALIASES.items()}
+    return LocationIndex(
+        cities,
+        city_aliases=CITY_ALIASES,
+        country_aliases=COUNTRY_ALIASES,
+        countries=[country for (country,) in COUNTRY_TERRITORIES.rules],  # Countries with a territory but no known city
+    )
@@ -0,0 +1,138 @@
+from __future__ import annotations
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+import json
+import random
+import threading
+import time
+import pandas as pd
+from utils.geocoding import LocalGeocoder, LocationKey, location_query
+
+class MockGeocoderServer:
+    """Local stand-in for Nominatim's /search API, for tests and benchmarks.
+
+    Answers ``/search?q=...&format=json`` from a table of known coordinates
+    after ``latency`` seconds. Like the real service it enforces a request
+    ``rate`` (a token bucket with ``burst`` tokens) and answers HTTP 429 above
+    it; a ``slow_fraction`` of requests stall for ``slow_seconds`` to exercise
+    client timeouts. ``GET /stats`` reports request counts and the observed
+    request rate.
+    """
+
+    def __init__(
+        self,
+        coordinates: Dict[LocationKey, Tuple[float, float]],
+        rate: float | None = None,
+        burst: int = 2,
+        latency: float = 0.0,
+        slow_fraction: float = 0.0,
+        slow_seconds: float = 30.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ):
+        self.places = {location_query(*key): coords for key, coords in coordinates.items()}
+        self.rate = rate
+        self.burst = burst
+        self.latency = latency
+        self.slow_fraction = slow_fraction
+        self.slow_seconds = slow_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.counts = {"requests": 0, "resolved": 0, "not_found": 0, "rate_limited": 0, "slow": 0}
+        self.first_request: float | None = None
+        self.last_request: float | None = None
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread: threading.Thread | None = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, **kwargs: Any) -> "MockGeocoderServer":
+        """Serve the coordinates of a frame with location keys plus LATITUDE/LONGITUDE."""
+        return cls(LocalGeocoder.from_frame(df).coordinates, **kwargs)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _admit(self) -> Tuple[bool, bool]:
+        """Count a request; returns (within the rate limit, should stall)."""
+        with self.lock:
+            now = time.monotonic()
+            self.counts["requests"] += 1
+            self.first_request = self.first_request if self.first_request is not None else now
+            self.last_request = now
+            if self.rate:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens < 1:
+                    self.counts["rate_limited"] += 1
+                    return False, False
+                self.tokens -= 1
+            slow = self.random.random() < self.slow_fraction
+            self.counts["slow"] += slow
+            return True, slow
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            stats: Dict[str, Any] = dict(self.counts)
+            elapsed = (self.last_request or 0) - (self.first_request or 0)
+            # Requests per second between the first and last request
+            stats["observed_rate"] = (self.counts["requests"] - 1) / elapsed if elapsed > 0 else None
+            return stats
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send_json(self, status: int, payload: Any) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path == "/stats":
+                    return self._send_json(200, server.stats())
+                if parts.path != "/search":
+                    return self._send_json(404, {"error": "not found"})
+
+                admitted, slow = server._admit()
+                if not admitted:
+                    return self._send_json(429, {"error": "rate limited"})
+                time.sleep(server.slow_seconds if slow else server.latency)
+                query = parse_qs(parts.query).get("q", [""])[0]
+                place = server.places.get(query)
+                with server.lock:
+                    server.counts["resolved" if place else "not_found"] += 1
+                try:
+                    self._send_json(200, [{"lat": str(place[0]), "lon": str(place[1])}] if place else [])
+                except ConnectionError:
+                    pass  # The client gave up waiting (timeout) and closed the connection
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MockGeocoderServer":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockGeocoderServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
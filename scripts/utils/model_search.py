@@ -0,0 +1,178 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold, StratifiedShuffleSplit
+from sklearn.neural_network import MLPClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+# Hyperparameter grids per model family. The MLP family mirrors the notebook's
+# Keras 64 -> 32 network with sklearn's MLPClassifier so workers don't need TensorFlow.
+SEARCH_SPACE: Dict[str, Dict[str, List[Any]]] = {
+    "gradient_boosting": {
+        "n_estimators": [100, 200],
+        "learning_rate": [0.05, 0.1],
+        "max_depth": [2, 3, 4],
+    },
+    "logistic_regression": {
+        "C": [0.1, 0.5, 1.0, 5.0],
+    },
+    "mlp": {
+        "hidden_layer_sizes": [[32], [64, 32], [128, 64]],
+        "alpha": [1e-4, 1e-3],
+    },
+}
+
+def build_estimator(family: str, params: Dict[str, Any], random_state: int = 42):
+    """Instantiate one model family on the preprocessed (one-hot + numeric) matrix."""
+    if family == "gradient_boosting":
+        return GradientBoostingClassifier(random_state=random_state, **params)
+    if family == "logistic_regression":
+        return Pipeline([
+            ("scaler", StandardScaler()),
+            ("model", LogisticRegression(max_iter=1000, **params)),
+        ])
+    if family == "mlp":
+        params = {**params, "hidden_layer_sizes": tuple(params.get("hidden_layer_sizes", (64, 32)))}
+        return Pipeline([
+            ("scaler", StandardScaler()),
+            ("model", MLPClassifier(max_iter=300, early_stopping=True, random_state=random_state, **params)),
+        ])
+    raise ValueError(f"Unknown model family {family!r}")
+
+def build_preprocessor(categorical_cols: Sequence[str]) -> ColumnTransformer:
+    return ColumnTransformer(
+        transformers=[
+            ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), list(categorical_cols)),
+        ],
+        remainder='passthrough'
+    )
+
+def expand_search_space(search_space: Dict[str, Dict[str, List[Any]]]) -> List[Dict[str, Any]]:
+    """Cartesian product of each family's grid, as [{"config_id", "family", "params"}]."""
+    configs = []
+    for family, grid in search_space.items():
+        names = list(grid)
+        for values in product(*(grid[name] for name in names)):
+            configs.append({"config_id": len(configs), "family": family, "params": dict(zip(names, values))})
+    return configs
+
+# ---- Worker side: the feature matrix is memory-mapped once per process, never pickled per task ----
+
+_worker_X: np.ndarray | None = None
+_worker_y: np.ndarray | None = None
+
+def _init_worker(X_path: str, y_path: str) -> None:
+    global _worker_X, _worker_y
+    _worker_X = np.load(X_path, mmap_mode="r")
+    _worker_y = np.load(y_path, mmap_mode="r")
+
+def subsample_indices(y: np.ndarray, fraction: float, seed: int) -> np.ndarray:
+    """Deterministic stratified subsample; every config in a rung trains on the same rows."""
+    if fraction >= 1.0:
+        return np.arange(len(y))
+    splitter = StratifiedShuffleSplit(n_splits=1, train_size=fraction, random_state=seed)
+    indices, _ = next(splitter.split(np.zeros(len(y)), y))
+    return np.sort(indices)
+
+def _evaluate_fold(task: Dict[str, Any]) -> Dict[str, Any]:
+    y_all = np.asarray(_worker_y)
+    rows = subsample_indices(y_all, task["fraction"], task["seed"])
+    folds = StratifiedKFold(n_splits=task["n_folds"], shuffle=True, random_state=task["seed"])
+    train_idx, test_idx = list(folds.split(rows, y_all[rows]))[task["fold"]]
+    train_rows, test_rows = rows[train_idx], rows[test_idx]
+
+    estimator = build_estimator(task["family"], task["params"], task["seed"])
+    start = time.perf_counter()
+    estimator.fit(_worker_X[train_rows], y_all[train_rows])
+    fit_seconds = time.perf_counter() - start
+    scores = estimator.predict_proba(_worker_X[test_rows])[:, 1]
+    return {
+        "config_id": task["config_id"],
+        "fold": task["fold"],
+        "auc": roc_auc_score(y_all[test_rows], scores),
+        "fit_seconds": fit_seconds,
+    }
+
+# ---- Driver side ----
+
+def successive_halving(
+    X: np.ndarray,
+    y: np.ndarray,
+    configs: List[Dict[str, Any]],
+    work_dir: str,
+    n_folds: int = 5,
+    eta: int = 3,
+    min_fraction: float = 0.2,
+    max_workers: int | None = None,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """Stratified k-fold CV of every config on a growing data fraction, keeping the top 1/eta each rung.
+
+    Returns one row per (config, rung) with mean/std AUC and fit time.
+    """
+    Path(work_dir).mkdir(parents=True, exist_ok=True)
+    X_path, y_path = os.path.join(work_dir, "X.npy"), os.path.join(work_dir, "y.npy")
+    np.save(X_path, np.ascontiguousarray(X, dtype=np.float64))
+    np.save(y_path, np.asarray(y))
+
+    # Rung fractions: min_fraction, min_fraction * eta, ... then the full data
+    fractions = []
+    fraction = min_fraction
+    while fraction < 1.0 and len(configs) > eta ** len(fractions):
+        fractions.append(fraction)
+        fraction *= eta
+    fractions.append(1.0)
+
+    by_id = {config["config_id"]: config for config in configs}
+    alive = [config["config_id"] for config in configs]
+    records = []
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(X_path, y_path)) as pool:
+        for rung, fraction in enumerate(fractions):
+            tasks = [
+                {
+                    "config_id": config_id,
+                    "family": by_id[config_id]["family"],
+                    "params": by_id[config_id]["params"],
+                    "fraction": fraction,
+                    "fold": fold,
+                    "n_folds": n_folds,
+                    "seed": seed,
+                }
+                for config_id in alive
+                for fold in range(n_folds)
+            ]
+            fold_results = pd.DataFrame(list(pool.map(_evaluate_fold, tasks)))
+            summary = fold_results.groupby("config_id").agg(
+                mean_auc=("auc", "mean"), std_auc=("auc", "std"), fit_seconds=("fit_seconds", "sum")
+            )
+
+            for config_id, row in summary.iterrows():
+                records.append({
+                    "config_id": config_id,
+                    "family": by_id[config_id]["family"],
+                    "params": json.dumps(by_id[config_id]["params"], sort_keys=True),
+                    "rung": rung,
+                    "data_fraction": fraction,
+                    "mean_auc": row.mean_auc,
+                    "std_auc": row.std_auc,
+                    "fit_seconds": row.fit_seconds,
+                })
+            print(f"Rung {rung}: {len(alive)} configs on {fraction:.0%} of rows, best AUC {summary.mean_auc.max():.4f}")
+
+            keep = max(1, len(alive) // eta)
+            alive = summary.sort_values("mean_auc", ascending=False).index[:keep].tolist()
+
+    return pd.DataFrame(records).sort_values(["rung", "mean_auc"], ascending=[False, False]).reset_index(drop=True)
@@ -3,6 +3,8 @@ from dataclasses import dataclass
 from enum import StrEnum
 from typing import Dict, List, Optional, Tuple
 import pandas as pd
+from utils.instrumentation import metrics
+from utils.locations import location_index
 
 class TrunkRule(StrEnum):
     DROP_ZERO = "drop_zero"
@@ -15,7 +17,7 @@ class CountryInfo:
     """Country-specific phone number information."""
     country_code: str
     trunk_rule: TrunkRule  # "drop_zero" | "keep_zero" | "france_10digit" | "none"
-    national_destination_code: Dict[str, str]  # city_name -> area_code
+    national_destination_code: Dict[str, str]  # canonical city_name -> area_code
 
 # Consolidated country and city information: calling code + trunk rules + city area codes
 COUNTRY_INFO: Dict[str, CountryInfo] = {
@@ -24,7 +26,7 @@ COUNTRY_INFO: Dict[str, CountryInfo] = {
         trunk_rule=TrunkRule.DROP_ZERO,
         national_destination_code={
             "Chatswood": "2",
-            "Glen Waverly": "3",
+            "Glen Waverley": "3",
             "Melbourne": "3",
             "North Sydney": "2",
             "South Brisbane": "7",
@@ -51,7 +53,7 @@ COUNTRY_INFO: Dict[str, CountryInfo] = {
         trunk_rule=TrunkRule.NONE,
         national_destination_code={
             "Montreal": "514",
-            "Tsawassen": "604",
+            "Tsawwassen": "604",
             "Vancouver": "604",
         },
     ),
@@ -59,7 +61,7 @@ COUNTRY_INFO: Dict[str, CountryInfo] = {
         country_code="45",
         trunk_rule=TrunkRule.DROP_ZERO,
         national_destination_code={
-            "Aaarhus": "86",
+            "Aarhus": "86",
             "Kobenhavn": "35",
         },
     ),
@@ -164,7 +166,7 @@ COUNTRY_INFO: Dict[str, CountryInfo] = {
         country_code="41",
         trunk_rule=TrunkRule.DROP_ZERO,
         national_destination_code={
-            "Gensve": "22",
+            "Geneva": "22",
         },
     ),
     "UK": CountryInfo(
@@ -337,8 +339,159 @@ def normalize_phone_to_e164(raw_phone: object, country_name: object, city_name:
     
     # Prepend city area code if available and number appears local
     if normalized_city and len(domestic_digits) <= 8:
-        area_code = country_info.national_destination_code.get(normalized_city)
+        # Typo'd and canonical spellings of a city resolve to the same area code
+        canonical_city = location_index().resolve_city(normalized_country, normalized_city) or normalized_city
+        area_code = country_info.national_destination_code.get(canonical_city)
         if area_code and not domestic_digits.startswith(area_code):
             domestic_digits = area_code + domestic_digits
 
-    return _validate_and_format_e164(country_code, domestic_digits)
\ No newline at end of file
+    return _validate_and_format_e164(country_code, domestic_digits)
+
+# ---- Vectorized batch normalization ----
+
+# Country code prefix table: one set of codes per trie depth, walked longest first
+COUNTRY_CODE_PREFIXES_BY_LENGTH: Dict[int, frozenset] = {
+    length: frozenset(code for code in KNOWN_COUNTRY_CODES_LONGEST_FIRST if len(code) == length)
+    for length in sorted({len(code) for code in KNOWN_COUNTRY_CODES_LONGEST_FIRST}, reverse=True)
+}
+
+# Area code lookup keyed on "country|city" so it can be mapped over a whole column
+NATIONAL_DESTINATION_CODES: Dict[str, str] = {
+    f"{country}|{city}": area_code
+    for country, info in COUNTRY_INFO.items()
+    for city, area_code in info.national_destination_code.items()
+    if area_code
+}
+
+def _to_text(values: pd.Series) -> pd.Series:
+    """Stringify and strip a column, mapping missing values to ''."""
+    text = values.astype(object).where(values.notna(), "")
+    return text.astype(str).str.strip()
+
+def _validate_and_format_e164_batch(country_codes: pd.Series, national_digits: pd.Series) -> pd.Series:
+    """Vectorized _validate_and_format_e164 over aligned country code and national digit columns."""
+    national_digits = national_digits.copy()
+
+    # NANP special handling (country code 1)
+    is_nanp = country_codes == "1"
+    has_nanp_trunk = is_nanp & (national_digits.str.len() == 11) & national_digits.str.startswith("1")
+    national_digits[has_nanp_trunk] = national_digits[has_nanp_trunk].str[1:]
+
+    lengths = national_digits.str.len()
+    valid = (
+        (country_codes != "")
+        & (lengths >= 8)
+        & ~(is_nanp & (lengths != 10))
+    )
+
+    formatted = pd.Series("", index=national_digits.index, dtype=object)
+    if valid.any():
+        formatted[valid] = "+" + country_codes[valid].astype(str) + national_digits[valid].astype(str)
+    return formatted
+
+def _normalize_unique_phones(phones: pd.Series, countries: pd.Series, cities: pd.Series) -> pd.Series:
+    """Vectorized normalize_phone_to_e164 over already de-duplicated inputs."""
+    raw_text = _to_text(phones)
+    normalized_country = _to_text(countries)
+    normalized_city = _to_text(cities)
+
+    result = pd.Series("", index=phones.index, dtype=object)
+
+    # Non-ASCII input can contain characters str.isdigit() accepts but regex \d does not;
+    # hand those rare rows to the scalar path so results stay identical.
+    non_ascii = ~raw_text.map(str.isascii).astype(bool)
+    for idx in raw_text.index[non_ascii]:
+        result[idx] = normalize_phone_to_e164(phones[idx], countries[idx], cities[idx])
+
+    # Strip to digits only, preserving leading '+'
+    raw_text = raw_text.mask(raw_text.str.lower() == "nan", "")
+    digits = raw_text.str.replace(r"[^0-9]", "", regex=True)
+    has_plus = raw_text.str.startswith("+")
+    active = ~non_ascii & (digits != "")
+
+    # Handle international format (+...)
+    international = active & has_plus
+    international_digits = digits[international]
+    country_codes = pd.Series("", index=international_digits.index, dtype=object)
+    for length, codes in COUNTRY_CODE_PREFIXES_BY_LENGTH.items():
+        unmatched = country_codes == ""
+        prefix = international_digits.str[:length]
+        matched = unmatched & prefix.isin(codes) & (international_digits.str.len() > length)
+        country_codes[matched] = prefix[matched]
+    national = international_digits.copy()
+    for length in COUNTRY_CODE_PREFIXES_BY_LENGTH:
+        has_length = country_codes.str.len() == length
+        national[has_length] = international_digits[has_length].str[length:]
+    result[international] = _validate_and_format_e164_batch(country_codes, national)
+
+    # Handle domestic format, grouped by trunk rule
+    domestic = active & ~has_plus & normalized_country.isin(COUNTRY_INFO.keys())
+    domestic_digits = digits[domestic]
+    domestic_country = normalized_country[domestic]
+    trunk_rules = domestic_country.map({name: info.trunk_rule for name, info in COUNTRY_INFO.items()})
+    starts_with_zero = domestic_digits.str.startswith("0")
+
+    drop_zero = (trunk_rules == TrunkRule.DROP_ZERO) & starts_with_zero
+    france = (trunk_rules == TrunkRule.FRANCE_10DIGIT) & starts_with_zero & (domestic_digits.str.len() == 10)
+    domestic_digits = domestic_digits.where(~(drop_zero | france), domestic_digits.str[1:])
+
+    # Prepend city area code if available and number appears local
+    _, canonical_city = location_index().canonicalize(domestic_country, normalized_city[domestic])
+    area_codes = (domestic_country + "|" + canonical_city.astype(str)).map(NATIONAL_DESTINATION_CODES)
+    local = area_codes.notna() & (normalized_city[domestic] != "") & (domestic_digits.str.len() <= 8)
+    for area_code in area_codes[local].unique():
+        needs_prefix = local & (area_codes == area_code) & ~domestic_digits.str.startswith(area_code)
+        domestic_digits[needs_prefix] = area_code + domestic_digits[needs_prefix]
+
+    calling_codes = domestic_country.map({name: info.country_code for name, info in COUNTRY_INFO.items()})
+    result[domestic] = _validate_and_format_e164_batch(calling_codes, domestic_digits)
+
+    return result
+
+def normalize_phones_e164(
+    phones: pd.Series,
+    countries: pd.Series,
+    cities: pd.Series | None = None,
+    memo: Dict[Tuple[str, str, str], str] | None = None,
+) -> pd.Series:
+    """Vectorized normalize_phone_to_e164 over aligned columns. Returns a Series matching the scalar output row for row.
+
+    Pass the same ``memo`` dict across calls (e.g. per chunk) to reuse results for triples already normalized.
+    """
+    if cities is None:
+        cities = pd.Series(None, index=phones.index, dtype=object)
+
+    # Memoize repeated (phone, country, city) triples: normalize each distinct triple once
+    triples = pd.DataFrame({
+        "phone": phones.to_numpy(dtype=object),
+        "country": countries.to_numpy(dtype=object),
+        "city": cities.to_numpy(dtype=object),
+    })
+    triple_ids = triples.groupby(["phone", "country", "city"], sort=False, dropna=False).ngroup().to_numpy()
+    unique_triples = triples[~triples.duplicated()].reset_index(drop=True)
+
+    if memo is None:
+        normalized = _normalize_unique_phones(
+            unique_triples["phone"], unique_triples["country"], unique_triples["city"]
+        )
+    else:
+        # Scalar output only depends on the stripped text of each input, so key the memo on that
+        keys = pd.Series(list(zip(
+            _to_text(unique_triples["phone"]),
+            _to_text(unique_triples["country"]),
+            _to_text(unique_triples["city"]),
+        )), dtype=object)
+        normalized = keys.map(lambda key: memo.get(key)).astype(object)
+        missing = normalized.isna()
+        metrics.count("phone_memo_total", int((~missing).sum()), result="hit")
+        metrics.count("phone_memo_total", int(missing.sum()), result="miss")
+        if missing.any():
+            computed = _normalize_unique_phones(
+                unique_triples.loc[missing, "phone"],
+                unique_triples.loc[missing, "country"],
+                unique_triples.loc[missing, "city"],
+            )
+            normalized[missing] = computed
+            memo.update(zip(keys[missing], computed))
+
+    return pd.Series(normalized.to_numpy()[triple_ids], index=phones.index, name=phones.name, dtype=object)
@@ -0,0 +1,187 @@
+from __future__ import annotations
+from typing import Any, List, Mapping, Sequence
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+from utils.tensor_inputs import NORMALIZATION_EPSILON, TensorEncoding
+
+CLOSE_MODEL_NPZ = "../models/close_model_numpy.npz"
+STATUS_MODEL_NPZ = "../models/status_model_numpy.npz"
+BATCH_CHUNK_ROWS = 65_536
+
+# Layers that carry no weights the runtime needs (Lambda is the notebook's float32 cast)
+PASSTHROUGH_LAYERS = {"InputLayer", "Concatenate", "Dropout", "Lambda", "Reshape"}
+ACTIVATIONS = ("relu", "linear", "sigmoid", "softmax")
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0, out=x)
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    x = np.exp(x - x.max(axis=1, keepdims=True))
+    return x / x.sum(axis=1, keepdims=True)
+
+APPLY_ACTIVATION = {"relu": _relu, "linear": lambda x: x, "sigmoid": expit, "softmax": _softmax}
+
+class NumpyMLP:
+    """TensorFlow-free copy of the notebook's Keras close / status models.
+
+    Holds the PRODUCTLINE lookup vocabulary, the Normalization mean and
+    variance, and the Dense kernels. The one-hot block of the first kernel is
+    applied as a row gather, so a prediction is one small matmul per layer in
+    float32, reproducing ``model.predict`` for the sigmoid ``close_prob`` head
+    (N x 1) and the softmax ``status_probs`` head (N x 3).
+    """
+
+    def __init__(
+        self,
+        numeric_cols: Sequence[str],
+        vocabulary: Sequence[str],
+        mean: np.ndarray,
+        variance: np.ndarray,
+        kernels: Sequence[np.ndarray],
+        biases: Sequence[np.ndarray],
+        activations: Sequence[str],
+        categorical_col: str = "PRODUCTLINE",
+    ):
+        self.numeric_cols = list(numeric_cols)
+        self.vocabulary = [str(value) for value in vocabulary]
+        self.vocabulary_index = pd.Index(self.vocabulary)
+        self.categorical_col = categorical_col
+        self.mean = np.asarray(mean, dtype=np.float32).reshape(-1)
+        self.variance = np.asarray(variance, dtype=np.float32).reshape(-1)
+        self.std = np.maximum(np.sqrt(self.variance), np.float32(NORMALIZATION_EPSILON))
+        self.kernels = [np.asarray(kernel, dtype=np.float32) for kernel in kernels]
+        self.biases = [np.asarray(bias, dtype=np.float32) for bias in biases]
+        self.activations = list(activations)
+        n_tokens = len(self.vocabulary) + 1  # Index 0 is the out-of-vocabulary token
+        if self.kernels[0].shape[0] != n_tokens + len(self.numeric_cols):
+            raise ValueError(
+                f"First Dense layer expects {self.kernels[0].shape[0]} inputs, not "
+                f"{n_tokens} PRODUCTLINE tokens + {len(self.numeric_cols)} numeric columns"
+            )
+        self.category_kernel = self.kernels[0][:n_tokens]
+        self.numeric_kernel = self.kernels[0][n_tokens:]
+
+    @property
+    def feature_cols(self) -> List[str]:
+        return [self.categorical_col, *self.numeric_cols]
+
+    @property
+    def n_outputs(self) -> int:
+        return self.kernels[-1].shape[1]
+
+    @classmethod
+    def from_keras(
+        cls,
+        model,
+        numeric_cols: Sequence[str] | None = None,
+        encoding: TensorEncoding | None = None,
+        categorical_col: str = "PRODUCTLINE",
+    ) -> "NumpyMLP":
+        """Extract a fitted Keras model's lookup, normalization and Dense weights.
+
+        Handles the notebook's dict-input models (StringLookup one-hot +
+        Normalization over ``numeric_cols``, concatenated in that order) and
+        ``tensor_inputs.build_packed_model`` models, whose vocabulary and
+        normalization live in the cache's ``encoding`` instead.
+        """
+        vocabulary = mean = variance = None
+        kernels, biases, activations = [], [], []
+        for layer in model.layers:
+            kind = type(layer).__name__
+            if kind == "StringLookup":
+                lookup_vocabulary = list(layer.get_vocabulary())
+                vocabulary = lookup_vocabulary[layer.num_oov_indices:]
+                if layer.num_oov_indices != 1 or layer.output_mode != "one_hot":
+                    raise ValueError("Only one-hot StringLookup layers with a single OOV index can be exported")
+            elif kind == "Normalization":
+                mean = np.asarray(layer.mean).reshape(-1)
+                variance = np.asarray(layer.variance).reshape(-1)
+            elif kind == "Dense":
+                kernel, bias = layer.get_weights()
+                activation = layer.get_config()["activation"]
+                if activation not in ACTIVATIONS:
+                    raise ValueError(f"Unsupported activation {activation!r} in layer {layer.name!r}")
+                kernels.append(kernel)
+                biases.append(bias)
+                activations.append(activation)
+            elif kind == "CategoryEncoding":
+                if encoding is None:
+                    raise ValueError("Packed models need the TensorEncoding their inputs were cached with")
+            elif kind not in PASSTHROUGH_LAYERS:
+                raise ValueError(f"Cannot export layer {layer.name!r} of type {kind}")
+
+        if encoding is not None:
+            numeric_cols, vocabulary = encoding.numeric_cols, encoding.vocabulary
+            mean, variance = encoding.mean, encoding.variance
+        if vocabulary is None or mean is None or numeric_cols is None:
+            raise ValueError("Model needs a StringLookup and Normalization layer, and numeric_cols, to be exported")
+        return cls(numeric_cols, vocabulary, mean, variance, kernels, biases, activations, categorical_col)
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            numeric_cols=np.array(self.numeric_cols),
+            vocabulary=np.array(self.vocabulary, dtype=str),
+            categorical_col=self.categorical_col,
+            mean=self.mean,
+            variance=self.variance,
+            activations=np.array(self.activations),
+            **{f"kernel_{i}": kernel for i, kernel in enumerate(self.kernels)},
+            **{f"bias_{i}": bias for i, bias in enumerate(self.biases)},
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyMLP":
+        arrays = np.load(path)
+        activations = arrays["activations"].tolist()
+        return cls(
+            numeric_cols=arrays["numeric_cols"].tolist(),
+            vocabulary=arrays["vocabulary"].tolist(),
+            mean=arrays["mean"],
+            variance=arrays["variance"],
+            kernels=[arrays[f"kernel_{i}"] for i in range(len(activations))],
+            biases=[arrays[f"bias_{i}"] for i in range(len(activations))],
+            activations=activations,
+            categorical_col=arrays["categorical_col"].item(),
+        )
+
+    def encode(self, inputs: pd.DataFrame | Mapping[str, Any]) -> tuple[np.ndarray, np.ndarray]:
+        """(normalized float32 numeric matrix, vocabulary index) from a frame or dict of column arrays."""
+        numeric = np.column_stack([np.asarray(inputs[col], dtype=np.float32).reshape(-1) for col in self.numeric_cols])
+        # Unseen values get -1, which shifts them onto the OOV index 0
+        codes = self.vocabulary_index.get_indexer(np.asarray(inputs[self.categorical_col]).reshape(-1).astype(str))
+        return (numeric - self.mean) / self.std, codes + 1
+
+    def _predict_chunk(self, numeric: np.ndarray, index: np.ndarray) -> np.ndarray:
+        x = numeric @ self.numeric_kernel
+        x += self.category_kernel[index]
+        x += self.biases[0]
+        x = APPLY_ACTIVATION[self.activations[0]](x)
+        for kernel, bias, activation in zip(self.kernels[1:], self.biases[1:], self.activations[1:]):
+            x = x @ kernel
+            x += bias
+            x = APPLY_ACTIVATION[activation](x)
+        return x
+
+    def predict(self, inputs: pd.DataFrame | Mapping[str, Any]) -> np.ndarray:
+        """Model outputs, shaped like Keras ``predict``: (N, 1) close probabilities or (N, 3) class probabilities."""
+        numeric, index = self.encode(inputs)
+        out = np.empty((len(index), self.n_outputs), dtype=np.float32)
+        for start in range(0, len(index), BATCH_CHUNK_ROWS):
+            stop = start + BATCH_CHUNK_ROWS
+            out[start:stop] = self._predict_chunk(numeric[start:stop], index[start:stop])
+        return out
+
+    def predict_proba(self, inputs: pd.DataFrame | Mapping[str, Any]) -> np.ndarray:
+        """Class probabilities in scikit-learn's layout, so ``sweep_discounts`` and the scorers accept the model."""
+        probabilities = self.predict(inputs)
+        if self.n_outputs == 1:
+            return np.column_stack([1 - probabilities[:, 0], probabilities[:, 0]])
+        return probabilities
+
+def export_keras_model(model, path: str, **kwargs: Any) -> NumpyMLP:
+    """Export a fitted Keras model to ``path`` and return the NumPy runtime for it."""
+    runtime = NumpyMLP.from_keras(model, **kwargs)
+    runtime.save(path)
+    return runtime
@@ -0,0 +1,53 @@
+from typing import Any, Dict
+
+# Stage parameters shared by the scripts and fingerprinted by the pipeline runner
+
+# Discounts outside this range are flagged as outliers and clipped for modeling
+DISCOUNT_CLIP_LOWER = -10
+DISCOUNT_CLIP_UPPER = 50
+
+# Set to (low, high) quantiles to derive the outlier / clip bounds from the DISCOUNT_PERCENTAGE sketch instead
+DISCOUNT_OUTLIER_QUANTILES = None
+
+# DEAL_SIZE quantiles separating the Small / Medium / Large buckets
+DEAL_SIZE_QUANTILES = (0.33, 0.66)
+
+CLEANING_CHUNK_SIZE = 100_000
+
+# Fixed discount bins (5 points wide over the clip range) for expected-profit rollups
+DISCOUNT_BIN_EDGES = tuple(range(DISCOUNT_CLIP_LOWER, DISCOUNT_CLIP_UPPER + 1, 5))
+
+# Share of a PENDING deal's value counted in expected profit: DEAL_SIZE * (P_WON + factor * P_PENDING)
+PENDING_VALUE_FACTOR = 0.4
+
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+
+# Closing-model backend trained by model_curve.py (see utils/closing_model.py)
+CLOSING_MODEL_BACKEND = "gradient_boosting"
+
+FEATURE_PARAMS: Dict[str, Any] = {
+    "discount_clip_lower": DISCOUNT_CLIP_LOWER,
+    "discount_clip_upper": DISCOUNT_CLIP_UPPER,
+    "discount_outlier_quantiles": DISCOUNT_OUTLIER_QUANTILES,
+    "deal_size_quantiles": list(DEAL_SIZE_QUANTILES),
+}
+
+TRAINING_PARAMS: Dict[str, Any] = {
+    "random_state": RANDOM_STATE,
+    "test_size": TEST_SIZE,
+    "backend": CLOSING_MODEL_BACKEND,
+}
+
+# Cross-validated model search (search_models.py)
+SEARCH_FOLDS = 5
+SEARCH_ETA = 3  # Keep the top 1/eta configurations after every successive-halving rung
+SEARCH_MIN_FRACTION = 0.2  # Data fraction the first rung trains on
+
+SEARCH_PARAMS: Dict[str, Any] = {
+    "random_state": RANDOM_STATE,
+    "test_size": TEST_SIZE,
+    "folds": SEARCH_FOLDS,
+    "eta": SEARCH_ETA,
+    "min_fraction": SEARCH_MIN_FRACTION,
+}
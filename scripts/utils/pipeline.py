@@ -0,0 +1,179 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+MANIFEST_PATH = "../data/pipeline_manifest.json"
+MANIFEST_VERSION = 1
+
+@dataclass(frozen=True)
+class PipelineStage:
+    """One script in the clean -> model-ready -> train chain."""
+    name: str
+    script: str
+    inputs: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+    code: Sequence[str] = ()  # Modules the script imports, besides the script itself
+    params: Dict[str, Any] = field(default_factory=dict)
+    depends_on: Sequence[str] = ()
+    optional_inputs: Sequence[str] = ()  # Fingerprinted when present, e.g. a cache the stage itself creates
+
+def file_digest(path: str | Path, hash_cache: Dict[str, Dict[str, Any]] | None = None) -> str:
+    """SHA-256 of a file's contents, reusing the cached digest while size and mtime are unchanged."""
+    path = Path(path)
+    stat = path.stat()
+    key = str(path.resolve())
+    if hash_cache is not None:
+        cached = hash_cache.get(key)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha256"]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    sha256 = digest.hexdigest()
+
+    if hash_cache is not None:
+        hash_cache[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+    return sha256
+
+def stage_fingerprint(stage: PipelineStage, hash_cache: Dict[str, Dict[str, Any]] | None = None) -> str:
+    """Fingerprint a stage from its code, input contents, and parameters."""
+    payload = {
+        "name": stage.name,
+        "code": {path: file_digest(path, hash_cache) for path in [stage.script, *stage.code]},
+        "inputs": {path: file_digest(path, hash_cache) for path in stage.inputs},
+        "optional_inputs": {
+            path: file_digest(path, hash_cache) if os.path.exists(path) else None for path in stage.optional_inputs
+        },
+        "params": stage.params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, Any]:
+    if os.path.exists(path):
+        with open(path) as handle:
+            manifest = json.load(handle)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    return {"version": MANIFEST_VERSION, "stages": {}, "file_hashes": {}}
+
+def save_manifest(manifest: Dict[str, Any], path: str = MANIFEST_PATH) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def is_up_to_date(stage: PipelineStage, fingerprint: str, manifest: Dict[str, Any]) -> bool:
+    """A stage is fresh when its fingerprint matches and every recorded output is still on disk unchanged."""
+    record = manifest["stages"].get(stage.name)
+    if not record or record["fingerprint"] != fingerprint:
+        return False
+    for output, sha256 in record["outputs"].items():
+        if not os.path.exists(output) or file_digest(output, manifest["file_hashes"]) != sha256:
+            return False
+    return True
+
+def _run_script(stage: PipelineStage) -> tuple[int, float, str]:
+    start = time.perf_counter()
+    env = {**os.environ, "MPLBACKEND": "Agg"}  # Never block on plt.show() in unattended runs
+    completed = subprocess.run(
+        [sys.executable, stage.script],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    return completed.returncode, time.perf_counter() - start, completed.stdout + completed.stderr
+
+def run_pipeline(
+    stages: Sequence[PipelineStage],
+    targets: Sequence[str] | None = None,
+    force: bool = False,
+    max_workers: int = 2,
+    manifest_path: str = MANIFEST_PATH,
+) -> Dict[str, str]:
+    """Run stale stages in dependency order, independent stages in parallel processes.
+
+    Returns a {stage name: "skipped" | "ran" | "failed" | "blocked"} status map.
+    """
+    by_name = {stage.name: stage for stage in stages}
+
+    # Restrict to the requested targets and everything upstream of them
+    selected: List[str] = []
+    pending_names = list(targets or by_name)
+    while pending_names:
+        name = pending_names.pop()
+        if name not in selected:
+            selected.append(name)
+            pending_names.extend(by_name[name].depends_on)
+
+    manifest = load_manifest(manifest_path)
+    status: Dict[str, str] = {}
+    rerun: set = set()  # Stages that ran this session; their dependents must rerun too
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while len(status) < len(selected):
+            for name in selected:
+                if name in status or name in running.values():
+                    continue
+                stage = by_name[name]
+                deps = [dep for dep in stage.depends_on if dep in selected]
+                if any(status.get(dep) in ("failed", "blocked") for dep in deps):
+                    status[name] = "blocked"
+                    print(f"[{name}] blocked by failed dependency")
+                    continue
+                if not all(dep in status for dep in deps):
+                    continue
+
+                fingerprint = stage_fingerprint(stage, manifest["file_hashes"])
+                if not force and not rerun.intersection(deps) and is_up_to_date(stage, fingerprint, manifest):
+                    status[name] = "skipped"
+                    print(f"[{name}] up to date ({fingerprint[:12]})")
+                    continue
+
+                print(f"[{name}] running {stage.script}")
+                running[executor.submit(_run_script, stage)] = name
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                stage = by_name[name]
+                returncode, seconds, output = future.result()
+                if returncode != 0:
+                    status[name] = "failed"
+                    print(f"[{name}] failed after {seconds:.1f}s\n{output}")
+                    continue
+
+                missing = [path for path in stage.outputs if not os.path.exists(path)]
+                if missing:
+                    status[name] = "failed"
+                    print(f"[{name}] finished but did not produce {missing}")
+                    continue
+
+                status[name] = "ran"
+                rerun.add(name)
+                manifest["stages"][name] = {
+                    "fingerprint": stage_fingerprint(stage, manifest["file_hashes"]),
+                    "script": stage.script,
+                    "params": stage.params,
+                    "outputs": {path: file_digest(path, manifest["file_hashes"]) for path in stage.outputs},
+                    "duration_seconds": round(seconds, 3),
+                    "finished_at": datetime.now(timezone.utc).isoformat(),
+                }
+                save_manifest(manifest, manifest_path)
+                print(f"[{name}] done in {seconds:.1f}s")
+
+    return status
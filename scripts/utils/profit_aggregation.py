@@ -0,0 +1,215 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Sequence
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from utils.batch_scoring import CHUNK_ROWS, ScoreTask, plan_tasks, read_task
+from utils.params import DISCOUNT_BIN_EDGES, PENDING_VALUE_FACTOR
+from utils.scenarios import CATEGORICAL_COL, DEAL_SIZE_COL, DISCOUNT_COL, discount_bin_labels, discount_bins
+
+MONTH_COL = "MONTH_ID"
+MONTHS = 12
+ROLLUP_DIMENSIONS = (CATEGORICAL_COL, "DISCOUNT_BIN", MONTH_COL)
+# Summed per cell; WIN_WEIGHT is P_WON + pending_value_factor * P_PENDING, EXPECTED_PROFIT is DEAL_SIZE * WIN_WEIGHT
+ROLLUP_FIELDS = ("COUNT", "DEAL_SIZE", "P_WON", "P_PENDING", "WIN_WEIGHT", "EXPECTED_PROFIT")
+
+class ProfitRollup:
+    """Mergeable expected-profit sums per (product line, discount bin, month).
+
+    Each ``update`` folds a chunk of predictions into a dense array of sums
+    with one ``bincount`` per field, so no row-level data is kept. Deal sizes
+    travel in the same chunk as the predictions (DEAL_SIZE, or PRICEEACH *
+    QUANTITYORDERED), which removes the notebook's index alignment. Bin edges
+    are fixed up front, so partials built in different processes ``merge`` by
+    adding arrays, with product lines remapped by name.
+    """
+
+    def __init__(self, bin_edges: Sequence[float] = DISCOUNT_BIN_EDGES, pending_value_factor: float = PENDING_VALUE_FACTOR):
+        self.bin_edges = np.asarray(bin_edges, dtype=float)
+        self.pending_value_factor = float(pending_value_factor)
+        self.categories: List[str] = []
+        self.sums = np.zeros((0, len(self.bin_edges) - 1, MONTHS, len(ROLLUP_FIELDS)))
+        self.skipped = 0
+
+    def _codes(self, categories: Sequence[str]) -> np.ndarray:
+        """Positions of ``categories`` in ``self.categories``, appending (and growing ``sums`` for) new ones."""
+        known = {category: code for code, category in enumerate(self.categories)}
+        new = [category for category in dict.fromkeys(categories) if category not in known]
+        if new:
+            for category in new:
+                known[category] = len(self.categories)
+                self.categories.append(category)
+            self.sums = np.concatenate([self.sums, np.zeros((len(new), *self.sums.shape[1:]))])
+        return np.array([known[category] for category in categories], dtype=np.int64)
+
+    def update(self, chunk: pd.DataFrame, won_col: str = "P_WON", pending_col: str | None = "P_PENDING") -> "ProfitRollup":
+        """Fold in a chunk with PRODUCTLINE, the discount, MONTH_ID, deal size and class probabilities. Returns self.
+
+        ``pending_col`` may be None (or absent from the chunk) for binary close
+        probabilities. Rows missing any of these, or with a month outside
+        1-12, are counted in ``skipped``.
+        """
+        if DEAL_SIZE_COL in chunk:
+            deal_size = pd.to_numeric(chunk[DEAL_SIZE_COL]).to_numpy(dtype=float)
+        else:
+            deal_size = (pd.to_numeric(chunk["PRICEEACH"]) * pd.to_numeric(chunk["QUANTITYORDERED"])).to_numpy(dtype=float)
+        discount = pd.to_numeric(chunk[DISCOUNT_COL]).to_numpy(dtype=float)
+        month = pd.to_numeric(chunk[MONTH_COL]).to_numpy(dtype=float)
+        p_won = pd.to_numeric(chunk[won_col]).to_numpy(dtype=float)
+        if pending_col and pending_col in chunk:
+            p_pending = pd.to_numeric(chunk[pending_col]).to_numpy(dtype=float)
+        else:
+            p_pending = np.zeros(len(chunk))
+        productline = chunk[CATEGORICAL_COL]
+
+        valid = productline.notna().to_numpy() & (month >= 1) & (month <= MONTHS)
+        for values in (deal_size, discount, p_won, p_pending):
+            valid &= ~np.isnan(values)
+        self.skipped += int(len(chunk) - valid.sum())
+        if not valid.any():
+            return self
+
+        codes = self._codes(productline[valid].astype(str).tolist())
+        n_bins = self.sums.shape[1]
+        cells = (codes * n_bins + discount_bins(discount[valid], self.bin_edges)) * MONTHS + month[valid].astype(np.int64) - 1
+        deal_size, p_won, p_pending = deal_size[valid], p_won[valid], p_pending[valid]
+        win_weight = p_won + self.pending_value_factor * p_pending
+        cell_shape, size = self.sums.shape[:3], int(np.prod(self.sums.shape[:3]))
+        for field, values in enumerate((None, deal_size, p_won, p_pending, win_weight, deal_size * win_weight)):
+            self.sums[..., field] += np.bincount(cells, weights=values, minlength=size).reshape(cell_shape)
+        return self
+
+    def merge(self, other: "ProfitRollup") -> "ProfitRollup":
+        """Fold ``other`` (same bin edges and pending factor) into this rollup. Returns self."""
+        if not np.array_equal(other.bin_edges, self.bin_edges) or other.pending_value_factor != self.pending_value_factor:
+            raise ValueError("Can only merge rollups with the same discount bin edges and pending value factor")
+        if other.categories:
+            codes = self._codes(other.categories)  # Grows ``sums`` first for product lines new to this rollup
+            self.sums[codes] += other.sums
+        self.skipped += other.skipped
+        return self
+
+    @property
+    def rows(self) -> int:
+        return int(self.sums[..., 0].sum())
+
+    def rollup(self, by: Sequence[str] = ROLLUP_DIMENSIONS) -> pd.DataFrame:
+        """Per-group COUNT, mean P_WON / P_PENDING / EXPECTED_PROFIT and totals, over any subset of ROLLUP_DIMENSIONS.
+
+        ``rollup(["DISCOUNT_BIN"])`` is the notebook's
+        ``calculate_and_plot_expected_profit`` table on fixed bins; empty
+        groups are left out.
+        """
+        unknown = [dim for dim in by if dim not in ROLLUP_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Cannot roll up by {unknown}; choose from {ROLLUP_DIMENSIONS}")
+        kept = [dim for dim in ROLLUP_DIMENSIONS if dim in by]
+        order = np.argsort(self.categories, kind="stable").astype(np.int64)
+        totals = self.sums[order].sum(axis=tuple(axis for axis, dim in enumerate(ROLLUP_DIMENSIONS) if dim not in by))
+        levels = {
+            CATEGORICAL_COL: [self.categories[code] for code in order],
+            "DISCOUNT_BIN": discount_bin_labels(self.bin_edges),
+            MONTH_COL: list(range(1, MONTHS + 1)),
+        }
+        index = pd.MultiIndex.from_product([levels[dim] for dim in kept], names=kept) if kept else pd.RangeIndex(1)
+        sums = pd.DataFrame(totals.reshape(-1, len(ROLLUP_FIELDS)), columns=ROLLUP_FIELDS, index=index)
+        sums = sums[sums["COUNT"] > 0]
+
+        frame = pd.DataFrame({"COUNT": sums["COUNT"].astype(np.int64)}, index=sums.index)
+        for field in ["P_WON", "P_PENDING", "WIN_WEIGHT", "EXPECTED_PROFIT"]:
+            frame[field] = sums[field] / sums["COUNT"]
+        frame["TOTAL_DEAL_SIZE"] = sums["DEAL_SIZE"]
+        frame["TOTAL_EXPECTED_PROFIT"] = sums["EXPECTED_PROFIT"]
+        frame = frame.reset_index(drop=not kept)
+        if kept:
+            frame = frame[[*by, *frame.columns.drop(kept)]]
+        return frame
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bin_edges": self.bin_edges.tolist(),
+            "pending_value_factor": self.pending_value_factor,
+            "categories": self.categories,
+            "sums": self.sums.tolist(),
+            "skipped": self.skipped,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProfitRollup":
+        rollup = cls(data["bin_edges"], data["pending_value_factor"])
+        rollup.categories = list(data["categories"])
+        rollup.sums = np.asarray(data["sums"], dtype=float).reshape(len(rollup.categories), *rollup.sums.shape[1:])
+        rollup.skipped = data["skipped"]
+        return rollup
+
+def rollup_chunks(
+    chunks: Iterable[pd.DataFrame],
+    won_col: str = "P_WON",
+    pending_col: str | None = "P_PENDING",
+    bin_edges: Sequence[float] = DISCOUNT_BIN_EDGES,
+    pending_value_factor: float = PENDING_VALUE_FACTOR,
+) -> ProfitRollup:
+    """Aggregate an iterable of prediction chunks (e.g. ``pd.read_csv(..., chunksize=...)``) one chunk at a time."""
+    rollup = ProfitRollup(bin_edges, pending_value_factor)
+    for chunk in chunks:
+        rollup.update(chunk, won_col, pending_col)
+    return rollup
+
+def _file_columns(path: str) -> List[str]:
+    if path.endswith(".parquet"):
+        return list(pq.ParquetFile(path).schema_arrow.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+# ---- Worker processes: each task reads and aggregates one chunk of the predictions file ----
+
+_worker_state: Dict[str, Any] = {}
+
+def _init_worker(header: bytes | None, columns: List[str], options: Dict[str, Any]) -> None:
+    _worker_state.update(header=header, columns=columns, options=options)
+
+def _rollup_task(task: ScoreTask) -> ProfitRollup:
+    options = _worker_state["options"]
+    chunk = read_task(task, _worker_state["header"], _worker_state["columns"])
+    rollup = ProfitRollup(options["bin_edges"], options["pending_value_factor"])
+    return rollup.update(chunk, options["won_col"], options["pending_col"])
+
+def rollup_predictions(
+    path: str,
+    won_col: str = "P_WON",
+    pending_col: str | None = "P_PENDING",
+    bin_edges: Sequence[float] = DISCOUNT_BIN_EDGES,
+    pending_value_factor: float = PENDING_VALUE_FACTOR,
+    chunk_rows: int = CHUNK_ROWS,
+    max_workers: int | None = None,
+) -> ProfitRollup:
+    """Aggregate a CSV or Parquet file of predictions chunk by chunk across a process pool.
+
+    Chunks are the CSV byte ranges / Parquet row groups batch scoring uses;
+    each worker returns a partial rollup and the partials are merged in order.
+    """
+    available = _file_columns(path)
+    deal_size_cols = [DEAL_SIZE_COL] if DEAL_SIZE_COL in available else ["PRICEEACH", "QUANTITYORDERED"]
+    probability_cols = [won_col] + ([pending_col] if pending_col and pending_col in available else [])
+    columns = [CATEGORICAL_COL, DISCOUNT_COL, MONTH_COL, *deal_size_cols, *probability_cols]
+    missing = [col for col in columns if col not in available]
+    if missing:
+        raise ValueError(f"{path} is missing columns {missing}")
+
+    header, tasks = plan_tasks(path, chunk_rows)
+    options = {
+        "won_col": won_col,
+        "pending_col": pending_col,
+        "bin_edges": tuple(bin_edges),
+        "pending_value_factor": pending_value_factor,
+    }
+    rollup = ProfitRollup(bin_edges, pending_value_factor)
+    if max_workers == 1:
+        _init_worker(header, columns, options)
+        for task in tasks:
+            rollup.merge(_rollup_task(task))
+        return rollup
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(header, columns, options)) as pool:
+        for partial in pool.map(_rollup_task, tasks):
+            rollup.merge(partial)
+    return rollup
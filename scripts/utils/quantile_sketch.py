@@ -0,0 +1,132 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Sequence
+import json
+import numpy as np
+
+DEFAULT_K = 4096
+
+class QuantileSketch:
+    """KLL-style mergeable quantile sketch with bounded memory.
+
+    Values land in level 0; when the sketch holds more items than its
+    capacity, the lowest full level is sorted and every other item (random
+    offset) is promoted one level up with twice the weight. Capacities shrink
+    by 2/3 per level below the top, so memory stays O(k) however many values
+    are added, and the rank error is roughly 1.7 / k (well under 0.1% at the
+    default k). Until the first compaction the sketch holds every value and
+    quantiles are exact, matching ``Series.quantile`` (linear interpolation).
+
+    Sketches built over different chunks or workers ``merge`` into one with
+    the same error bound.
+    """
+
+    def __init__(self, k: int = DEFAULT_K, seed: int = 0):
+        self.k = k
+        self.seed = seed
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_values(cls, values: Any, k: int = DEFAULT_K, seed: int = 0) -> "QuantileSketch":
+        return cls(k, seed).update(values)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    @property
+    def size(self) -> int:
+        """Items currently retained."""
+        return sum(len(items) for items in self.levels)
+
+    @property
+    def is_exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def update(self, values: Any) -> "QuantileSketch":
+        """Add values (NaN / missing values are skipped). Returns self."""
+        if hasattr(values, "to_numpy"):
+            values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Fold ``other`` into this sketch. Returns self."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self) -> None:
+        while self.size > sum(self._capacity(level) for level in range(len(self.levels))):
+            level = next(h for h in range(len(self.levels)) if len(self.levels[h]) >= self._capacity(h))
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # An odd item out stays behind so the total weight is preserved exactly
+            leftover, items = (items[-1:], items[:-1]) if len(items) % 2 else (items[:0], items)
+            promoted = items[int(self.rng.integers(2))::2]
+            self.levels[level] = leftover
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """Approximate quantiles (exact while nothing has been compacted)."""
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if self.is_exact:
+            return np.quantile(self.levels[0], qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(values), 2 ** level) for level, values in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, qs * (self.n - 1), side="right")
+        result = items[np.minimum(positions, len(items) - 1)]
+        return np.clip(result, self.min, self.max)
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "seed": self.seed,
+            "n": self.n,
+            "min": self.min if self.n else None,
+            "max": self.max if self.n else None,
+            "levels": [items.tolist() for items in self.levels],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["k"], data["seed"])
+        sketch.n = data["n"]
+        sketch.min = data["min"] if data["min"] is not None else np.inf
+        sketch.max = data["max"] if data["max"] is not None else -np.inf
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in data["levels"]]
+        sketch.rng = np.random.default_rng([data["seed"], data["n"]])  # Fresh but reproducible compaction offsets
+        return sketch
+
+def save_sketches(sketches: Dict[str, QuantileSketch], path: str, **extra: Any) -> None:
+    """Write named sketches (plus any extra JSON fields, e.g. the edges derived from them) to ``path``."""
+    with open(path, "w") as f:
+        json.dump({**extra, "sketches": {name: sketch.to_dict() for name, sketch in sketches.items()}}, f)
+
+def load_sketches(path: str) -> Dict[str, QuantileSketch]:
+    with open(path) as f:
+        return {name: QuantileSketch.from_dict(data) for name, data in json.load(f)["sketches"].items()}
@@ -0,0 +1,371 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+import json
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from utils.params import DISCOUNT_BIN_EDGES, PENDING_VALUE_FACTOR, RANDOM_STATE
+from utils.quantile_sketch import QuantileSketch
+
+DISCOUNT_COL = "DISCOUNT_PCT_CLIPPED"
+CATEGORICAL_COL = "PRODUCTLINE"
+DEAL_SIZE_COL = "DEAL_SIZE"
+SCENARIO_CHUNK_ROWS = 100_000
+SKETCH_K = 1024
+CONFIDENCE = 0.95
+
+DISTRIBUTIONS = ("normal", "uniform", "constant")
+MODES = ("set", "shift", "scale", "log_scale")
+
+Predictor = Callable[[Dict[str, np.ndarray]], Tuple[np.ndarray, np.ndarray]]
+
+@dataclass(frozen=True)
+class Perturbation:
+    """A random change to one feature, drawn independently for every scenario.
+
+    ``distribution`` is "normal" (params: mean, std), "uniform" (low, high) or
+    "constant" (value). ``mode`` says how a draw d changes the base value v:
+    "set" (d), "shift" (v + d), "scale" (v * (1 + d)) or "log_scale" (v * e^d).
+    """
+    column: str
+    distribution: str
+    params: Tuple[float, ...]
+    mode: str = "set"
+
+    def __post_init__(self):
+        if self.distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution {self.distribution!r}; expected one of {DISTRIBUTIONS}")
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown mode {self.mode!r}; expected one of {MODES}")
+        expected = 1 if self.distribution == "constant" else 2
+        if len(self.params) != expected:
+            raise ValueError(f"{self.distribution} perturbation of {self.column} takes {expected} params, got {self.params}")
+
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        if self.distribution == "normal":
+            return rng.normal(self.params[0], self.params[1], size=n)
+        if self.distribution == "uniform":
+            return rng.uniform(self.params[0], self.params[1], size=n)
+        return np.full(n, float(self.params[0]))
+
+    def apply(self, values: np.ndarray, draws: np.ndarray) -> np.ndarray:
+        if self.mode == "shift":
+            return values + draws
+        if self.mode == "scale":
+            return values * (1 + draws)
+        if self.mode == "log_scale":
+            return values * np.exp(draws)
+        return draws
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"column": self.column, "distribution": self.distribution, "params": list(self.params), "mode": self.mode}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Perturbation":
+        return cls(data["column"], data["distribution"], tuple(float(p) for p in data["params"]), data.get("mode", "set"))
+
+def jitter(column: str, pct: float) -> Perturbation:
+    """The notebook's ``jitter``: multiply by 1 + N(0, pct)."""
+    return Perturbation(column, "normal", (0.0, pct), "scale")
+
+def discount_range(low: float, high: float) -> Perturbation:
+    """Set the discount uniformly in [low, high]; price and deal size follow (see ``generate_scenarios``)."""
+    return Perturbation(DISCOUNT_COL, "uniform", (low, high))
+
+def deal_size_shock(log_shift: float, spread: float = 0.0) -> Perturbation:
+    """Scale DEAL_SIZE by e^N(log_shift, spread); QUANTITYORDERED and LOG_DEAL_SIZE follow (see ``generate_scenarios``)."""
+    if spread:
+        return Perturbation(DEAL_SIZE_COL, "normal", (log_shift, spread), "log_scale")
+    return Perturbation(DEAL_SIZE_COL, "constant", (log_shift,), "log_scale")
+
+@dataclass(frozen=True)
+class ScenarioSpec:
+    """A what-if run: ``samples`` draws of the base deals, each perturbed in order."""
+    perturbations: Tuple[Perturbation, ...]
+    samples: int
+    seed: int = RANDOM_STATE
+    chunk_rows: int = SCENARIO_CHUNK_ROWS
+
+    @property
+    def n_chunks(self) -> int:
+        return -(-self.samples // self.chunk_rows)
+
+    def chunk_size(self, chunk_index: int) -> int:
+        return min(self.chunk_rows, self.samples - chunk_index * self.chunk_rows)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "perturbations": [p.to_dict() for p in self.perturbations],
+            "samples": self.samples,
+            "seed": self.seed,
+            "chunk_rows": self.chunk_rows,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScenarioSpec":
+        return cls(
+            tuple(Perturbation.from_dict(p) for p in data["perturbations"]),
+            int(data["samples"]),
+            int(data.get("seed", RANDOM_STATE)),
+            int(data.get("chunk_rows", SCENARIO_CHUNK_ROWS)),
+        )
+
+def load_scenario_spec(path: str) -> ScenarioSpec:
+    with open(path) as f:
+        return ScenarioSpec.from_dict(json.load(f))
+
+@dataclass
+class BaseDeals:
+    """Base deals as column arrays: float64 numerics plus PRODUCTLINE codes into ``categories``."""
+    numeric: Dict[str, np.ndarray]
+    codes: np.ndarray
+    categories: np.ndarray
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, feature_cols: Sequence[str]) -> "BaseDeals":
+        """Encode the model's features plus DEAL_SIZE and the discount, dropping incomplete rows."""
+        numeric_cols = list(dict.fromkeys(c for c in [*feature_cols, DISCOUNT_COL, DEAL_SIZE_COL] if c != CATEGORICAL_COL))
+        frame = frame.dropna(subset=[CATEGORICAL_COL, *numeric_cols])
+        if frame.empty:
+            raise ValueError("No complete base deals to build scenarios from")
+        codes, categories = pd.factorize(frame[CATEGORICAL_COL].astype(str), sort=True)
+        numeric = {col: frame[col].to_numpy(dtype=np.float64) for col in numeric_cols}
+        return cls(numeric, codes.astype(np.int64), np.asarray(categories, dtype=object))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+def generate_scenarios(base: BaseDeals, spec: ScenarioSpec, chunk_index: int) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """(feature arrays incl. PRODUCTLINE strings, PRODUCTLINE codes) for one chunk of scenarios.
+
+    Each chunk draws from its own stream spawned off ``spec.seed``, so a run
+    is reproducible whatever the worker count. Deals are drawn uniformly with
+    replacement, then every perturbation is applied in order. A DEAL_SIZE
+    perturbation is carried into QUANTITYORDERED (same price, bigger order)
+    and LOG_DEAL_SIZE so the model sees the shocked deal. A discount
+    perturbation reprices the deal: PRICEEACH, PRICE_TO_MSRP_RATIO and
+    DEAL_SIZE (same order, same MSRP) scale by (100 - new) / (100 - old), so
+    a deeper discount costs revenue in the expected profit.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(spec.seed, spawn_key=(chunk_index,)))
+    n = spec.chunk_size(chunk_index)
+    rows = rng.integers(0, len(base), size=n)
+    arrays = {col: values[rows] for col, values in base.numeric.items()}
+    for perturbation in spec.perturbations:
+        before = arrays[perturbation.column]
+        arrays[perturbation.column] = perturbation.apply(before, perturbation.draw(rng, n))
+        if perturbation.column == DEAL_SIZE_COL:
+            if "QUANTITYORDERED" in arrays:
+                ratio = np.divide(arrays[DEAL_SIZE_COL], before, out=np.ones(n), where=before != 0)
+                arrays["QUANTITYORDERED"] = arrays["QUANTITYORDERED"] * ratio
+            if "LOG_DEAL_SIZE" in arrays:
+                arrays["LOG_DEAL_SIZE"] = np.log1p(arrays[DEAL_SIZE_COL])
+        elif perturbation.column == DISCOUNT_COL:
+            price_ratio = np.divide(100 - arrays[DISCOUNT_COL], 100 - before, out=np.ones(n), where=before != 100)
+            for col in ["PRICEEACH", "PRICE_TO_MSRP_RATIO", DEAL_SIZE_COL]:
+                if col in arrays:
+                    arrays[col] = arrays[col] * price_ratio
+            if "LOG_DEAL_SIZE" in arrays:
+                arrays["LOG_DEAL_SIZE"] = np.log1p(arrays[DEAL_SIZE_COL])
+    codes = base.codes[rows]
+    arrays[CATEGORICAL_COL] = base.categories[codes]
+    return arrays, codes
+
+class StatusModelPredictor:
+    """(P_WON, P_PENDING) from the status model (softmax classes 0 LOST, 1 PENDING, 2 WON), e.g. a NumpyMLP."""
+
+    def __init__(self, model):
+        self.model = model
+        self.feature_cols = list(model.feature_cols)
+
+    def __call__(self, arrays: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        probabilities = self.model.predict(arrays)
+        return probabilities[:, 2], probabilities[:, 1]
+
+class ClosingModelPredictor:
+    """(P(close), 0) from the binary closing Pipeline, which has no pending class."""
+
+    def __init__(self, model):
+        self.model = model
+        self.feature_cols = list(model.feature_names_in_)
+
+    def __call__(self, arrays: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        frame = pd.DataFrame({col: arrays[col] for col in self.feature_cols})
+        p_won = self.model.predict_proba(frame)[:, 1]
+        return p_won, np.zeros_like(p_won)
+
+def discount_bins(discount: np.ndarray, bin_edges: Sequence[float]) -> np.ndarray:
+    """Bin index per discount; values past the outer edges land in the first / last bin."""
+    edges = np.asarray(bin_edges, dtype=float)
+    return np.clip(np.searchsorted(edges, discount, side="right") - 1, 0, len(edges) - 2)
+
+def discount_bin_labels(bin_edges: Sequence[float]) -> List[str]:
+    edges = list(bin_edges)
+    return [f"[{low:g}, {high:g}{']' if i == len(edges) - 2 else ')'}" for i, (low, high) in enumerate(zip(edges, edges[1:]))]
+
+class ProfitDistribution:
+    """Mergeable expected-profit summary per (product line, discount bin).
+
+    Keeps counts, running means and M2 (sum of squared deviations, merged with
+    Chan's pairwise update) for the mean's confidence interval, P_WON /
+    P_PENDING sums, and a quantile sketch per group for the spread of
+    scenario outcomes. Partials from different chunks or workers ``merge``.
+    """
+
+    def __init__(self, categories: Sequence[str], bin_edges: Sequence[float] = DISCOUNT_BIN_EDGES, k: int = SKETCH_K):
+        self.categories = np.asarray(categories, dtype=object)
+        self.bin_edges = np.asarray(bin_edges, dtype=float)
+        self.k = k
+        shape = (len(self.categories), len(self.bin_edges) - 1)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.won_sum = np.zeros(shape)
+        self.pending_sum = np.zeros(shape)
+        self.sketches: Dict[int, QuantileSketch] = {}
+
+    def _sketch(self, group: int) -> QuantileSketch:
+        if group not in self.sketches:
+            self.sketches[group] = QuantileSketch(self.k, seed=group)
+        return self.sketches[group]
+
+    def _merge_moments(self, count: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> None:
+        total = self.count + count
+        safe = np.maximum(total, 1)
+        delta = mean - self.mean
+        self.m2 += m2 + delta ** 2 * self.count * count / safe
+        self.mean += delta * count / safe
+        self.count = total
+
+    def update(
+        self, codes: np.ndarray, discount: np.ndarray, expected_profit: np.ndarray, p_won: np.ndarray, p_pending: np.ndarray,
+    ) -> "ProfitDistribution":
+        """Fold in one batch of scenario outcomes. Returns self."""
+        shape, size = self.count.shape, self.count.size
+        groups = np.asarray(codes) * shape[1] + discount_bins(discount, self.bin_edges)
+        count = np.bincount(groups, minlength=size)
+        mean = np.bincount(groups, weights=expected_profit, minlength=size) / np.maximum(count, 1)
+        m2 = np.bincount(groups, weights=(expected_profit - mean[groups]) ** 2, minlength=size)
+        self._merge_moments(count.reshape(shape), mean.reshape(shape), m2.reshape(shape))
+        self.won_sum += np.bincount(groups, weights=p_won, minlength=size).reshape(shape)
+        self.pending_sum += np.bincount(groups, weights=p_pending, minlength=size).reshape(shape)
+
+        order = np.argsort(groups, kind="stable")
+        present, starts = np.unique(groups[order], return_index=True)
+        for group, values in zip(present, np.split(expected_profit[order], starts[1:])):
+            self._sketch(int(group)).update(values)
+        return self
+
+    def merge(self, other: "ProfitDistribution") -> "ProfitDistribution":
+        """Fold ``other`` (same categories and bin edges) into this summary. Returns self."""
+        if list(other.categories) != list(self.categories) or not np.array_equal(other.bin_edges, self.bin_edges):
+            raise ValueError("Can only merge profit distributions over the same product lines and discount bins")
+        self._merge_moments(other.count, other.mean, other.m2)
+        self.won_sum += other.won_sum
+        self.pending_sum += other.pending_sum
+        for group, sketch in other.sketches.items():
+            self._sketch(group).merge(sketch)
+        return self
+
+    def collapsed(self) -> "ProfitDistribution":
+        """The same summary with every product line folded into one "All" row per discount bin."""
+        n_bins = self.count.shape[1]
+        total = ProfitDistribution(["All"], self.bin_edges, self.k)
+        for code in range(len(self.categories)):
+            part = ProfitDistribution(["All"], self.bin_edges, self.k)
+            part.count, part.mean, part.m2 = self.count[code:code + 1], self.mean[code:code + 1], self.m2[code:code + 1]
+            part.won_sum, part.pending_sum = self.won_sum[code:code + 1], self.pending_sum[code:code + 1]
+            part.sketches = {
+                group - code * n_bins: QuantileSketch.from_dict(sketch.to_dict())
+                for group, sketch in self.sketches.items() if group // n_bins == code
+            }
+            total.merge(part)
+        return total
+
+    def to_frame(self, confidence: float = CONFIDENCE) -> pd.DataFrame:
+        """One row per non-empty (PRODUCTLINE, DISCOUNT_BIN) with mean probabilities and expected profit.
+
+        EXPECTED_PROFIT_CI_LOW/HIGH bound the mean expected profit (normal
+        approximation); PROFIT_INTERVAL_LOW/HIGH are the central
+        ``confidence`` share of individual scenario outcomes.
+        """
+        z = norm.ppf(0.5 + confidence / 2)
+        tails = [(1 - confidence) / 2, 0.5, (1 + confidence) / 2]
+        labels = discount_bin_labels(self.bin_edges)
+        n_bins = self.count.shape[1]
+        rows = []
+        for group in np.flatnonzero(self.count.reshape(-1)):
+            code, bin_index = divmod(int(group), n_bins)
+            n = self.count[code, bin_index]
+            mean = self.mean[code, bin_index]
+            std_error = np.sqrt(self.m2[code, bin_index] / (n - 1) / n) if n > 1 else np.nan
+            low, median, high = self.sketches[int(group)].quantiles(tails)
+            rows.append({
+                "PRODUCTLINE": self.categories[code],
+                "DISCOUNT_BIN": labels[bin_index],
+                "SCENARIOS": int(n),
+                "P_WON": self.won_sum[code, bin_index] / n,
+                "P_PENDING": self.pending_sum[code, bin_index] / n,
+                "EXPECTED_PROFIT": mean,
+                "EXPECTED_PROFIT_CI_LOW": mean - z * std_error,
+                "EXPECTED_PROFIT_CI_HIGH": mean + z * std_error,
+                "PROFIT_INTERVAL_LOW": low,
+                "PROFIT_MEDIAN": median,
+                "PROFIT_INTERVAL_HIGH": high,
+            })
+        return pd.DataFrame(rows)
+
+def simulate_chunk(
+    base: BaseDeals,
+    spec: ScenarioSpec,
+    predict: Predictor,
+    chunk_index: int,
+    bin_edges: Sequence[float] = DISCOUNT_BIN_EDGES,
+    pending_value_factor: float = PENDING_VALUE_FACTOR,
+) -> ProfitDistribution:
+    """Generate, score and summarize one chunk of scenarios."""
+    arrays, codes = generate_scenarios(base, spec, chunk_index)
+    p_won, p_pending = predict(arrays)
+    p_won, p_pending = np.asarray(p_won, dtype=np.float64), np.asarray(p_pending, dtype=np.float64)
+    expected_profit = arrays[DEAL_SIZE_COL] * (p_won + pending_value_factor * p_pending)
+    return ProfitDistribution(base.categories, bin_edges).update(codes, arrays[DISCOUNT_COL], expected_profit, p_won, p_pending)
+
+# ---- Worker processes: the base deals and model are handed over once, then each task is a chunk index ----
+
+_worker_state: Dict[str, Any] = {}
+
+def _init_worker(base: BaseDeals, spec: ScenarioSpec, predict: Predictor, bin_edges: Sequence[float], pending_value_factor: float) -> None:
+    _worker_state.update(base=base, spec=spec, predict=predict, bin_edges=bin_edges, pending_value_factor=pending_value_factor)
+
+def _simulate_task(chunk_index: int) -> ProfitDistribution:
+    return simulate_chunk(chunk_index=chunk_index, **_worker_state)
+
+def run_scenarios(
+    base: BaseDeals,
+    spec: ScenarioSpec,
+    predict: Predictor,
+    bin_edges: Sequence[float] = DISCOUNT_BIN_EDGES,
+    pending_value_factor: float = PENDING_VALUE_FACTOR,
+    max_workers: int | None = None,
+) -> ProfitDistribution:
+    """Run ``spec`` against ``base`` and return the merged expected-profit distribution.
+
+    Chunks are scored across a process pool and merged in chunk order, so the
+    result is identical for any ``max_workers``.
+    """
+    missing = sorted({p.column for p in spec.perturbations} - set(base.numeric))
+    if missing:
+        raise ValueError(f"Perturbed columns not in the base deals: {missing}")
+    init_args = (base, spec, predict, tuple(bin_edges), pending_value_factor)
+    summary = ProfitDistribution(base.categories, bin_edges)
+    if max_workers == 1:
+        _init_worker(*init_args)
+        for chunk_index in range(spec.n_chunks):
+            summary.merge(_simulate_task(chunk_index))
+        return summary
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=init_args) as pool:
+        for partial in pool.map(_simulate_task, range(spec.n_chunks)):
+            summary.merge(partial)
+    return summary
@@ -0,0 +1,162 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+import queue
+import threading
+import time
+import numpy as np
+import pandas as pd
+from joblib import load
+from utils.features import bucket_by_edges
+
+MODEL_PATH = "../models/sales_closing_model.joblib"
+
+def load_closing_model(path: str = MODEL_PATH):
+    """Load the fitted closing Pipeline and return (model, feature column order)."""
+    model = load(path)
+    return model, list(model.feature_names_in_)
+
+def deal_size_buckets(frame: pd.DataFrame, edges: Sequence[float]) -> List[str]:
+    """Bucket scoring rows with the persisted training edges (see features.load_deal_size_edges)."""
+    deal_size = pd.to_numeric(frame["PRICEEACH"]) * pd.to_numeric(frame["QUANTITYORDERED"])
+    return bucket_by_edges(deal_size, edges).astype(object).where(lambda buckets: buckets.notna(), None).tolist()
+
+def rows_to_frame(
+    rows: Sequence[Dict[str, Any]], feature_cols: Sequence[str], categorical_cols: Sequence[str] = ("PRODUCTLINE",),
+) -> pd.DataFrame:
+    """Build a scoring frame from raw dicts, failing fast on empty requests, missing features and non-numeric values.
+
+    Categorical features become strings and every other feature float, so a
+    frame that passes here cannot fail inside a shared predict batch.
+    """
+    if not isinstance(rows, (list, tuple)) or not rows:
+        raise ValueError("Expected a non-empty list of rows")
+    if not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Every row must be a JSON object of feature values")
+    missing = [col for col in feature_cols if any(col not in row for row in rows)]
+    if missing:
+        raise ValueError(f"Missing features: {missing}")
+    frame = pd.DataFrame([{col: row[col] for col in feature_cols} for row in rows], columns=list(feature_cols))
+    for col in feature_cols:
+        if col in categorical_cols:
+            frame[col] = frame[col].astype(str)
+            continue
+        values = pd.to_numeric(frame[col], errors="coerce")
+        if values.isna().any():
+            raise ValueError(f"Non-numeric or missing values for {col}")
+        frame[col] = values.astype(float)
+    return frame
+
+class LatencyRecorder:
+    """Rolling window of request latencies plus lifetime request counters."""
+
+    def __init__(self, window: int = 10_000):
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+
+    def record(self, seconds: float, rows: int = 1) -> None:
+        with self.lock:
+            self.latencies.append(seconds)
+            self.requests += 1
+            self.rows += rows
+
+    def record_batch(self) -> None:
+        with self.lock:
+            self.batches += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            elapsed = time.monotonic() - self.started_at
+            requests, rows, batches = self.requests, self.rows, self.batches
+        return {
+            "requests": requests,
+            "rows": rows,
+            "predict_calls": batches,
+            "requests_per_second": requests / elapsed if elapsed else 0.0,
+            "rows_per_second": rows / elapsed if elapsed else 0.0,
+            "mean_requests_per_predict": requests / batches if batches else 0.0,
+            "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "latency_p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+        }
+
+class MicroBatcher:
+    """Coalesce concurrent scoring requests into one predict call.
+
+    A worker thread drains the request queue until ``max_batch_rows`` rows are
+    collected or ``max_wait_seconds`` has passed since the first request, then
+    scores the concatenated frame once and hands each caller its slice.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[pd.DataFrame], np.ndarray],
+        max_batch_rows: int = 4096,
+        max_wait_seconds: float = 0.002,
+        recorder: LatencyRecorder | None = None,
+    ):
+        self.predict = predict
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_seconds = max_wait_seconds
+        self.recorder = recorder
+        self.requests: queue.Queue = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, frame: pd.DataFrame) -> np.ndarray:
+        """Score a frame through the shared batch; blocks until its predictions are ready."""
+        if len(frame) == 0:
+            raise ValueError("Cannot score an empty frame")
+        future: Future = Future()
+        self.requests.put((frame, future))
+        return future.result()
+
+    def _collect(self) -> List[tuple[pd.DataFrame, Future]]:
+        pending = [self.requests.get()]
+        rows = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait_seconds
+        while rows < self.max_batch_rows:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                frame, future = self.requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            pending.append((frame, future))
+            rows += len(frame)
+        return pending
+
+    def _run(self) -> None:
+        while True:
+            pending = self._collect()
+            frames = [frame for frame, _ in pending]
+            try:
+                predictions = np.asarray(self.predict(pd.concat(frames, ignore_index=True)))
+            except Exception as error:
+                if len(pending) == 1:
+                    pending[0][1].set_exception(error)
+                else:
+                    self._run_alone(pending)  # Only the requests that fail on their own get the error
+                continue
+
+            if self.recorder:
+                self.recorder.record_batch()
+            offset = 0
+            for frame, future in pending:
+                future.set_result(predictions[offset:offset + len(frame)])
+                offset += len(frame)
+
+    def _run_alone(self, pending: List[tuple[pd.DataFrame, Future]]) -> None:
+        for frame, future in pending:
+            try:
+                future.set_result(np.asarray(self.predict(frame)))
+            except Exception as error:
+                future.set_exception(error)
+            if self.recorder:
+                self.recorder.record_batch()
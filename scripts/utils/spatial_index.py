@@ -0,0 +1,233 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+import os
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from utils.enrichment import COUNTRY_TERRITORIES
+from utils.geocoding import GEOCODE_CACHE_PATH, LOCATION_KEY_COLUMNS, GeocodeCache, location_keys
+
+# Reference cities shipped with the repo, used alongside whatever the geocoder has resolved
+LOCATION_CENTROIDS_PATH = "../data/location_centroids.csv"
+EARTH_RADIUS_KM = 6371.0088
+COORDINATE_COLUMNS = ["LATITUDE", "LONGITUDE"]
+
+@dataclass(frozen=True)
+class Region:
+    """A named polygon of (latitude, longitude) vertices."""
+    name: str
+    polygon: Tuple[Tuple[float, float], ...]
+
+def _box(name: str, south: float, north: float, west: float, east: float) -> Region:
+    return Region(name, ((south, west), (south, east), (north, east), (north, west)))
+
+# Sales territories as coarse lat/lon regions; the first region containing a point wins. Japan and the
+# Philippines are traced tightly enough to leave out Korea, Taiwan, mainland China and Sabah, which fall to APAC.
+SALES_REGIONS: List[Region] = [
+    Region("Japan", (  # Japan, from Yonaguni to Hokkaido, passing between Tsushima and Busan
+        (23.5, 122.5), (33.5, 128.0), (34.8, 129.6), (35.6, 130.8), (38.5, 134.0),
+        (42.0, 139.0), (45.8, 141.0), (45.8, 146.0), (23.5, 146.0),
+    )),
+    Region("Japan", (  # The Philippines, keeping Sabah on the Borneo side
+        (4.5, 119.5), (8.0, 116.5), (21.5, 116.5), (21.5, 127.0), (4.5, 127.0),
+    )),
+    _box("APAC", -50.0, 60.0, 60.0, 180.0),
+    _box("NA", 14.5, 84.0, -170.0, -50.0),  # South of Mexico is Latin America, which has no territory
+    _box("EMEA", -40.0, 72.0, -30.0, 60.0),
+]
+# Points outside every region take the territory of the nearest known location only this close (coastal slop);
+# beyond it they get none rather than a territory from across an ocean
+TERRITORY_FALLBACK_KM = 250.0
+
+def points_in_polygon(latitude: np.ndarray, longitude: np.ndarray, polygon: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """Ray-casting containment test for every point at once, one vectorized pass per polygon edge."""
+    latitude, longitude = np.asarray(latitude, dtype=float), np.asarray(longitude, dtype=float)
+    inside = np.zeros(latitude.shape, dtype=bool)
+    vertices = np.asarray(polygon, dtype=float)
+    for (lat1, lon1), (lat2, lon2) in zip(np.roll(vertices, 1, axis=0), vertices):
+        if lat1 == lat2:
+            continue  # Horizontal edges never cross a horizontal ray
+        crosses = (lat1 > latitude) != (lat2 > latitude)
+        lon_at = lon1 + (latitude - lat1) * (lon2 - lon1) / (lat2 - lat1)
+        inside ^= crosses & (longitude < lon_at)
+    return inside
+
+def assign_regions(
+    latitude: np.ndarray, longitude: np.ndarray, regions: Sequence[Region] = SALES_REGIONS,
+) -> np.ndarray:
+    """Name of the first region containing each point, or None (also for missing coordinates)."""
+    latitude = np.asarray(latitude, dtype=float)
+    names = np.full(latitude.shape, None, dtype=object)
+    unassigned = ~np.isnan(latitude) & ~np.isnan(np.asarray(longitude, dtype=float))
+    for region in regions:
+        contained = unassigned & points_in_polygon(latitude, longitude, region.polygon)
+        names[contained] = region.name
+        unassigned &= ~contained
+    return names
+
+def unit_vectors(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """Points on the unit sphere, N x 3; straight-line (chord) distance between them grows with great-circle distance."""
+    lat, lon = np.radians(np.asarray(latitude, dtype=float)), np.radians(np.asarray(longitude, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    return 2 * np.arcsin(np.minimum(chord / 2, 1.0)) * EARTH_RADIUS_KM
+
+def km_to_chord(km: float) -> float:
+    return 2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+def spherical_centroids(points: pd.DataFrame, by: Sequence[str]) -> pd.DataFrame:
+    """Per-group centroid of LATITUDE/LONGITUDE, averaged as unit vectors so groups spanning the antimeridian stay correct."""
+    vectors = pd.DataFrame(unit_vectors(points["LATITUDE"], points["LONGITUDE"]), columns=["x", "y", "z"])
+    for col in by:
+        vectors[col] = points[col].to_numpy()
+    mean = vectors.groupby(list(by), sort=False)[["x", "y", "z"]].mean()
+    return pd.DataFrame({
+        "LATITUDE": np.degrees(np.arctan2(mean["z"], np.hypot(mean["x"], mean["y"]))),
+        "LONGITUDE": np.degrees(np.arctan2(mean["y"], mean["x"])),
+    }, index=mean.index).reset_index()
+
+class SpatialIndex:
+    """Offline coordinates for known locations: a KD-tree plus state and country centroids.
+
+    Points are keyed on canonical CITY/STATE/COUNTRY (see ``location_keys``);
+    when several sources know the same location, the first one passed wins.
+    The KD-tree holds the points as 3-D unit vectors, so Euclidean nearest
+    neighbors are great-circle nearest neighbors without haversine in the
+    inner loop. Every query takes whole arrays of coordinates, so millions of
+    rows cost a handful of vectorized calls and no network requests.
+    """
+
+    def __init__(self, points: pd.DataFrame):
+        points = points.dropna(subset=COORDINATE_COLUMNS).drop_duplicates(subset=LOCATION_KEY_COLUMNS)
+        self.points = points[LOCATION_KEY_COLUMNS + COORDINATE_COLUMNS].reset_index(drop=True)
+        if self.points.empty:
+            raise ValueError("SpatialIndex needs at least one location with coordinates")
+        self.tree = cKDTree(unit_vectors(self.points["LATITUDE"], self.points["LONGITUDE"]))
+
+        # Fallbacks for locations not in the table, most specific first
+        unique_city = ~self.points.duplicated(subset=["CITY", "COUNTRY"], keep=False)
+        with_state = self.points["STATE"] != ""
+        self.fallbacks: List[Tuple[str, List[str], pd.DataFrame]] = [
+            ("city", LOCATION_KEY_COLUMNS, self.points),
+            ("city", ["CITY", "COUNTRY"], self.points.loc[unique_city, ["CITY", "COUNTRY"] + COORDINATE_COLUMNS]),
+            ("state", ["STATE", "COUNTRY"], spherical_centroids(self.points[with_state], ["STATE", "COUNTRY"])),
+            ("country", ["COUNTRY"], spherical_centroids(self.points, ["COUNTRY"])),
+        ]
+
+    @classmethod
+    def from_frames(cls, frames: Sequence[pd.DataFrame]) -> "SpatialIndex":
+        """Index frames with location keys plus LATITUDE/LONGITUDE, earlier frames taking precedence."""
+        keyed = []
+        for frame in frames:
+            points = location_keys(frame)
+            for col in COORDINATE_COLUMNS:
+                points[col] = pd.to_numeric(frame[col], errors="coerce").to_numpy()
+            keyed.append(points)
+        return cls(pd.concat(keyed, ignore_index=True))
+
+    def _queries(self, latitude: np.ndarray, longitude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        latitude, longitude = np.asarray(latitude, dtype=float), np.asarray(longitude, dtype=float)
+        valid = ~(np.isnan(latitude) | np.isnan(longitude))
+        return unit_vectors(latitude[valid], longitude[valid]), valid
+
+    def nearest(self, latitude: np.ndarray, longitude: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """(distances in km, row positions in ``points``), each N x k; rows with missing coordinates get NaN / -1."""
+        queries, valid = self._queries(latitude, longitude)
+        k = min(k, len(self.points))
+        distances = np.full((len(valid), k), np.nan)
+        positions = np.full((len(valid), k), -1, dtype=np.int64)
+        if len(queries):
+            chords, found = self.tree.query(queries, k=[*range(1, k + 1)])
+            distances[valid], positions[valid] = chord_to_km(chords), found
+        return distances, positions
+
+    def within_radius(
+        self, latitude: np.ndarray, longitude: np.ndarray, radius_km: float, count_only: bool = False,
+    ) -> np.ndarray:
+        """Known locations within ``radius_km`` of each point: counts, or an object array of row-position arrays."""
+        queries, valid = self._queries(latitude, longitude)
+        if count_only:
+            counts = np.zeros(len(valid), dtype=np.int64)
+            if len(queries):
+                counts[valid] = self.tree.query_ball_point(queries, km_to_chord(radius_km), return_length=True)
+            return counts
+        matches = np.empty(len(valid), dtype=object)
+        if len(queries):
+            found = self.tree.query_ball_point(queries, km_to_chord(radius_km))
+            for position, positions in zip(np.flatnonzero(valid), found):
+                matches[position] = np.asarray(positions, dtype=np.int64)
+        for position in np.flatnonzero(~valid):
+            matches[position] = np.empty(0, dtype=np.int64)
+        return matches
+
+    def fill_missing_coordinates(self, df: pd.DataFrame) -> pd.Series:
+        """Fill missing LATITUDE/LONGITUDE in place from the best same-location, same-state or same-country match.
+
+        Returns where each row's coordinates came from: "geocoded" (already
+        present), "city", "state" (state centroid), "country" (country
+        centroid), or missing when nothing matched.
+        """
+        missing = (df["LATITUDE"].isna() | df["LONGITUDE"].isna()).to_numpy()
+        sources = pd.Series(np.where(missing, None, "geocoded"), index=df.index, dtype="string")
+        if not missing.any():
+            return sources
+
+        keys = location_keys(df.loc[missing]).reset_index(drop=True)
+        latitude, longitude = np.full(len(keys), np.nan), np.full(len(keys), np.nan)
+        found_by = np.full(len(keys), None, dtype=object)
+        for source, on, table in self.fallbacks:
+            todo = np.flatnonzero(np.isnan(latitude))
+            if not len(todo):
+                break
+            matched = keys.loc[todo, on].merge(table[on + COORDINATE_COLUMNS], on=on, how="left")
+            found = matched["LATITUDE"].notna().to_numpy()
+            latitude[todo[found]] = matched["LATITUDE"].to_numpy()[found]
+            longitude[todo[found]] = matched["LONGITUDE"].to_numpy()[found]
+            found_by[todo[found]] = source
+
+        df.loc[missing, "LATITUDE"] = latitude
+        df.loc[missing, "LONGITUDE"] = longitude
+        sources[missing] = found_by
+        return sources
+
+    def territories(
+        self,
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        regions: Sequence[Region] = SALES_REGIONS,
+        fallback_km: float = TERRITORY_FALLBACK_KM,
+    ) -> np.ndarray:
+        """Sales territory per point: the containing region, else the country territory of a known location
+        within ``fallback_km``, else None.
+        """
+        names = assign_regions(latitude, longitude, regions)
+        outside = np.flatnonzero(pd.isna(names) & ~np.isnan(np.asarray(latitude, dtype=float)))
+        if len(outside):
+            distances, positions = self.nearest(
+                np.asarray(latitude, dtype=float)[outside], np.asarray(longitude, dtype=float)[outside]
+            )
+            countries = self.points["COUNTRY"].to_numpy()[positions[:, 0]]
+            names[outside] = [
+                COUNTRY_TERRITORIES.rules.get((country,)) if distance <= fallback_km else None
+                for country, distance in zip(countries, distances[:, 0])
+            ]
+        return names
+
+def load_spatial_index(
+    cache_path: str | None = GEOCODE_CACHE_PATH,
+    centroids_path: str | None = LOCATION_CENTROIDS_PATH,
+    frames: Sequence[pd.DataFrame] = (),
+) -> SpatialIndex:
+    """Index ``frames`` first, then the geocode cache's resolved locations, then the bundled reference cities."""
+    sources = list(frames)
+    if cache_path and os.path.exists(cache_path):
+        with GeocodeCache(cache_path) as cache:
+            sources.append(cache.resolved_frame())
+    if centroids_path and os.path.exists(centroids_path):
+        sources.append(pd.read_csv(centroids_path, dtype={"STATE": "str"}))
+    return SpatialIndex.from_frames(sources)
+
+def coordinate_source_counts(sources: pd.Series) -> Dict[str, int]:
+    return {str(source): int(count) for source, count in sources.fillna("unresolved").value_counts().items()}
@@ -0,0 +1,207 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator
+import os
+import numpy as np
+import pandas as pd
+
+SEED_PATH = "../data/sales_data_sample.csv"
+
+# Column order of the raw extract
+RAW_COLUMNS = [
+    "ORDERNUMBER", "QUANTITYORDERED", "PRICEEACH", "ORDERLINENUMBER", "SALES", "ORDERDATE",
+    "STATUS", "QTR_ID", "MONTH_ID", "YEAR_ID", "PRODUCTLINE", "MSRP", "PRODUCTCODE",
+    "CUSTOMERNAME", "PHONE", "ADDRESSLINE1", "ADDRESSLINE2", "CITY", "STATE", "POSTALCODE",
+    "COUNTRY", "TERRITORY", "CONTACTLASTNAME", "CONTACTFIRSTNAME", "DEALSIZE",
+]
+
+CUSTOMER_COLUMNS = [
+    "CUSTOMERNAME", "PHONE", "ADDRESSLINE1", "ADDRESSLINE2", "CITY", "STATE", "POSTALCODE",
+    "COUNTRY", "TERRITORY", "CONTACTLASTNAME", "CONTACTFIRSTNAME",
+]
+
+# The extract stores PRICEEACH capped at 100 while SALES keeps the uncapped line total
+PRICEEACH_CAP = 100.0
+
+# DEALSIZE is bucketed on the line's SALES value
+DEALSIZE_BOUNDS = (3000.0, 7000.0)
+
+FIRST_ORDERNUMBER = 10100
+
+@dataclass
+class OrderProfile:
+    """Empirical distributions of the seed extract that synthetic order lines are drawn from."""
+    customers: pd.DataFrame        # One row per customer with its contact/location columns as raw text
+    customer_weights: np.ndarray   # Share of order lines per customer
+    products: pd.DataFrame         # PRODUCTCODE, PRODUCTLINE, MSRP
+    product_weights: np.ndarray
+    price_ratios: Dict[str, np.ndarray]   # PRODUCTLINE -> observed (SALES / QUANTITYORDERED) / MSRP
+    quantities: Dict[str, np.ndarray]     # PRODUCTLINE -> observed QUANTITYORDERED
+    statuses: np.ndarray
+    status_weights: np.ndarray
+    lines_per_order: np.ndarray
+    order_dates: np.ndarray        # Observed order dates (datetime64[D]), sampled to keep seasonality
+
+    @classmethod
+    def from_csv(cls, path: str = SEED_PATH) -> "OrderProfile":
+        # keep_default_na=False keeps blanks and the literal "NA" TERRITORY exactly as in the extract
+        df = pd.read_csv(path, encoding='latin-1', dtype=str, keep_default_na=False)
+        for col in ["QUANTITYORDERED", "PRICEEACH", "SALES", "MSRP"]:
+            df[col] = pd.to_numeric(df[col])
+
+        customer_lines = df.groupby(CUSTOMER_COLUMNS, sort=True).size()
+        product_lines = df.groupby(["PRODUCTCODE", "PRODUCTLINE", "MSRP"], sort=True).size()
+        df["PRICE_RATIO"] = df["SALES"] / df["QUANTITYORDERED"] / df["MSRP"]
+        orders = df.drop_duplicates("ORDERNUMBER")
+        status_counts = orders["STATUS"].value_counts().sort_index()
+
+        return cls(
+            customers=customer_lines.index.to_frame(index=False),
+            customer_weights=(customer_lines / customer_lines.sum()).to_numpy(),
+            products=product_lines.index.to_frame(index=False),
+            product_weights=(product_lines / product_lines.sum()).to_numpy(),
+            price_ratios={line: group["PRICE_RATIO"].to_numpy() for line, group in df.groupby("PRODUCTLINE")},
+            quantities={line: group["QUANTITYORDERED"].to_numpy() for line, group in df.groupby("PRODUCTLINE")},
+            statuses=status_counts.index.to_numpy(dtype=object),
+            status_weights=(status_counts / status_counts.sum()).to_numpy(),
+            lines_per_order=df.groupby("ORDERNUMBER").size().to_numpy(),
+            order_dates=pd.to_datetime(orders["ORDERDATE"], format="%m/%d/%Y %H:%M").to_numpy().astype("datetime64[D]"),
+        )
+
+def _reroll_digits(phones: np.ndarray, rng: np.random.Generator, n_digits: int = 4) -> np.ndarray:
+    """Replace the last ``n_digits`` digits of each phone, keeping its separators and prefix intact."""
+    rerolled = []
+    for phone, digits in zip(phones, rng.integers(0, 10, size=(len(phones), n_digits))):
+        chars = list(phone)
+        replaced = 0
+        for pos in range(len(chars) - 1, -1, -1):
+            if replaced == n_digits:
+                break
+            if chars[pos].isdigit():
+                chars[pos] = str(digits[replaced])
+                replaced += 1
+        rerolled.append("".join(chars))
+    return np.array(rerolled, dtype=object)
+
+def generate_chunk(profile: OrderProfile, chunk_index: int, start_row: int, chunk_rows: int, seed: int) -> pd.DataFrame:
+    """Generate one chunk of ``chunk_rows`` order lines in the raw extract schema.
+
+    The chunk depends only on its arguments, so output is identical no matter
+    how many workers produce it. Order numbers start at ``start_row`` past
+    FIRST_ORDERNUMBER; a chunk never has more orders than rows, so they never
+    collide across chunks.
+    """
+    rng = np.random.default_rng([seed, chunk_index])
+
+    # Orders: line counts, dates, status and customer are per order, like the extract
+    order_lines = rng.choice(profile.lines_per_order, size=chunk_rows // profile.lines_per_order.min() + 1)
+    n_orders = int(np.searchsorted(np.cumsum(order_lines), chunk_rows)) + 1
+    order_lines = order_lines[:n_orders]
+    order_lines[-1] -= order_lines.sum() - chunk_rows  # Trim the last order to land on chunk_rows exactly
+
+    order_numbers = FIRST_ORDERNUMBER + start_row + np.arange(n_orders)
+    order_dates = pd.DatetimeIndex(rng.choice(profile.order_dates, size=n_orders))
+    order_date_text = np.array([f"{d.month}/{d.day}/{d.year} 0:00" for d in order_dates], dtype=object)
+    order_status = rng.choice(profile.statuses, size=n_orders, p=profile.status_weights)
+    order_customer = rng.choice(len(profile.customers), size=n_orders, p=profile.customer_weights)
+
+    order_idx = np.repeat(np.arange(n_orders), order_lines)
+    line_numbers = np.arange(chunk_rows) - np.repeat(np.cumsum(order_lines) - order_lines, order_lines) + 1
+
+    # Lines: product, quantity and realised unit price drawn from that product line's distributions
+    product_idx = rng.choice(len(profile.products), size=chunk_rows, p=profile.product_weights)
+    products = profile.products.iloc[product_idx].reset_index(drop=True)
+    msrp = products["MSRP"].to_numpy(dtype=float)
+    quantity = np.empty(chunk_rows, dtype=np.int64)
+    ratio = np.empty(chunk_rows)
+    for line, rows in products.groupby("PRODUCTLINE").indices.items():
+        quantity[rows] = rng.choice(profile.quantities[line], size=len(rows))
+        ratio[rows] = rng.choice(profile.price_ratios[line], size=len(rows))
+    unit_price = np.round(msrp * ratio, 2)
+    sales = np.round(unit_price * quantity, 2)
+
+    # Customers keep their location/phone formats (including typo'd cities); each order's phone gets fresh digits
+    order_phones = _reroll_digits(profile.customers["PHONE"].to_numpy()[order_customer], rng)
+    customers = profile.customers.iloc[order_customer[order_idx]].reset_index(drop=True)
+    customers["PHONE"] = order_phones[order_idx]
+
+    dates = order_dates[order_idx]
+    chunk = pd.DataFrame({
+        "ORDERNUMBER": order_numbers[order_idx],
+        "QUANTITYORDERED": quantity,
+        "PRICEEACH": np.minimum(unit_price, PRICEEACH_CAP),
+        "ORDERLINENUMBER": line_numbers,
+        "SALES": sales,
+        "ORDERDATE": order_date_text[order_idx],
+        "STATUS": order_status[order_idx],
+        "QTR_ID": dates.quarter,
+        "MONTH_ID": dates.month,
+        "YEAR_ID": dates.year,
+        "PRODUCTLINE": products["PRODUCTLINE"],
+        "MSRP": products["MSRP"],
+        "PRODUCTCODE": products["PRODUCTCODE"],
+        "DEALSIZE": np.select(
+            [sales < DEALSIZE_BOUNDS[0], sales < DEALSIZE_BOUNDS[1]], ["Small", "Medium"], default="Large"
+        ),
+    })
+    chunk = pd.concat([chunk, customers], axis=1)
+    return chunk[RAW_COLUMNS]
+
+# ---- Worker pool: each worker receives the profile once and returns rendered CSV text ----
+
+_worker_profile: OrderProfile | None = None
+
+def _init_worker(profile: OrderProfile) -> None:
+    global _worker_profile
+    _worker_profile = profile
+
+def _render_chunk(args: tuple[int, int, int, int]) -> str:
+    chunk_index, start_row, chunk_rows, seed = args
+    chunk = generate_chunk(_worker_profile, chunk_index, start_row, chunk_rows, seed)
+    return chunk.to_csv(index=False, header=chunk_index == 0)
+
+def iter_csv_chunks(
+    profile: OrderProfile,
+    n_rows: int,
+    chunk_rows: int = 100_000,
+    seed: int = 42,
+    max_workers: int | None = None,
+) -> Iterator[str]:
+    """Yield CSV text for ``n_rows`` synthetic lines in chunk order.
+
+    Chunks are generated and serialised across a process pool with at most two
+    chunks per worker in flight, so memory stays bounded however large n_rows is.
+    """
+    tasks = [
+        (chunk_index, start, min(chunk_rows, n_rows - start), seed)
+        for chunk_index, start in enumerate(range(0, n_rows, chunk_rows))
+    ]
+    max_workers = max_workers or os.cpu_count() or 1
+    in_flight_limit = 2 * max_workers
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(profile,)) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_render_chunk, task))
+            if len(pending) >= in_flight_limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def write_synthetic_csv(
+    output_path: str,
+    n_rows: int,
+    profile: OrderProfile | None = None,
+    chunk_rows: int = 100_000,
+    seed: int = 42,
+    max_workers: int | None = None,
+) -> None:
+    """Stream a synthetic raw extract of ``n_rows`` lines to output_path."""
+    profile = profile or OrderProfile.from_csv()
+    written = 0
+    with open(output_path, "w", encoding="latin-1", newline="") as f:
+        for text in iter_csv_chunks(profile, n_rows, chunk_rows, seed, max_workers):
+            f.write(text)
+            written = min(n_rows, written + chunk_rows)
+            print(f"  {written:,} / {n_rows:,} rows written")
@@ -0,0 +1,282 @@
+from __future__ import annotations
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+import hashlib
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from utils.datasets import MODEL_READY_V2, csv_path, parquet_path, read_dataset
+from utils.pipeline import file_digest
+
+TENSOR_CACHE_DIR = "../data/tensor_cache"
+SHARD_ROWS = 65_536
+# Provisional, not measured: 256 is a placeholder, not a tuning result. Run benchmark_tensor_inputs.py where
+# TensorFlow is installed and replace it with the fastest packed batch size that script reports
+TUNED_BATCH_SIZE = 256
+SHUFFLE_BUFFER_SHARDS = 2  # Row shuffle buffer, in shards; shard order is shuffled separately
+NORMALIZATION_EPSILON = 1e-7  # keras.backend.epsilon(), the floor Normalization puts under the std
+
+# Arrays every split is stored as, one .npy per shard
+ARRAY_NAMES = ("numeric", "productline", "labels")
+
+@dataclass(frozen=True)
+class TensorSpec:
+    """Inputs and target of one of the notebook's Keras models."""
+    name: str
+    numeric_cols: Tuple[str, ...]
+    target: str
+    label_dtype: str
+    test_size: float
+    random_state: int = 42
+    categorical_col: str = "PRODUCTLINE"
+
+    @property
+    def features(self) -> List[str]:
+        return [self.categorical_col, *self.numeric_cols]
+
+CLOSE_NUMERIC_COLS = ("QUANTITYORDERED", "MSRP", "PRICEEACH", "DISCOUNT_PCT_CLIPPED", "MONTH_ID", "YEAR_ID")
+
+TENSOR_SPECS: Dict[str, TensorSpec] = {
+    "close": TensorSpec("close", CLOSE_NUMERIC_COLS, "IS_CLOSED", "float32", test_size=0.2),
+    "status": TensorSpec(
+        "status",
+        CLOSE_NUMERIC_COLS + ("QTR_ID", "LOG_DEAL_SIZE", "PRICE_TO_MSRP_RATIO"),
+        "STATUS_CLASS",
+        "int32",
+        test_size=0.25,
+    ),
+}
+
+@dataclass
+class TensorEncoding:
+    """Encoding fitted on the training split: the PRODUCTLINE vocabulary and numeric mean / variance.
+
+    Reproduces the notebook's adapted layers once, outside the graph:
+    ``StringLookup`` (index 0 is out-of-vocabulary, the vocabulary ordered by
+    descending frequency) and ``Normalization`` (population variance), so the
+    cached matrix is already normalized and the model only one-hot encodes an
+    integer index.
+    """
+    numeric_cols: List[str]
+    vocabulary: List[str]
+    mean: np.ndarray
+    variance: np.ndarray
+
+    @classmethod
+    def fit(cls, frame: pd.DataFrame, spec: TensorSpec) -> "TensorEncoding":
+        counts = frame[spec.categorical_col].astype(str).value_counts()
+        vocabulary = sorted(counts.index, key=lambda value: (-counts[value], value))
+        numeric = frame[list(spec.numeric_cols)].to_numpy(dtype=np.float64)
+        return cls(list(spec.numeric_cols), vocabulary, numeric.mean(axis=0), numeric.var(axis=0))
+
+    @property
+    def n_tokens(self) -> int:
+        return len(self.vocabulary) + 1
+
+    def encode(self, frame: pd.DataFrame, categorical_col: str = "PRODUCTLINE") -> Tuple[np.ndarray, np.ndarray]:
+        """(normalized float32 matrix, int32 vocabulary index) for a raw feature frame."""
+        numeric = frame[self.numeric_cols].to_numpy(dtype=np.float64)
+        std = np.maximum(np.sqrt(self.variance), NORMALIZATION_EPSILON)
+        packed = ((numeric - self.mean) / std).astype(np.float32)
+        # Codes are -1 for unseen values, which shifts them onto the OOV index 0
+        codes = pd.Index(self.vocabulary).get_indexer(frame[categorical_col].astype(str))
+        return packed, (codes + 1).astype(np.int32)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "numeric_cols": self.numeric_cols,
+            "vocabulary": self.vocabulary,
+            "mean": self.mean.tolist(),
+            "variance": self.variance.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TensorEncoding":
+        return cls(data["numeric_cols"], data["vocabulary"], np.asarray(data["mean"]), np.asarray(data["variance"]))
+
+@dataclass
+class TensorCache:
+    """Encoded train / test splits of one spec, stored as memory-mapped ``.npy`` shards."""
+    directory: Path
+    spec: TensorSpec
+    encoding: TensorEncoding
+    fingerprint: str
+    shards: Dict[str, List[int]] = field(default_factory=dict)  # split -> rows per shard
+
+    def shard_path(self, split: str, shard: int, array: str) -> Path:
+        return self.directory / split / f"{array}_{shard:05d}.npy"
+
+    def n_rows(self, split: str) -> int:
+        return sum(self.shards[split])
+
+    def read_shard(self, split: str, shard: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return tuple(np.load(self.shard_path(split, shard, array), mmap_mode="r") for array in ARRAY_NAMES)
+
+    def arrays(self, split: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """A split's (numeric, productline, labels), concatenating the shards into memory."""
+        shards = [self.read_shard(split, shard) for shard in range(len(self.shards[split]))]
+        return tuple(np.concatenate([shard[i] for shard in shards]) for i in range(len(ARRAY_NAMES)))
+
+    def batches(
+        self, split: str, batch_size: int = TUNED_BATCH_SIZE, shuffle: bool = False, seed: int = 42,
+    ) -> Iterator[Tuple[Dict[str, np.ndarray], np.ndarray]]:
+        """NumPy batches in the same ``({"numeric", "productline"}, labels)`` layout as ``make_dataset``."""
+        numeric, productline, labels = self.arrays(split)
+        order = np.random.default_rng(seed).permutation(len(labels)) if shuffle else np.arange(len(labels))
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            yield {"numeric": numeric[rows], "productline": productline[rows]}, labels[rows]
+
+def _meta_path(directory: Path) -> Path:
+    return directory / "meta.json"
+
+def source_path(stage: str = MODEL_READY_V2) -> Path:
+    """The file ``read_dataset`` will read for ``stage``."""
+    return parquet_path(stage) if parquet_path(stage).exists() else csv_path(stage)
+
+def cache_fingerprint(spec: TensorSpec, stage: str = MODEL_READY_V2, shard_rows: int = SHARD_ROWS) -> str:
+    payload = {
+        "spec": asdict(spec),
+        "source": file_digest(source_path(stage)),
+        "code": file_digest(__file__),
+        "shard_rows": shard_rows,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def load_tensor_cache(directory: str | Path) -> TensorCache:
+    directory = Path(directory)
+    with open(_meta_path(directory)) as f:
+        meta = json.load(f)
+    spec = TensorSpec(**{**meta["spec"], "numeric_cols": tuple(meta["spec"]["numeric_cols"])})
+    return TensorCache(directory, spec, TensorEncoding.from_dict(meta["encoding"]), meta["fingerprint"], meta["shards"])
+
+def _write_split(cache: TensorCache, split: str, arrays: Sequence[np.ndarray], shard_rows: int) -> None:
+    (cache.directory / split).mkdir(parents=True)
+    n_rows = len(arrays[0])
+    cache.shards[split] = []
+    for shard, start in enumerate(range(0, max(n_rows, 1), shard_rows)):
+        for name, values in zip(ARRAY_NAMES, arrays):
+            np.save(cache.shard_path(split, shard, name), values[start:start + shard_rows])
+        cache.shards[split].append(len(arrays[0][start:start + shard_rows]))
+
+def build_tensor_cache(
+    spec: TensorSpec,
+    stage: str = MODEL_READY_V2,
+    cache_dir: str = TENSOR_CACHE_DIR,
+    shard_rows: int = SHARD_ROWS,
+    force: bool = False,
+) -> TensorCache:
+    """Encode a spec's train / test splits once and cache them under ``cache_dir/<spec name>``.
+
+    The split and dropped rows follow the notebook: rows missing a feature or
+    the target are dropped, then ``train_test_split`` stratifies on the
+    target. The cache is reused while the source file, spec and this module
+    are unchanged.
+    """
+    directory = Path(cache_dir) / spec.name
+    fingerprint = cache_fingerprint(spec, stage, shard_rows)
+    if not force and _meta_path(directory).exists():
+        cache = load_tensor_cache(directory)
+        if cache.fingerprint == fingerprint:
+            return cache
+    if directory.exists():
+        shutil.rmtree(directory)
+
+    frame = read_dataset(stage, columns=spec.features + [spec.target]).dropna(subset=spec.features + [spec.target])
+    labels = frame[spec.target].to_numpy(dtype=spec.label_dtype)
+    X_train, X_test, y_train, y_test = train_test_split(
+        frame[spec.features], labels, test_size=spec.test_size, random_state=spec.random_state, stratify=labels
+    )
+    encoding = TensorEncoding.fit(X_train, spec)
+    cache = TensorCache(directory, spec, encoding, fingerprint)
+    for split, X, y in (("train", X_train, y_train), ("test", X_test, y_test)):
+        _write_split(cache, split, (*encoding.encode(X, spec.categorical_col), y), shard_rows)
+
+    meta = {
+        "spec": asdict(spec),
+        "encoding": encoding.to_dict(),
+        "fingerprint": fingerprint,
+        "shards": cache.shards,
+    }
+    with open(_meta_path(directory), "w") as f:
+        json.dump(meta, f, indent=2)
+    return cache
+
+# ---- tf.data / Keras (TensorFlow is imported lazily; the cache itself only needs NumPy) ----
+
+def make_dataset(
+    cache: TensorCache,
+    split: str,
+    batch_size: int = TUNED_BATCH_SIZE,
+    shuffle: bool = True,
+    seed: int = 42,
+    cycle_length: int = 4,
+):
+    """Serve a cached split as ``({"numeric", "productline"}, labels)`` batches.
+
+    Shards are read from their memory maps by a parallel interleave. With
+    ``shuffle`` the shard order is reshuffled every epoch and rows are mixed
+    in a buffer of SHUFFLE_BUFFER_SHARDS shards, so memory stays bounded by a
+    few shards rather than the whole split; the shards are re-read from their
+    memory maps each epoch. Without it the decoded rows are kept by
+    ``.cache()`` so later epochs never touch the files again.
+    """
+    import tensorflow as tf
+
+    n_numeric = len(cache.encoding.numeric_cols)
+    label_dtype = tf.as_dtype(cache.spec.label_dtype)
+
+    def read_shard(shard):
+        return cache.read_shard(split, int(shard))
+
+    def shard_rows(shard):
+        numeric, productline, labels = tf.numpy_function(read_shard, [shard], (tf.float32, tf.int32, label_dtype))
+        numeric = tf.ensure_shape(numeric, (None, n_numeric))
+        productline = tf.ensure_shape(productline, (None,))
+        labels = tf.ensure_shape(labels, (None,))
+        return tf.data.Dataset.from_tensor_slices(({"numeric": numeric, "productline": productline}, labels))
+
+    n_shards = len(cache.shards[split])
+    ds = tf.data.Dataset.range(n_shards)
+    if shuffle:
+        ds = ds.shuffle(buffer_size=max(n_shards, 1), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.interleave(
+        shard_rows,
+        cycle_length=cycle_length,
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=True,
+    )
+    if shuffle:
+        buffer_rows = min(cache.n_rows(split), SHUFFLE_BUFFER_SHARDS * max(cache.shards[split], default=1))
+        ds = ds.shuffle(buffer_size=max(buffer_rows, 1), seed=seed, reshuffle_each_iteration=True)
+    else:
+        ds = ds.cache()
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+def build_packed_model(
+    cache: TensorCache,
+    hidden_units: Sequence[int] = (64, 32),
+    dropout_rate: float = 0.2,
+    n_outputs: int = 1,
+    model_name: str = "packed_model",
+):
+    """The notebook's dense network over packed inputs: one-hot PRODUCTLINE index + pre-normalized numerics."""
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    numeric = tf.keras.Input(shape=(len(cache.encoding.numeric_cols),), name="numeric", dtype=tf.float32)
+    productline = tf.keras.Input(shape=(), name="productline", dtype=tf.int32)
+    productline_encoded = layers.CategoryEncoding(num_tokens=cache.encoding.n_tokens, output_mode="one_hot")(productline)
+
+    x = layers.Concatenate()([productline_encoded, numeric])
+    for i, units in enumerate(hidden_units):
+        x = layers.Dense(units, activation="relu", name=f"dense_{i+1}")(x)
+        x = layers.Dropout(dropout_rate, name=f"dropout_{i+1}")(x)
+    if n_outputs == 1:
+        outputs = layers.Dense(1, activation="sigmoid", name="close_prob")(x)
+    else:
+        outputs = layers.Dense(n_outputs, activation="softmax", name="status_probs")(x)
+    return tf.keras.Model(inputs={"numeric": numeric, "productline": productline}, outputs=outputs, name=model_name)